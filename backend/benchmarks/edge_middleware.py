@@ -0,0 +1,88 @@
+"""
+Edge middleware: per-request overhead of the three stacked layers vs the fused one.
+
+    cd backend && python -m benchmarks.edge_middleware [--requests 50000]
+
+Calls the ASGI app directly (no sockets or HTTP parsing) with a small
+GET and a small POST, through: the bare app, RequestLoggingMiddleware ->
+RateLimiterMiddleware -> SecurityHeadersMiddleware stacked, and
+FusedEdgeMiddleware. Logging is sampled at 0 and the rate limit is high
+enough that nothing is rejected, so only the middleware plumbing is
+measured.
+"""
+import argparse
+import asyncio
+import time
+
+from src.middleware.fused import FusedEdgeMiddleware
+from src.middleware.logging_config import RequestLoggingMiddleware
+from src.middleware.rate_limiter import RateLimiterMiddleware
+from src.middleware.security import SecurityHeadersMiddleware
+
+LIMITS = dict(rate_limit=10**9, chat_rate_limit=10**9)
+
+
+async def bare_app(scope, receive, send):
+    if scope["method"] == "POST":
+        await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def stacked():
+    app = SecurityHeadersMiddleware(bare_app, max_body_size_mb=1)
+    app = RateLimiterMiddleware(app, **LIMITS)
+    return RequestLoggingMiddleware(app, sample_rate=0)
+
+
+def fused():
+    return FusedEdgeMiddleware(bare_app, max_body_size_mb=1, log_sample_rate=0, **LIMITS)
+
+
+def _scope(method: str, body: bytes):
+    return {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": "/api/v1/echo",
+        "raw_path": b"/api/v1/echo",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"content-length", str(len(body)).encode())],
+        "client": ("10.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+
+
+async def _measure(app, method: str, requests: int) -> float:
+    body = b'{"message": "hello"}' if method == "POST" else b""
+    scope = _scope(method, body)
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=50_000)
+    args = parser.parse_args()
+
+    variants = {"bare app": lambda: bare_app, "stacked (3 layers)": stacked, "fused": fused}
+    print(f"{args.requests} requests per case, us/request")
+    for method in ("GET", "POST"):
+        for label, build in variants.items():
+            per_request = asyncio.run(_measure(build(), method, args.requests))
+            print(f"  {method:4s} {label:20s} {per_request:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+JSON responses: JSONResponse(jsonable_encoder(...)) vs FastJSONResponse.
+
+    cd backend && python -m benchmarks.responses [--renders 200]
+
+Renders a 1000-row conversation history (datetimes as datetime objects
+for FastJSONResponse, pre-formatted strings for JSONResponse, and once
+as pre-serialized RawJSON rows) and a 500-entry plugin list, and reports
+body size and time per render. The encoder line says whether orjson or
+the stdlib fallback was used.
+"""
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.core.responses import FastJSONResponse, dumps, json_array, orjson
+
+
+def _cases():
+    started = datetime(2026, 1, 1, 9, 0, 0, 123456)
+    history = [
+        {
+            "id": i,
+            "session_id": f"session-{i // 20:05d}",
+            "user_message": "What's on my calendar tomorrow, and will it rain? " * 2,
+            "assistant_response": "You have three meetings tomorrow, Sir. Light rain expected after 4pm. " * 6,
+            "plugin_used": "CalendarPlugin" if i % 3 else None,
+            "created_at": started + timedelta(seconds=i * 7),
+        }
+        for i in range(1000)
+    ]
+    history_iso = [{**row, "created_at": row["created_at"].isoformat()} for row in history]
+    plugins = [
+        {"name": f"Plugin{i}", "description": "Does something useful " * 4, "enabled": i % 2 == 0, "version": "1.0.0"}
+        for i in range(500)
+    ]
+    raw_rows = json_array(dumps(row) for row in history_iso)
+
+    return {
+        "history (1000 rows)": [
+            ("JSONResponse(jsonable_encoder)", lambda: JSONResponse(jsonable_encoder(history_iso))),
+            ("FastJSONResponse", lambda: FastJSONResponse(history)),
+            ("FastJSONResponse(RawJSON)", lambda: FastJSONResponse({"session_id": "s", "messages": raw_rows})),
+        ],
+        "plugins (500 entries)": [
+            ("JSONResponse(jsonable_encoder)", lambda: JSONResponse(jsonable_encoder(plugins))),
+            ("FastJSONResponse", lambda: FastJSONResponse(plugins)),
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--renders", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json'}")
+    n = args.renders
+    for name, variants in _cases().items():
+        print(f"{name}:")
+        for label, build in variants:
+            per_call = timeit.timeit(build, number=n) / n * 1e3
+            print(f"  {label:32s} {len(build().body):8d} B  {per_call:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Rate limit backends: per-worker GCRA vs the shared-memory (or Redis) table.
+
+    cd backend && python -m benchmarks.shared_rate_limit [--workers 4] [--hits 50000] [--keys 1000] [--redis-url URL]
+
+Starts `workers` processes that each run `hits` checks over `keys`
+client keys through the backend's async hit(), all at once, and
+reports the aggregate checks per second. The shared-memory table lives
+in a temporary directory; Redis is only measured when --redis-url is
+given. Local limits are the baseline: no coordination, but each worker
+allows the full limit on its own.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import tempfile
+import time
+
+from src.middleware.rate_limit_backends import RedisBackend, SharedMemoryBackend
+from src.middleware.rate_limiter import GCRARateLimiter
+
+LIMIT = 1_000_000  # high enough that every check is allowed and writes its slot
+
+
+class _LocalBackend:
+    def __init__(self):
+        self.limiter = GCRARateLimiter()
+
+    async def hit(self, key, limit):
+        return self.limiter.hit(key, limit)
+
+    async def close(self):
+        pass
+
+
+def _make_backend(kind: str, args):
+    if kind == "local":
+        return _LocalBackend()
+    if kind == "shared_memory":
+        return SharedMemoryBackend(path=f"{args.tmp}/bench.bin", slots=args.slots)
+    return RedisBackend(args.redis_url, timeout=1.0)
+
+
+async def _worker_checks(kind: str, args, worker: int, start_at: float) -> dict:
+    backend = _make_backend(kind, args)
+    names = [("default", f"10.0.{i // 256}.{i % 256}") for i in range(args.keys)]
+    while time.time() < start_at:  # line the workers up
+        await asyncio.sleep(0.001)
+    timeouts = 0
+
+    async def check(i):
+        nonlocal timeouts
+        try:
+            await backend.hit(names[(worker + i) % args.keys], LIMIT)
+        except TimeoutError:
+            timeouts += 1  # the middleware would fall back to local limits
+
+    started = time.perf_counter()
+    if kind == "redis":
+        # Concurrent requests are what Redis batching coalesces
+        for offset in range(0, args.hits, 100):
+            await asyncio.gather(*(check(i) for i in range(offset, min(offset + 100, args.hits))))
+    else:
+        for i in range(args.hits):
+            await check(i)
+    elapsed = time.perf_counter() - started
+    await backend.close()
+    return {"elapsed": elapsed, "lock_waits": getattr(backend, "lock_waits", 0), "timeouts": timeouts}
+
+
+def _worker(kind: str, args, worker: int, start_at: float, results):
+    results.put(asyncio.run(_worker_checks(kind, args, worker, start_at)))
+
+
+def _run(kind: str, args) -> str:
+    results = multiprocessing.Queue()
+    start_at = time.time() + 0.5
+    procs = [
+        multiprocessing.Process(target=_worker, args=(kind, args, w, start_at, results))
+        for w in range(args.workers)
+    ]
+    for proc in procs:
+        proc.start()
+    stats = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+
+    wall = max(s["elapsed"] for s in stats)
+    total = args.workers * args.hits
+    return (
+        f"{kind:14s} {total / wall:10.0f} checks/s  "
+        f"{wall / args.hits * 1e6:6.2f} us/check per worker  "
+        f"lock_waits={sum(s['lock_waits'] for s in stats)} timeouts={sum(s['timeouts'] for s in stats)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--hits", type=int, default=50_000)
+    parser.add_argument("--keys", type=int, default=1_000)
+    parser.add_argument("--slots", type=int, default=65536)
+    parser.add_argument("--redis-url", default="")
+    args = parser.parse_args()
+
+    kinds = ["local", "shared_memory"] + (["redis"] if args.redis_url else [])
+    print(f"{args.workers} workers x {args.hits} checks over {args.keys} keys")
+    with tempfile.TemporaryDirectory() as tmp:
+        args.tmp = tmp
+        for kind in kinds:
+            print(_run(kind, args))
+
+
+if __name__ == "__main__":
+    main()
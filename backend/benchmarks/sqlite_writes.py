@@ -0,0 +1,110 @@
+"""
+SQLite fallback: write throughput with default vs tuned connections.
+
+    cd backend && python -m benchmarks.sqlite_writes [--writers 20] [--writes 50] [--readers 0]
+
+Builds the engines the app would (src.config.database) against a
+temporary database file, once with SQLITE_TUNED off and once on, and
+runs `writers` concurrent tasks of `writes` save_conversation calls each
+while `readers` tasks page through /chat/history. Reports writes/s,
+reads/s and "database is locked" failures. Readers share the event loop
+with the writers, so with readers on, compare total operations: WAL
+mostly shows up as more reads completing alongside the writes.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.config import database
+from src.config.settings import settings
+from src.database.crud import conversation_crud
+
+
+async def _workload(factory, writers: int, writes: int, readers: int):
+    done = asyncio.Event()
+    stats = {"writes": 0, "reads": 0, "locked": 0, "errors": 0}
+
+    async def writer(w: int):
+        for i in range(writes):
+            try:
+                async with factory() as db:
+                    await conversation_crud.save_conversation(
+                        db, session_id=f"bench-{w}", user_message=f"question {i}",
+                        assistant_response="answer " * 40,
+                    )
+                stats["writes"] += 1
+            except Exception as e:
+                stats["locked" if "locked" in str(e) else "errors"] += 1
+
+    async def reader():
+        while not done.is_set():
+            try:
+                async with factory() as db:
+                    await conversation_crud.get_conversations(db, limit=50)
+                stats["reads"] += 1
+            except Exception as e:
+                stats["locked" if "locked" in str(e) else "errors"] += 1
+            await asyncio.sleep(0)
+
+    reader_tasks = [asyncio.create_task(reader()) for _ in range(readers)]
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(w) for w in range(writers)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*reader_tasks)
+    return stats, elapsed
+
+
+async def _run(path: str, tuned: bool, args) -> str:
+    settings.sqlite_tuned = tuned
+    sync_engine = create_engine(f"sqlite:///{path}")
+    if tuned:
+        database._apply_sqlite_pragmas(sync_engine)
+    database.Base.metadata.create_all(sync_engine)
+
+    async_engine = database._build_async_engine(sync_engine)
+    # RoutingSession routes writes to the module's writer engine (None when untuned)
+    database.async_write_engine = database._build_async_write_engine(sync_engine)
+    factory = async_sessionmaker(
+        async_engine, class_=AsyncSession, sync_session_class=database.RoutingSession,
+        autoflush=False, expire_on_commit=False,
+    )
+    try:
+        stats, elapsed = await _workload(factory, args.writers, args.writes, args.readers)
+    finally:
+        await async_engine.dispose()
+        if database.async_write_engine is not None:
+            await database.async_write_engine.dispose()
+        database.async_write_engine = None
+        sync_engine.dispose()
+
+    return (
+        f"{'tuned' if tuned else 'default':8s} {stats['writes'] / elapsed:8.0f} writes/s "
+        f"{stats['reads'] / elapsed:8.0f} reads/s  locked={stats['locked']} errors={stats['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=0)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for tuned in (False, True):
+            path = os.path.join(tmp, f"bench-{'tuned' if tuned else 'default'}.db")
+            results.append(asyncio.run(_run(path, tuned, args)))
+    print(f"{args.writers} writers x {args.writes} writes, {args.readers} readers")
+    for line in results:
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+WebSocket backplane: cross-worker delivery between two running servers.
+
+    cd backend && python -m benchmarks.ws_backplane [--messages 50] [--backplane unix_socket|redis]
+
+Starts two single-worker servers (workers A and B) sharing a backplane,
+connects a socket to A following a session, then posts `messages` chats
+for that session to B and times how long each session_message takes to
+reach the socket on A, measured from when the POST is sent. It also checks that A's history cache drops the
+session when B writes to it. Chats are saved to the configured database
+under a throwaway session, which is deleted afterwards.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _start(port: int, env: dict, log_path: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=open(log_path, "w"), stderr=subprocess.STDOUT,
+    )
+
+
+async def _wait_healthy(client: httpx.AsyncClient, base: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base}/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{base} did not start; see the server logs")
+
+
+async def _bench(args, a: str, b: str, ws_url: str):
+    session = f"backplane-bench-{uuid.uuid4().hex[:8]}"
+    async with httpx.AsyncClient(timeout=30) as client, websockets.connect(ws_url, ping_interval=None) as ws:
+        await ws.send(json.dumps({"type": "chat", "message": "hello", "session_id": session}))
+        arrivals = asyncio.Queue()
+
+        async def reader():
+            async for frame in ws:
+                if json.loads(frame)["type"] == "session_message":
+                    arrivals.put_nowait(time.perf_counter())
+
+        task = asyncio.create_task(reader())
+        await asyncio.sleep(1)  # let the first exchange finish
+
+        latencies = []
+        for i in range(args.messages):
+            sent = time.perf_counter()
+            response = await client.post(f"{b}/chat", json={"message": f"ping {i}", "session_id": session})
+            response.raise_for_status()
+            try:
+                latencies.append((await asyncio.wait_for(arrivals.get(), 5) - sent) * 1000)
+            except asyncio.TimeoutError:
+                pass
+        task.cancel()
+
+        # History cache: A serves the session from cache, B writes, A must not serve the old tail
+        await client.get(f"{a}/chat/history/{session}/tail", params={"n": 100})
+        before = len((await client.get(f"{a}/chat/history/{session}", params={"limit": 500})).json()["messages"])
+        await client.post(f"{b}/chat", json={"message": "one more", "session_id": session})
+        await asyncio.sleep(0.2)
+        after = len((await client.get(f"{a}/chat/history/{session}", params={"limit": 500})).json()["messages"])
+        stats = (await client.get(f"{a}/system/history-cache")).json()
+        await client.delete(f"{a}/chat/history/{session}")
+
+    print(f"session_message from B to a socket on A: {len(latencies)}/{args.messages} delivered")
+    if latencies:
+        latencies.sort()
+        print(f"  latency from POST to frame on A: median {statistics.median(latencies):.2f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms, max {latencies[-1]:.2f} ms")
+    print(f"history on A after B's write: {before} -> {after} messages "
+          f"(remote invalidations on A: {stats['remote_invalidations']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765, help="worker A; B uses the next port")
+    parser.add_argument("--backplane", choices=("unix_socket", "redis"), default="unix_socket")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            WS_BACKPLANE=args.backplane,
+            WS_BACKPLANE_SOCKET_PATH=os.path.join(tmp, "ws.sock"),
+            WS_BACKPLANE_REDIS_URL=args.redis_url,
+            RATE_LIMIT_PER_MINUTE="1000000",
+            CHAT_RATE_LIMIT_PER_MINUTE="1000000",
+            LOG_SAMPLE_RATE="0",
+        )
+        a, b = (f"http://127.0.0.1:{port}/api/v1" for port in (args.port, args.port + 1))
+        servers = []
+
+        async def run():
+            async with httpx.AsyncClient() as client:
+                # One after the other: table creation at startup isn't safe to race
+                for port, base in ((args.port, a), (args.port + 1, b)):
+                    servers.append(_start(port, env, os.path.join(tmp, f"worker-{port}.log")))
+                    await _wait_healthy(client, base)
+            await _bench(args, a, b, f"ws://127.0.0.1:{args.port}/api/v1/ws")
+
+        try:
+            asyncio.run(run())
+        finally:
+            for server in servers:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+WebSocket codecs: frame size and encode/decode time, JSON vs MessagePack.
+
+    cd backend && python -m benchmarks.ws_codec [--frames 100000]
+
+Encodes and decodes a typical chat_response and system_metrics frame
+with the stdlib json module and with MsgpackCodec (type codes, epoch
+timestamps). MessagePack is skipped when the package isn't installed.
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+
+from src.services.ws_codec import MsgpackCodec, msgpack
+
+FRAMES = {
+    "chat_response": {
+        "type": "chat_response",
+        "request_id": "4f1c2a9b",
+        "data": {
+            "response": "Systems nominal, Sir. " * 12,
+            "session_id": "session-7d41e0",
+            "plugin_used": None,
+            "timestamp": datetime.now().isoformat(),
+        },
+        "meta": {
+            "trace_id": "5b8e0b7f2c4d4e6f8a9b0c1d2e3f4a5b",
+            "timing_ms": {"plugins": 0.42, "llm.generate": 812.6},
+        },
+    },
+    "system_metrics": {
+        "type": "system_metrics",
+        "data": {
+            "cpu_usage": 12.5,
+            "memory_usage": 41.3,
+            "disk_usage": 70.2,
+            "timestamp": datetime.now().isoformat(),
+        },
+    },
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--frames", type=int, default=100_000)
+    args = parser.parse_args()
+
+    n = args.frames
+    for name, message in FRAMES.items():
+        json_frame = json.dumps(message)
+        print(f"{name}:")
+        print(f"  json     {len(json_frame.encode()):4d} B  "
+              f"encode {timeit.timeit(lambda: json.dumps(message), number=n) / n * 1e6:.2f} us  "
+              f"decode {timeit.timeit(lambda: json.loads(json_frame), number=n) / n * 1e6:.2f} us")
+        if msgpack is not None:
+            packed = MsgpackCodec.encode(message)
+            print(f"  msgpack  {len(packed):4d} B  "
+                  f"encode {timeit.timeit(lambda: MsgpackCodec.encode(message), number=n) / n * 1e6:.2f} us  "
+                  f"decode {timeit.timeit(lambda: MsgpackCodec.decode(packed), number=n) / n * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config.database import get_async_db
+from src.database.analytics import as_stored, conversation_analytics
+
+router = APIRouter()
+
+
+def _resolve_range(start: Optional[datetime], end: Optional[datetime]):
+    """Default to the last 24 hours; rollups are stored in (naive) UTC."""
+    end = as_stored(end or datetime.now(timezone.utc))
+    start = as_stored(start) if start else end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return start, end
+
+
+@router.get("/conversations")
+async def conversation_volume(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    session_id: Optional[str] = None,
+    plugin: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Conversations per hour, answered from the hourly rollups."""
+    start, end = _resolve_range(start, end)
+    try:
+        buckets = await conversation_analytics.hourly_volume(
+            db, start, end, session_id=session_id, plugin_used=plugin,
+        )
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "total": sum(b["count"] for b in buckets),
+            "buckets": buckets,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/plugins")
+async def plugin_usage(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    session_id: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Usage per plugin (null = answered by the LLM), busiest first."""
+    start, end = _resolve_range(start, end)
+    try:
+        usage = await conversation_analytics.plugin_usage(
+            db, start, end, session_id=session_id,
+        )
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "plugins": usage,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,16 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Optional, List
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Optional, List
+from datetime import datetime
+import json
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.schemas import MessageRequest, MessageResponse, ConversationHistory
 from src.services.llm_service import llm_service
-from src.config.database import get_db
-from src.database.crud import conversation_crud
+from src.config.database import get_async_db, AsyncSessionLocal
+from src.core.responses import FastJSONResponse
+from src.core.tracing import span
+from src.database.crud import conversation_crud, MAX_SESSION_PAGE_SIZE
+from src.database.history_cache import session_history_cache
+from src.database.retention import conversation_archive
+from src.database.search import conversation_search
+from src.database.write_behind import conversation_writer
+from src.services.connection_manager import manager
 
 router = APIRouter()
 
 
 @router.post("", response_model=MessageResponse)
-async def chat_endpoint(request: MessageRequest, db: Session = Depends(get_db)):
+async def chat_endpoint(request: MessageRequest, db: AsyncSession = Depends(get_async_db)):
     """Process chat message and persist to database."""
     try:
         result = await llm_service.generate_response(
@@ -18,75 +29,228 @@ async def chat_endpoint(request: MessageRequest, db: Session = Depends(get_db)):
             session_id=request.session_id,
         )
 
-        # Persist conversation to database
+        # Persist conversation to database (queued when write-behind is on)
         try:
-            conversation_crud.save_conversation(
-                db=db,
-                session_id=result["session_id"],
-                user_message=request.message,
-                assistant_response=result["response"],
-                plugin_used=result.get("plugin_used"),
-            )
+            if conversation_writer.running:
+                with span("chat.enqueue"):
+                    await conversation_writer.enqueue(
+                        session_id=result["session_id"],
+                        user_message=request.message,
+                        assistant_response=result["response"],
+                        plugin_used=result.get("plugin_used"),
+                    )
+            else:
+                await conversation_crud.save_conversation(
+                    db=db,
+                    session_id=result["session_id"],
+                    user_message=request.message,
+                    assistant_response=result["response"],
+                    plugin_used=result.get("plugin_used"),
+                )
         except Exception as db_err:
             # Don't fail the chat if DB write fails
             print(f"[WARN] Failed to save conversation: {db_err}")
 
-        return MessageResponse(
-            response=result["response"],
-            session_id=result["session_id"],
-            plugin_used=result["plugin_used"],
+        # Sockets following this session, on any worker, see the exchange
+        await manager.announce_exchange(
+            result["session_id"], request.message, result["response"], result.get("plugin_used"),
         )
+
+        # Serialize here rather than via response_model so it shows up as a stage
+        with span("chat.serialize"):
+            body = MessageResponse(
+                response=result["response"],
+                session_id=result["session_id"],
+                plugin_used=result["plugin_used"],
+            ).model_dump_json()
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/history")
 async def get_conversation_history(
-    skip: int = 0,
     limit: int = 50,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Get recent conversation history."""
+    """
+    Get recent conversation history, newest first.
+
+    Keyset-paginated: pass the X-Next-Cursor header of one page as
+    `cursor` to fetch the next. The header is absent on the last page.
+    `skip` (offset paging) still works but is deprecated: it gets slower
+    the deeper the page, and pages shift when new messages arrive.
+    """
     try:
-        conversations = conversation_crud.get_conversations(db, skip=skip, limit=limit)
-        return [
-            {
-                "id": c.id,
-                "session_id": c.session_id,
-                "user_message": c.user_message,
-                "assistant_response": c.assistant_response,
-                "plugin_used": c.plugin_used,
-                "created_at": c.created_at.isoformat() if c.created_at else None,
-            }
-            for c in conversations
-        ]
+        conversations, next_cursor = await conversation_crud.get_conversations(
+            db, limit=limit, cursor=cursor, skip=skip
+        )
+        # Plain rows (datetimes included) go straight to the encoder
+        return FastJSONResponse(
+            [
+                {
+                    "id": c.id,
+                    "session_id": c.session_id,
+                    "user_message": c.user_message,
+                    "assistant_response": c.assistant_response,
+                    "plugin_used": c.plugin_used,
+                    "created_at": c.created_at,
+                }
+                for c in conversations
+            ],
+            headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/history/{session_id}")
-async def get_session_history(
-    session_id: str,
-    db: Session = Depends(get_db),
+@router.get("/search")
+async def search_conversations(
+    q: str,
+    session_id: Optional[str] = None,
+    plugin: Optional[str] = None,
+    limit: int = 20,
+    include_archived: bool = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Get all messages in a specific session."""
+    """
+    Full-text search over past messages and responses, best match first.
+
+    Backed by SQLite FTS5 or a MySQL FULLTEXT index. Each hit carries a
+    relevance score and snippets with matched terms in [brackets].
+    With include_archived, archived partitions in [start, end) are scanned
+    too (only the newest ARCHIVE_SEARCH_MAX_DAYS of them); those hits
+    follow the indexed ones and have a null score.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Search query is required")
+    limit = max(1, min(limit, conversation_search.MAX_RESULTS))
     try:
-        conversations = conversation_crud.get_by_session(db, session_id)
-        if not conversations:
-            return {"session_id": session_id, "messages": []}
-        return {
-            "session_id": session_id,
-            "messages": [
-                {
+        started = time.perf_counter()
+        results = await conversation_search.search(
+            db, q, session_id=session_id, plugin_used=plugin, limit=limit,
+        )
+        if include_archived and len(results) < limit:
+            results.extend(await conversation_search.search_archived(
+                conversation_archive, q, limit - len(results),
+                start=start, end=end, session_id=session_id, plugin_used=plugin,
+            ))
+        return FastJSONResponse({
+            "query": q,
+            "count": len(results),
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            "results": results,
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+async def export_conversations(
+    session_id: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    plugin: Optional[str] = None,
+    include_archived: bool = False,
+):
+    """
+    Stream conversation history as NDJSON (one JSON object per line).
+
+    Filters: session_id, start/end (ISO timestamps, end exclusive), plugin.
+    Rows are streamed from a server-side cursor, so memory use does not
+    depend on how much history is exported. With include_archived, matching
+    archived rows (always older) are streamed first.
+    """
+
+    async def generate() -> AsyncIterator[bytes]:
+        lines = []
+        if include_archived:
+            async for row in conversation_archive.aiter_rows(
+                start=start, end=end, session_id=session_id, plugin_used=plugin,
+            ):
+                row.pop("metadata", None)
+                lines.append(json.dumps(row))
+                if len(lines) >= 100:
+                    yield ("\n".join(lines) + "\n").encode()
+                    lines = []
+
+        # The session must live as long as the stream, not the request scope
+        async with AsyncSessionLocal() as db:
+            async for c in conversation_crud.stream_conversations(
+                db, session_id=session_id, start=start, end=end, plugin_used=plugin,
+            ):
+                lines.append(json.dumps({
                     "id": c.id,
+                    "session_id": c.session_id,
                     "user_message": c.user_message,
                     "assistant_response": c.assistant_response,
                     "plugin_used": c.plugin_used,
                     "created_at": c.created_at.isoformat() if c.created_at else None,
-                }
-                for c in conversations
-            ],
-        }
+                }))
+                if len(lines) >= 100:
+                    yield ("\n".join(lines) + "\n").encode()
+                    lines = []
+            if lines:
+                yield ("\n".join(lines) + "\n").encode()
+
+    filename = f"conversations-{session_id or 'all'}.ndjson"
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/history/{session_id}")
+async def get_session_history(
+    session_id: str,
+    limit: int = MAX_SESSION_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get messages in a specific session, oldest first, one page at a time."""
+    try:
+        # Small, fully cached sessions are answered without touching the DB,
+        # from messages serialized once per change to the session
+        if not cursor:
+            cached = session_history_cache.whole_session_json(session_id, limit)
+            if cached is not None:
+                return FastJSONResponse(
+                    {"session_id": session_id, "messages": cached, "next_cursor": None}
+                )
+
+        conversations, next_cursor = await conversation_crud.get_by_session(
+            db, session_id, limit=limit, cursor=cursor
+        )
+        if not conversations:
+            return {"session_id": session_id, "messages": [], "next_cursor": None}
+        return FastJSONResponse({
+            "session_id": session_id,
+            "messages": [conversation_crud.to_turn(c) for c in conversations],
+            "next_cursor": next_cursor,
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/history/{session_id}/tail")
+async def get_session_tail(
+    session_id: str,
+    n: int = 20,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get the last `n` messages of a session, oldest first (cached)."""
+    try:
+        messages = await conversation_crud.get_session_tail(db, session_id, n=n)
+        return FastJSONResponse({"session_id": session_id, "messages": messages})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -94,11 +258,11 @@ async def get_session_history(
 @router.delete("/history/{session_id}")
 async def delete_session_history(
     session_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Delete all messages in a session."""
     try:
-        count = conversation_crud.delete_by_session(db, session_id)
+        count = await conversation_crud.delete_by_session(db, session_id)
         return {"deleted": count, "session_id": session_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from src.core.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -27,12 +28,12 @@ async def get_plugins_list():
 @router.get("")
 async def list_all_plugins():
     """Get all plugins"""
-    return await get_plugins_list()
+    return FastJSONResponse(await get_plugins_list())
 
 @router.get("/")
 async def list_all_plugins_slash():
     """Get all plugins (with trailing slash)"""
-    return await get_plugins_list()
+    return FastJSONResponse(await get_plugins_list())
 
 @router.get("/{plugin_name}")
 async def get_plugin(plugin_name: str):
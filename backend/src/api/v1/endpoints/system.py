@@ -1,7 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 import psutil
 import platform
 from datetime import datetime
+from src.core.dependencies import require_admin
 
 router = APIRouter()
 
@@ -34,4 +35,109 @@ async def system_health():
             "system": "Unknown",
             "timestamp": datetime.now().isoformat(),
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+
+@router.get("/persistence")
+async def persistence_stats():
+    """Write-behind conversation queue depth and flush latency."""
+    from src.database.write_behind import conversation_writer
+    return conversation_writer.get_stats()
+
+
+@router.get("/db-metrics")
+async def db_metrics_stats():
+    """Connection pool usage, connection hold and connect times, and per-query latency."""
+    from src.database.instrumentation import db_metrics
+    return db_metrics.get_stats()
+
+
+@router.get("/event-loop", dependencies=[Depends(require_admin)])
+async def event_loop_stats():
+    """Event loop lag distribution and recent blocking call sites, with their stacks. Admin only."""
+    from src.core.loop_watchdog import loop_watchdog
+    return loop_watchdog.get_stats()
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10.0, gt=0, description="Sampling duration (capped by PROFILER_MAX_SECONDS)"),
+    interval_ms: float = Query(10.0, gt=0, description="Time between samples (floored at PROFILER_MIN_INTERVAL_MS)"),
+    tasks: bool = Query(True, description="Root event loop stacks at the running asyncio task"),
+):
+    """Sample all thread stacks and download them in collapsed (flamegraph) format. Admin only."""
+    from src.core.profiler import ProfilerBusy, sampling_profiler
+    try:
+        collapsed = await sampling_profiler.profile(seconds, interval_ms, tasks=tasks)
+    except ProfilerBusy as e:
+        raise HTTPException(
+            status_code=429, detail=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))}
+        )
+    filename = f"jarvis-profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+    return Response(
+        content=collapsed,
+        media_type="text/plain; charset=utf-8",
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Profile-Samples": str(sampling_profiler.last_run["samples"]),
+        },
+    )
+
+
+@router.get("/profile/status", dependencies=[Depends(require_admin)])
+async def profile_status():
+    """Profiler limits, cooldown and the last run's summary. Admin only."""
+    from src.core.profiler import sampling_profiler
+    return sampling_profiler.get_stats()
+
+
+@router.get("/websockets")
+async def websocket_stats():
+    """WebSocket connections, send queue depth and slow-consumer actions."""
+    from src.services.connection_manager import manager
+    return manager.get_stats()
+
+
+@router.post("/websockets/drain", dependencies=[Depends(require_admin)])
+async def drain_websockets():
+    """Stop admitting WebSockets and close open ones with 1001 after flushing. Admin only."""
+    from src.services.connection_manager import manager
+    closed = await manager.drain()
+    return {"closed": closed, **manager.get_stats()}
+
+
+@router.post("/websockets/resume", dependencies=[Depends(require_admin)])
+async def resume_websockets():
+    """Admit WebSockets again after a drain. Admin only."""
+    from src.services.connection_manager import manager
+    manager.resume()
+    return manager.get_stats()
+
+
+@router.get("/logging")
+async def logging_stats():
+    """Log sink queue depth, events written and events dropped."""
+    from src.middleware.logging_config import log_sink
+    return log_sink.get_stats()
+
+
+@router.get("/history-cache")
+async def history_cache_stats():
+    """Session history cache size, hit ratio and evictions."""
+    from src.database.history_cache import session_history_cache
+    return session_history_cache.get_stats()
+
+
+@router.get("/retention")
+async def retention_stats():
+    """Retention settings and archival progress."""
+    from src.database.retention import retention_manager
+    return retention_manager.get_stats()
+
+
+@router.post("/retention/run", dependencies=[Depends(require_admin)])
+async def run_retention():
+    """Archive conversations older than the hot window now."""
+    from src.database.retention import retention_manager
+    moved = await retention_manager.run_once()
+    return {"archived": moved, **retention_manager.get_stats()}
@@ -1,78 +1,158 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List, Dict
+from typing import Dict, List, Optional
 import json
 import asyncio
-import psutil
+import base64
+import binascii
+import time
+import uuid
 from datetime import datetime
+from src.config.settings import settings
+from src.core.metrics import count_ws_message
+from src.core.tracing import end_trace, start_trace
+from src.services.connection_manager import manager
 from src.services.llm_service import llm_service
+from src.services.streaming_stt import StreamingSTTSession
+from src.services.topics import topics
+from src.services.ws_codec import MSGPACK_SUBPROTOCOL, TYPE_CODES, JsonCodec
 
 router = APIRouter()
 
+# Client message types, used as metric labels (anything else counts as "unknown")
+CLIENT_MESSAGE_TYPES = {
+    "chat", "cancel", "subscribe", "unsubscribe", "stt_start", "stt_chunk", "stt_stop", "ping", "pong",
+}
 
-class ConnectionManager:
-    """Manages active WebSocket connections for real-time communication."""
 
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self._metrics_task: asyncio.Task = None
+async def _process_chat(websocket: WebSocket, message: str, session_id: str = None, request_id: str = None):
+    """
+    Run one chat exchange and send the response back on the socket.
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"[OK] WebSocket client connected. Total: {len(self.active_connections)}")
+    Every message sent for the exchange carries its `request_id`. The
+    exchange is traced; chat_response carries the stage durations in
+    `meta` (the WebSocket counterpart of the Server-Timing header).
+    """
+    trace, token = start_trace("WS chat", session_id=session_id or "", request_id=request_id or "")
+    try:
+        # Acknowledge receipt
+        await manager.send_personal({
+            "type": "chat_processing",
+            "request_id": request_id,
+            "data": {"message": message}
+        }, websocket)
 
-        # Start metrics broadcasting if this is the first connection
-        if len(self.active_connections) == 1 and self._metrics_task is None:
-            self._metrics_task = asyncio.create_task(self._broadcast_metrics_loop())
+        # Generate AI response
+        try:
+            result = await llm_service.generate_response(
+                message=message,
+                session_id=session_id
+            )
+            await manager.send_personal({
+                "type": "chat_response",
+                "request_id": request_id,
+                "data": {
+                    "response": result["response"],
+                    "session_id": result["session_id"],
+                    "plugin_used": result.get("plugin_used"),
+                    "timestamp": datetime.now().isoformat(),
+                },
+                "meta": {
+                    "trace_id": trace.trace_id,
+                    "timing_ms": trace.stage_durations(),
+                },
+            }, websocket)
+            # Later exchanges in this session (from any client or worker) reach this socket too
+            manager.bind_session(websocket, result["session_id"])
+            await manager.announce_exchange(
+                result["session_id"], message, result["response"], result.get("plugin_used"),
+                exclude=websocket,
+            )
+        except Exception as e:
+            await manager.send_personal({
+                "type": "error",
+                "request_id": request_id,
+                "data": {"message": f"AI processing error: {str(e)}"}
+            }, websocket)
+    except asyncio.CancelledError:
+        trace.root.attributes["cancelled"] = True
+        if manager.is_connected(websocket):
+            await manager.send_personal({
+                "type": "chat_cancelled",
+                "request_id": request_id,
+                "data": {"timestamp": datetime.now().isoformat()}
+            }, websocket)
+        raise
+    finally:
+        end_trace(trace, token)
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        print(f"[X] WebSocket client disconnected. Total: {len(self.active_connections)}")
 
-        # Stop metrics broadcasting if no clients remain
-        if len(self.active_connections) == 0 and self._metrics_task is not None:
-            self._metrics_task.cancel()
-            self._metrics_task = None
+class ChatTasks:
+    """
+    In-flight chat exchanges of one WebSocket connection.
 
-    async def send_personal(self, message: dict, websocket: WebSocket):
-        try:
-            await websocket.send_json(message)
-        except Exception:
-            self.disconnect(websocket)
+    Each chat runs as its own task, keyed by request ID, so the receive loop
+    keeps reading (pings, cancels, audio, further questions) while answers
+    are generated. At most `limit` chats run at once per connection.
+    """
 
-    async def broadcast(self, message: dict):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
-        for conn in disconnected:
-            self.disconnect(conn)
+    def __init__(self, websocket: WebSocket, limit: int):
+        self.websocket = websocket
+        self.limit = limit
+        self.tasks: Dict[str, asyncio.Task] = {}
 
-    async def _broadcast_metrics_loop(self):
-        """Push system metrics to all clients every 3 seconds."""
-        try:
-            while True:
-                if not self.active_connections:
-                    break
-                metrics = {
-                    "type": "system_metrics",
-                    "data": {
-                        "cpu_usage": psutil.cpu_percent(interval=0),
-                        "memory_usage": psutil.virtual_memory().percent,
-                        "disk_usage": psutil.disk_usage('/').percent,
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                }
-                await self.broadcast(metrics)
-                await asyncio.sleep(3)
-        except asyncio.CancelledError:
-            pass
+    def submit(self, message: str, session_id: str = None, request_id: str = None) -> Optional[str]:
+        """Start a chat; returns the reason it was refused, or None."""
+        if request_id in self.tasks:
+            return f"Request {request_id} is already in progress."
+        if len(self.tasks) >= self.limit:
+            return f"Too many requests in progress (max {self.limit}). Wait or cancel one."
+        task = asyncio.create_task(
+            _process_chat(self.websocket, message, session_id, request_id),
+            name=f"ws-chat:{request_id}",
+        )
+        self.tasks[request_id] = task
+        task.add_done_callback(lambda _: self.tasks.pop(request_id, None))
+        return None
+
+    def cancel(self, request_id: str) -> bool:
+        task = self.tasks.get(request_id)
+        if task is None:
+            return False
+        task.cancel()
+        return True
 
+    async def cancel_all(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
-manager = ConnectionManager()
+
+def _start_stt_session(websocket: WebSocket, data: dict, chats: ChatTasks) -> StreamingSTTSession:
+    """
+    Create a streaming STT session whose final transcripts feed the chat.
+
+    Raises ValueError if the client asked for an unsupported sample rate.
+    """
+    session_id = data.get("session_id")
+    auto_chat = data.get("auto_chat", True)
+
+    async def emit(event_type: str, payload: dict):
+        await manager.send_personal({"type": event_type, "data": payload}, websocket)
+
+    async def on_final(text: str):
+        if auto_chat:
+            request_id = f"stt-{uuid.uuid4().hex[:8]}"
+            refused = chats.submit(text, session_id, request_id)
+            if refused:
+                await emit("error", {"message": refused})
+
+    return StreamingSTTSession(
+        emit=emit,
+        on_final=on_final,
+        sample_rate=data.get("sample_rate"),
+        language=data.get("language", "en-US"),
+    )
 
 
 @router.websocket("/ws")
@@ -80,34 +160,114 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time bidirectional communication.
 
-    Client sends: { "type": "chat", "message": "Hello JARVIS" }
-    Server sends: { "type": "chat_response", "data": { "response": "...", ... } }
+    Client sends: { "type": "chat", "id": "r1", "message": "Hello JARVIS" }
+    Server sends: { "type": "chat_processing", "request_id": "r1", ... }
+    Server sends: { "type": "chat_response", "request_id": "r1", "data": { "response": "...", ... } }
     Server pushes: { "type": "system_metrics", "data": { "cpu_usage": ..., ... } }
+                   (every 3s, only until the client subscribes to a topic)
+
+    Chats run concurrently (up to WS_MAX_CONCURRENT_CHATS per connection)
+    and responses may arrive out of order; match them by request_id. If
+    "id" is omitted the server assigns one (see chat_processing).
+        Client sends: { "type": "cancel", "id": "r1" }
+        Server sends: { "type": "chat_cancelled", "request_id": "r1" }
+
+    Session following: a socket that chatted in a session (or passed its
+    "session_id") is told about that session's other exchanges, whether
+    made over REST or another socket, on any worker (see WS_BACKPLANE):
+        Server pushes: { "type": "session_message", "data": { "session_id": ...,
+                         "user_message": ..., "assistant_response": ..., ... } }
+
+    Topic subscriptions (metrics, device_state, reminders):
+        Client sends: { "type": "subscribe", "topic": "metrics", "interval_ms": 1000 }
+        Server sends: { "type": "subscribed", "data": { "topic": "metrics", "interval_ms": 1000 } }
+        Server sends: { "type": "topic_update", "topic": "metrics", "version": 7,
+                        "keyframe": true, "data": { ...full state... } }
+        Server sends: { "type": "topic_update", "topic": "metrics", "version": 9, "base": 7,
+                        "data": { ...changed keys... }, "removed": [ ...deleted keys... ] }
+        Updates are only sent when the state changed, plus a keyframe every
+        WS_KEYFRAME_INTERVAL_SECONDS. Apply a delta only if "base" is the
+        version you hold; otherwise wait for the next keyframe, which follows.
+        Client sends: { "type": "unsubscribe", "topic": "metrics" }
+
+    Heartbeats:
+        Server sends: { "type": "heartbeat", ... } to connections quiet for
+                      WS_HEARTBEAT_INTERVAL_SECONDS
+        Client sends: { "type": "pong" } (any message counts as a sign of life)
+        Clients silent for WS_IDLE_TIMEOUT_SECONDS are closed with 1000.
+
+    Binary protocol: offer the "jarvis.msgpack.v1" subprotocol to exchange
+    MessagePack frames instead (see services/ws_codec): "type" becomes a
+    numeric "t" (the table is sent in `connected`), timestamps are epoch
+    seconds and stt_chunk "audio" is raw bytes. Clients that don't offer it
+    keep JSON text frames.
+        Handshakes over WS_MAX_CONNECTIONS / WS_MAX_CONNECTIONS_PER_IP, or
+        while the server drains, are refused; draining closes with 1001.
+
+    Streaming speech recognition:
+        Client sends: { "type": "stt_start", "sample_rate": 16000, "language": "en-US" }
+        Client sends: binary frames of 16-bit mono PCM
+                      (or { "type": "stt_chunk", "audio": "<base64 PCM>" })
+        Client sends: { "type": "stt_stop" }
+        Server sends: stt_speech_start, stt_partial { text }, stt_final { text, ... }
+        Each final transcript is answered as a chat message unless
+        "auto_chat": false was given in stt_start. sample_rate must be one of
+        8000, 16000, 24000 or 48000, else stt_error { message } is sent and
+        no stream is started.
     """
-    await manager.connect(websocket)
+    conn = await manager.connect(websocket)
+    if conn is None:
+        return
+    stt_session: StreamingSTTSession = None
+    stopped_stt: List[StreamingSTTSession] = []  # stopped, last final still recognizing
+    chats = ChatTasks(websocket, settings.ws_max_concurrent_chats)
 
     # Send welcome message
-    await manager.send_personal({
-        "type": "connected",
-        "data": {
-            "message": "WebSocket connection established. J.A.R.V.I.S. real-time link active.",
-            "timestamp": datetime.now().isoformat(),
-        }
-    }, websocket)
+    welcome = {
+        "message": "WebSocket connection established. J.A.R.V.I.S. real-time link active.",
+        "protocol": conn.codec.name,
+        "timestamp": datetime.now().isoformat(),
+    }
+    if conn.codec is not JsonCodec:
+        welcome["subprotocol"] = MSGPACK_SUBPROTOCOL
+        welcome["type_codes"] = TYPE_CODES
+    await manager.send_personal({"type": "connected", "data": welcome}, websocket)
 
     try:
         while True:
-            raw = await websocket.receive_text()
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            conn.last_seen = time.monotonic()
+
+            # For JSON clients, binary frames carry PCM audio for the active STT session
+            if frame.get("bytes") is not None and not conn.codec.binary:
+                count_ws_message("in", "audio")
+                if stt_session is None:
+                    await manager.send_personal({
+                        "type": "error",
+                        "data": {"message": "No active speech stream. Send stt_start first."}
+                    }, websocket)
+                else:
+                    await stt_session.feed(frame["bytes"])
+                continue
+
             try:
-                data = json.loads(raw)
-            except json.JSONDecodeError:
+                if frame.get("bytes") is not None:
+                    data = conn.codec.decode(frame["bytes"])
+                else:
+                    data = json.loads(frame.get("text") or "")
+                if not isinstance(data, dict):
+                    raise ValueError("not an object")
+            except Exception:
                 await manager.send_personal({
                     "type": "error",
-                    "data": {"message": "Invalid JSON payload."}
+                    "data": {"message": f"Invalid {'MessagePack' if frame.get('bytes') is not None else 'JSON'} payload."}
                 }, websocket)
                 continue
 
             msg_type = data.get("type", "")
+            count_ws_message("in", msg_type if isinstance(msg_type, str) and msg_type in CLIENT_MESSAGE_TYPES else "unknown")
 
             if msg_type == "chat":
                 message = data.get("message", "").strip()
@@ -118,32 +278,105 @@ async def websocket_endpoint(websocket: WebSocket):
                     }, websocket)
                     continue
 
-                # Acknowledge receipt
+                request_id = data.get("id")
+                if request_id is None:
+                    request_id = uuid.uuid4().hex[:8]
+                request_id = str(request_id)
+                if isinstance(data.get("session_id"), str):
+                    manager.bind_session(websocket, data["session_id"])
+                refused = chats.submit(message, data.get("session_id"), request_id)
+                if refused:
+                    await manager.send_personal({
+                        "type": "error",
+                        "request_id": request_id,
+                        "data": {"message": refused}
+                    }, websocket)
+
+            elif msg_type == "cancel":
+                request_id = str(data.get("id"))
+                if not chats.cancel(request_id):
+                    await manager.send_personal({
+                        "type": "error",
+                        "request_id": request_id,
+                        "data": {"message": f"No request {request_id} in progress."}
+                    }, websocket)
+
+            elif msg_type in ("subscribe", "unsubscribe"):
+                topic = data.get("topic")
+                if not isinstance(topic, str) or topic not in topics:
+                    await manager.send_personal({
+                        "type": "error",
+                        "data": {"message": f"Unknown topic: {topic}. Available: {', '.join(topics)}"}
+                    }, websocket)
+                    continue
+                if msg_type == "subscribe":
+                    interval = manager.subscribe(websocket, topic, data.get("interval_ms"))
+                    await manager.send_personal({
+                        "type": "subscribed",
+                        "data": {"topic": topic, "interval_ms": interval}
+                    }, websocket)
+                else:
+                    manager.unsubscribe(websocket, topic)
+                    await manager.send_personal({
+                        "type": "unsubscribed",
+                        "data": {"topic": topic}
+                    }, websocket)
+
+            elif msg_type == "stt_start":
+                if stt_session is not None:
+                    session, stt_session = stt_session, None
+                    await session.close()
+                try:
+                    stt_session = _start_stt_session(websocket, data, chats)
+                except ValueError as e:
+                    await manager.send_personal({
+                        "type": "stt_error",
+                        "data": {"message": str(e)}
+                    }, websocket)
+                    continue
+                if isinstance(data.get("session_id"), str):
+                    manager.bind_session(websocket, data["session_id"])
                 await manager.send_personal({
-                    "type": "chat_processing",
-                    "data": {"message": message}
+                    "type": "stt_started",
+                    "data": {
+                        "sample_rate": stt_session.sample_rate,
+                        "language": stt_session.language,
+                    }
                 }, websocket)
 
-                # Generate AI response
-                try:
-                    result = await llm_service.generate_response(
-                        message=message,
-                        session_id=data.get("session_id")
-                    )
+            elif msg_type == "stt_chunk":
+                if stt_session is None:
                     await manager.send_personal({
-                        "type": "chat_response",
-                        "data": {
-                            "response": result["response"],
-                            "session_id": result["session_id"],
-                            "plugin_used": result.get("plugin_used"),
-                            "timestamp": datetime.now().isoformat(),
-                        }
+                        "type": "error",
+                        "data": {"message": "No active speech stream. Send stt_start first."}
                     }, websocket)
-                except Exception as e:
+                    continue
+                try:
+                    audio = data.get("audio", "")
+                    chunk = audio if isinstance(audio, bytes) else base64.b64decode(audio)
+                except (binascii.Error, ValueError, TypeError):
                     await manager.send_personal({
                         "type": "error",
-                        "data": {"message": f"AI processing error: {str(e)}"}
+                        "data": {"message": "Invalid base64 audio chunk."}
                     }, websocket)
+                    continue
+                await stt_session.feed(chunk)
+
+            elif msg_type == "stt_stop":
+                if stt_session is not None:
+                    session, stt_session = stt_session, None
+                    await session.finish()
+                    # Its last final is still delivered; cancelled if the socket closes first
+                    stopped_stt = [s for s in stopped_stt if s.busy]
+                    if session.busy:
+                        stopped_stt.append(session)
+                await manager.send_personal({
+                    "type": "stt_stopped",
+                    "data": {"timestamp": datetime.now().isoformat()}
+                }, websocket)
+
+            elif msg_type == "pong":
+                pass  # heartbeat reply; last_seen is already updated
 
             elif msg_type == "ping":
                 await manager.send_personal({
@@ -162,3 +395,8 @@ async def websocket_endpoint(websocket: WebSocket):
     except Exception as e:
         print(f"WebSocket error: {e}")
         manager.disconnect(websocket)
+    finally:
+        for session in [stt_session, *stopped_stt]:
+            if session is not None:
+                await session.close()
+        await chats.cancel_all()
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from .endpoints import chat, speech, skills, system, plugins, websocket
+from .endpoints import chat, speech, skills, system, plugins, websocket, analytics
 
 api_router = APIRouter()
 
@@ -8,4 +8,5 @@ api_router.include_router(speech.router, prefix="/speech", tags=["speech"])
 api_router.include_router(skills.router, prefix="/skills", tags=["skills"])
 api_router.include_router(system.router, prefix="/system", tags=["system"])
 api_router.include_router(plugins.router, prefix="/plugins", tags=["plugins"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 api_router.include_router(websocket.router, tags=["websocket"])
@@ -1,6 +1,10 @@
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from typing import AsyncGenerator
 from src.config.settings import settings
+from src.database.instrumentation import db_metrics
 import os
 
 Base = declarative_base()
@@ -20,7 +24,7 @@ def _build_engine():
                 pool_recycle=300,
                 pool_size=settings.database_pool_size,
                 max_overflow=settings.database_max_overflow,
-                echo=(settings.environment == "development"),
+                echo=settings.database_echo,
             )
             # Quick connectivity check
             with engine.connect() as conn:
@@ -38,20 +42,143 @@ def _build_engine():
     engine = create_engine(
         sqlite_url,
         connect_args={"check_same_thread": False},
-        echo=(settings.environment == "development"),
+        echo=settings.database_echo,
     )
+    if settings.sqlite_tuned:
+        _apply_sqlite_pragmas(engine)
     print(f"[OK] Using SQLite database: {sqlite_path}")
     return engine
 
 
+def _apply_sqlite_pragmas(engine):
+    """
+    Tune every new SQLite connection for concurrent use.
+
+    WAL lets readers run alongside the writer, synchronous=NORMAL drops the
+    fsync on every commit (still durable at checkpoints under WAL), and the
+    busy timeout makes competing writers wait instead of failing with
+    "database is locked".
+    """
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_mb * 1024)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_mb * 1024 * 1024)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+def _build_async_engine(sync_engine):
+    """
+    Create the async engine for request handlers.
+
+    Reuses the backend that _build_engine settled on (MySQL or the SQLite
+    fallback) so both engines always point at the same database.
+    """
+    url = sync_engine.url
+
+    if url.get_backend_name() == "mysql":
+        async_engine = create_async_engine(
+            url.set(drivername="mysql+aiomysql"),
+            pool_pre_ping=True,
+            pool_recycle=300,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            echo=settings.database_echo,
+        )
+        print("[OK] Async MySQL engine ready (aiomysql)")
+        return async_engine
+
+    if not settings.sqlite_tuned:
+        async_engine = create_async_engine(
+            url.set(drivername="sqlite+aiosqlite"),
+            echo=settings.database_echo,
+        )
+        print("[OK] Async SQLite engine ready (aiosqlite)")
+        return async_engine
+
+    # Tuned mode: this engine only serves reads; see _build_async_write_engine
+    async_engine = create_async_engine(
+        url.set(drivername="sqlite+aiosqlite"),
+        pool_size=settings.sqlite_reader_pool_size,
+        max_overflow=settings.sqlite_reader_pool_size,
+        echo=settings.database_echo,
+    )
+    _apply_sqlite_pragmas(async_engine.sync_engine)
+    print(f"[OK] Async SQLite engine ready (aiosqlite, WAL, {settings.sqlite_reader_pool_size} pooled readers)")
+    return async_engine
+
+
+def _build_async_write_engine(sync_engine):
+    """
+    Dedicated single-connection engine for SQLite writes (tuned mode only).
+
+    SQLite allows one writer at a time; funnelling every write through one
+    pooled connection queues writers in-process instead of having them
+    contend for the file lock. Returns None when not applicable.
+    """
+    url = sync_engine.url
+    if url.get_backend_name() != "sqlite" or not settings.sqlite_tuned:
+        return None
+
+    write_engine = create_async_engine(
+        url.set(drivername="sqlite+aiosqlite"),
+        pool_size=1,
+        max_overflow=0,
+        echo=settings.database_echo,
+    )
+    _apply_sqlite_pragmas(write_engine.sync_engine)
+    return write_engine
+
+
+class RoutingSession(Session):
+    """Routes flushes and INSERT/UPDATE/DELETE to the SQLite writer, reads to the pool."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if async_write_engine is not None and (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            # ORM bulk INSERT/UPDATE asks for a connection by mapper alone
+            or (clause is None and mapper is not None)
+        ):
+            return async_write_engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
 engine = _build_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = _build_async_engine(engine)
+async_write_engine = _build_async_write_engine(engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+db_metrics.instrument(engine, "sync")
+db_metrics.instrument(async_engine.sync_engine, "async")
+if async_write_engine is not None:
+    db_metrics.instrument(async_write_engine.sync_engine, "async_writer")
+
 
 def init_db():
     """Create all tables. Safe to call multiple times."""
     from src.models import database_models  # noqa: F401
     Base.metadata.create_all(bind=engine)
+
+    # create_all skips existing tables, so add any indexes introduced later
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+    from src.database.search import ensure_search_index
+    ensure_search_index(engine)
     print("[OK] Database tables created / verified")
 
 
@@ -61,4 +188,18 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency: yields an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_engines():
+    """Close pooled connections on shutdown."""
+    await async_engine.dispose()
+    if async_write_engine is not None:
+        await async_write_engine.dispose()
+    engine.dispose()
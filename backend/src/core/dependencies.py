@@ -1,6 +1,10 @@
-from typing import Generator
+import hmac
+from fastapi import Header, HTTPException
+from typing import AsyncGenerator, Generator, Optional
 from sqlalchemy.orm import Session
-from src.config.database import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.config.database import SessionLocal, AsyncSessionLocal
+from src.config.settings import settings
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -10,4 +14,20 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function that yields async db sessions
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Dependency guarding admin endpoints with the ADMIN_TOKEN setting
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
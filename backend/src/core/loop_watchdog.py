@@ -0,0 +1,178 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as TallyCounter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional
+import structlog
+from prometheus_client import Counter, Histogram as PromHistogram
+from src.config.settings import settings
+from src.core.metrics import Histogram
+
+logger = structlog.get_logger("jarvis.loop")
+
+EVENT_LOOP_LAG = PromHistogram(
+    "jarvis_event_loop_lag_seconds",
+    "Delay between when a loop callback was due and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+EVENT_LOOP_STALLS = Counter(
+    "jarvis_event_loop_stalls_total",
+    "Times the event loop was blocked past the watchdog threshold",
+)
+
+# Frames under this directory are "ours"; the first one up from the top of
+# the blocked stack is reported as the offending call site.
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STACK_DEPTH = 25
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop scheduling lag and catches code that blocks the loop.
+
+    A heartbeat task sleeps `interval` and records how late it woke up. A
+    monitor thread checks that heartbeat; once it is `threshold` overdue the
+    loop is blocked, so the thread snapshots the loop thread's stack with
+    sys._current_frames() while the blocking call is still on it. Each stall
+    is logged with its call site and stack, counted per call site, and its
+    final duration is filled in when the loop recovers.
+    """
+
+    def __init__(self):
+        self.enabled = settings.loop_watchdog_enabled
+        self.interval = settings.loop_watchdog_interval_ms / 1000
+        self.threshold = settings.loop_lag_threshold_ms / 1000
+
+        self.lag_ms = Histogram()
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=50)
+        self.call_sites: TallyCounter = TallyCounter()
+        self.stall_count = 0
+
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._open_stall: Optional[Dict[str, Any]] = None
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        print(f"[OK] Event loop watchdog active (threshold {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    # ------------------------------------------------------------------
+    # Loop side
+    # ------------------------------------------------------------------
+
+    async def _heartbeat(self):
+        while True:
+            due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            lag = max(0.0, now - due)
+            EVENT_LOOP_LAG.observe(lag)
+            self.lag_ms.observe(lag * 1000)
+
+            stall = self._open_stall
+            if stall is not None:
+                self._open_stall = None
+                stall["duration_ms"] = round(lag * 1000, 1)
+                logger.warning(
+                    "event_loop_stall_ended",
+                    duration_ms=stall["duration_ms"],
+                    call_site=stall["call_site"],
+                )
+
+    # ------------------------------------------------------------------
+    # Monitor thread
+    # ------------------------------------------------------------------
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval / 2):
+            overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue >= self.threshold and self._open_stall is None:
+                self._capture(overdue)
+
+    def _capture(self, overdue: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)[-_STACK_DEPTH:]
+        del frame
+
+        site = next(
+            (f for f in reversed(stack) if f.filename.startswith(_SRC_DIR)),
+            stack[-1] if stack else None,
+        )
+        leaf = stack[-1] if stack else None
+        stall = {
+            "detected_at": datetime.now(timezone.utc).isoformat(),
+            "blocked_for_ms": round(overdue * 1000, 1),
+            "duration_ms": None,  # filled in when the loop recovers
+            "call_site": self._describe(site),
+            "blocking_call": self._describe(leaf),
+            "stack": [self._describe(f) for f in stack],
+        }
+        self._open_stall = stall
+        self.stalls.append(stall)
+        self.call_sites[stall["call_site"]] += 1
+        self.stall_count += 1
+        EVENT_LOOP_STALLS.inc()
+        logger.warning(
+            "event_loop_blocked",
+            blocked_for_ms=stall["blocked_for_ms"],
+            call_site=stall["call_site"],
+            blocking_call=stall["blocking_call"],
+            frames=stall["stack"][-8:],
+        )
+
+    @staticmethod
+    def _describe(frame: Optional[traceback.FrameSummary]) -> str:
+        if frame is None:
+            return "unknown"
+        filename = frame.filename
+        if filename.startswith(_SRC_DIR):
+            filename = "src" + filename[len(_SRC_DIR):]
+        return f"{filename}:{frame.lineno} in {frame.name}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "lag_ms": self.lag_ms.snapshot(),
+            "stalls": self.stall_count,
+            "top_call_sites": [
+                {"call_site": site, "stalls": n} for site, n in self.call_sites.most_common(10)
+            ],
+            "recent_stalls": list(self.stalls)[-10:],
+        }
+
+
+# Global instance
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,291 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Sequence, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client import Histogram as PromHistogram
+
+# Default latency buckets in milliseconds (upper bounds; +Inf is implicit)
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """
+    Minimal fixed-bucket histogram for in-process latency tracking.
+
+    observe() is O(log buckets) and lock-protected, so it can be fed from
+    worker threads (e.g. SQLAlchemy events under run_in_executor) as well
+    as the event loop.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Cumulative bucket counts (Prometheus style) plus count/sum/avg/max."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count, peak = self._sum, self._count, self._max
+
+        cumulative, running = {}, 0
+        for bound, n in zip(list(self.buckets) + ["+Inf"], counts):
+            running += n
+            cumulative[str(bound)] = running
+        return {
+            "count": count,
+            "sum": round(total, 3),
+            "avg": round(total / count, 3) if count else 0.0,
+            "max": round(peak, 3),
+            "buckets": cumulative,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Prometheus metrics
+# ---------------------------------------------------------------------------
+# Served at GET /metrics. For several workers, start the server with
+# PROMETHEUS_MULTIPROC_DIR pointing at an empty directory: every worker then
+# writes its samples there and /metrics aggregates them across processes.
+
+PROMETHEUS_MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+REQUEST_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_REQUEST_DURATION = PromHistogram(
+    "jarvis_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=REQUEST_BUCKETS_S,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "jarvis_http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+WEBSOCKET_CONNECTIONS = Gauge(
+    "jarvis_websocket_connections",
+    "Open WebSocket connections",
+    multiprocess_mode="livesum",
+)
+WEBSOCKET_MESSAGES = Counter(
+    "jarvis_websocket_messages_total",
+    "WebSocket messages by direction and type",
+    ["direction", "type"],
+)
+WEBSOCKET_SLOW_CONSUMERS = Counter(
+    "jarvis_websocket_slow_consumer_total",
+    "Send queue overflows by action taken (dropped message or disconnected client)",
+    ["action"],
+)
+WEBSOCKET_REJECTED = Counter(
+    "jarvis_websocket_rejected_total",
+    "WebSocket handshakes refused by admission control",
+    ["reason"],
+)
+WEBSOCKET_REAPED = Counter(
+    "jarvis_websocket_reaped_total",
+    "WebSocket connections closed by the server's heartbeat checks",
+    ["reason"],
+)
+PLUGIN_ROUTING_DURATION = PromHistogram(
+    "jarvis_plugin_routing_seconds",
+    "Time to find the plugin for a message (can_handle checks)",
+    ["outcome"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+PLUGIN_HANDLE_DURATION = PromHistogram(
+    "jarvis_plugin_handle_seconds",
+    "Plugin handle() latency",
+    ["plugin"],
+    buckets=REQUEST_BUCKETS_S,
+)
+PLUGIN_ERRORS = Counter(
+    "jarvis_plugin_errors_total",
+    "Exceptions raised by plugins",
+    ["plugin"],
+)
+UPSTREAM_DURATION = PromHistogram(
+    "jarvis_upstream_request_duration_seconds",
+    "Latency of calls to LLM, TTS and STT providers",
+    ["upstream", "operation"],
+    buckets=REQUEST_BUCKETS_S,
+)
+UPSTREAM_ERRORS = Counter(
+    "jarvis_upstream_errors_total",
+    "Failed calls to LLM, TTS and STT providers",
+    ["upstream", "operation"],
+)
+DB_STATEMENT_DURATION = PromHistogram(
+    "jarvis_db_statement_duration_seconds",
+    "SQL statement latency by engine and CRUD method",
+    ["engine", "operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_SLOW_QUERIES = Counter(
+    "jarvis_db_slow_queries_total",
+    "Statements slower than DB_SLOW_QUERY_MS",
+    ["engine", "operation"],
+)
+DB_CONNECTION_HELD = PromHistogram(
+    "jarvis_db_connection_held_seconds",
+    "Time a pooled connection stays checked out",
+    ["engine"],
+    buckets=REQUEST_BUCKETS_S,
+)
+DB_CHECKOUT_WAIT = PromHistogram(
+    "jarvis_db_checkout_wait_seconds",
+    "Time from asking the pool for a connection to getting one (queueing plus any connect)",
+    ["engine"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_CONNECT_DURATION = PromHistogram(
+    "jarvis_db_connect_duration_seconds",
+    "Time to open a new DBAPI connection",
+    ["engine"],
+    buckets=REQUEST_BUCKETS_S,
+)
+DB_CONNECTIONS_CHECKED_OUT = Gauge(
+    "jarvis_db_connections_checked_out",
+    "Pooled connections currently checked out",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_EVENTS = Counter(
+    "jarvis_db_pool_events_total",
+    "Pool and connection events (checkouts, connects, invalidations, pre-ping failures, statement errors)",
+    ["engine", "event"],
+)
+
+
+class _LabelCache(dict):
+    """label values -> metric child, so the hot path skips labels() lookups."""
+
+    def __init__(self, metric):
+        super().__init__()
+        self.metric = metric
+
+    def __missing__(self, key):
+        child = self[key] = self.metric.labels(*key)
+        return child
+
+
+_http_duration = _LabelCache(HTTP_REQUEST_DURATION)
+_ws_messages = _LabelCache(WEBSOCKET_MESSAGES)
+_upstream_duration = _LabelCache(UPSTREAM_DURATION)
+_upstream_errors = _LabelCache(UPSTREAM_ERRORS)
+_plugin_duration = _LabelCache(PLUGIN_HANDLE_DURATION)
+_plugin_errors = _LabelCache(PLUGIN_ERRORS)
+_plugin_routing = _LabelCache(PLUGIN_ROUTING_DURATION)
+_db_statements = _LabelCache(DB_STATEMENT_DURATION)
+
+
+def route_template(scope: Dict[str, Any]) -> str:
+    """
+    Matched path with path parameter values put back as {name}.
+
+    Built from the request rather than scope["route"], whose path may be
+    relative to an included router depending on the FastAPI version.
+    """
+    if scope.get("endpoint") is None:
+        return "unmatched"
+    path = scope["path"]
+    params = scope.get("path_params")
+    if not params:
+        return path
+    segments = path.split("/")
+    for name, value in params.items():
+        value = str(value)
+        for i in range(len(segments) - 1, -1, -1):
+            if segments[i] == value:
+                segments[i] = "{" + name + "}"
+                break
+    return "/".join(segments)
+
+
+def observe_http_request(scope: Dict[str, Any], status: int, seconds: float):
+    # Label by route template (/history/{session_id}), never the raw path
+    _http_duration[(scope["method"], route_template(scope), str(status))].observe(seconds)
+
+
+def count_ws_message(direction: str, message_type: str, n: int = 1):
+    _ws_messages[(direction, message_type)].inc(n)
+
+
+def observe_plugin(plugin: str, seconds: float, error: bool = False):
+    _plugin_duration[(plugin,)].observe(seconds)
+    if error:
+        _plugin_errors[(plugin,)].inc()
+
+
+def observe_plugin_routing(outcome: str, seconds: float):
+    _plugin_routing[(outcome,)].observe(seconds)
+
+
+def observe_db_statement(engine: str, operation: str, seconds: float):
+    _db_statements[(engine, operation)].observe(seconds)
+
+
+class track_upstream:
+    """
+    Time a provider call and count it as an error if it raises:
+
+        with track_upstream("gemini", "generate"):
+            ...
+
+    Exception types in `ignore` are expected outcomes, not failures.
+    """
+
+    __slots__ = ("key", "ignore", "start")
+
+    def __init__(self, upstream: str, operation: str, ignore: Tuple[type, ...] = ()):
+        self.key = (upstream, operation)
+        self.ignore = ignore
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _upstream_duration[self.key].observe(time.perf_counter() - self.start)
+        if exc_type is not None and not issubclass(exc_type, self.ignore):
+            _upstream_errors[self.key].inc()
+        return False
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition payload and content type for GET /metrics."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead():
+    """Drop this worker's live gauges from the multiprocess aggregate on shutdown."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
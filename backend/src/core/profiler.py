@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+from src.config.settings import settings
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ProfilerBusy(Exception):
+    """A profile is already running, or the cooldown has not elapsed."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the live process.
+
+    A worker thread reads every thread's stack with sys._current_frames() at
+    a fixed interval and counts identical stacks, producing collapsed-stack
+    text (`frame;frame;frame count`) that flamegraph.pl, speedscope and
+    similar tools load directly. Stacks of the event loop thread are rooted
+    at the asyncio task that was running when sampled, so time is attributed
+    per task rather than lumped under the loop.
+
+    Only one profile runs at a time, durations are capped and a cooldown
+    separates runs, so it cannot be used to load the server.
+    """
+
+    def __init__(self):
+        self.max_seconds = settings.profiler_max_seconds
+        self.min_interval_ms = settings.profiler_min_interval_ms
+        self.cooldown_seconds = settings.profiler_cooldown_seconds
+
+        self._lock = asyncio.Lock()
+        self._next_allowed = 0.0
+        self._labels: Dict[Tuple[str, str, int], str] = {}
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    async def profile(self, seconds: float, interval_ms: float, tasks: bool = True) -> str:
+        """Sample for `seconds` and return the collapsed stacks."""
+        if self._lock.locked():
+            raise ProfilerBusy("A profile is already running")
+        wait = self._next_allowed - time.monotonic()
+        if wait > 0:
+            raise ProfilerBusy(f"Profiler cooling down, retry in {wait:.0f}s", retry_after=wait)
+
+        seconds = min(max(seconds, 0.1), self.max_seconds)
+        interval = max(interval_ms, self.min_interval_ms) / 1000
+        loop = asyncio.get_running_loop()
+        loop_thread = threading.get_ident() if tasks else None
+
+        async with self._lock:
+            started = time.monotonic()
+            try:
+                stacks, samples = await asyncio.to_thread(
+                    self._sample, seconds, interval, loop, loop_thread
+                )
+            finally:
+                self._next_allowed = time.monotonic() + self.cooldown_seconds
+
+        self.last_run = {
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "seconds": round(time.monotonic() - started, 2),
+            "interval_ms": interval * 1000,
+            "samples": samples,
+            "unique_stacks": len(stacks),
+        }
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def _sample(self, seconds: float, interval: float, loop, loop_thread: Optional[int]):
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        next_tick = time.monotonic()
+
+        while next_tick < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                root = names.get(ident, f"thread-{ident}")
+                if ident == loop_thread:
+                    task = asyncio.current_task(loop)
+                    root = f"task:{task.get_name()}" if task is not None else "loop:idle"
+                stacks[self._collapse(root, frame)] += 1
+            del frame
+            samples += 1
+
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()  # fell behind; don't burst to catch up
+
+        return stacks, samples
+
+    def _collapse(self, root: str, frame) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            key = (code.co_filename, code.co_name, frame.f_lineno)
+            label = self._labels.get(key)
+            if label is None:
+                filename = code.co_filename
+                if filename.startswith(_SRC_DIR):
+                    filename = "src" + filename[len(_SRC_DIR):]
+                # ';' separates frames in collapsed format (the count follows the last space)
+                label = f"{code.co_name} ({filename}:{frame.f_lineno})".replace(";", ":")
+                self._labels[key] = label
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(root.replace(";", ":"))
+        return ";".join(reversed(labels))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._lock.locked(),
+            "max_seconds": self.max_seconds,
+            "min_interval_ms": self.min_interval_ms,
+            "cooldown_seconds": self.cooldown_seconds,
+            "cooldown_remaining": round(max(0.0, self._next_allowed - time.monotonic()), 1),
+            "last_run": self.last_run,
+        }
+
+
+# Global instance
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,122 @@
+import asyncio
+from typing import Any, List, Optional, Sequence
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """Error reply from the server (e.g. `-NOSCRIPT ...`)."""
+
+
+class RespClient:
+    """
+    Minimal asyncio client for the Redis serialization protocol (RESP2).
+
+    Enough for the shared-state features (scripted rate limiting, pub/sub)
+    without pulling in a client library, and it works against anything that
+    speaks the protocol (Redis, Valkey, KeyDB, local stand-ins). Commands
+    sent with execute_many() are pipelined in a single write.
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            for reply in await self._roundtrip(setup):
+                if isinstance(reply, RespError):
+                    await self.close()
+                    raise reply
+
+    async def close(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def execute(self, *args) -> Any:
+        reply = (await self.execute_many([args]))[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def execute_many(self, commands: List[Sequence]) -> List[Any]:
+        """Pipeline commands; error replies are returned as RespError values."""
+        async with self._lock:
+            if not self.connected:
+                await self.connect()
+            try:
+                return await asyncio.wait_for(self._roundtrip(commands), self.timeout)
+            except BaseException:
+                # A half-read pipeline leaves the stream out of sync
+                await self.close()
+                raise
+
+    async def send(self, *args):
+        """Write a command without waiting for a reply (pub/sub connections)."""
+        if not self.connected:
+            await self.connect()
+        self._writer.write(encode_command(args))
+        await self._writer.drain()
+
+    async def _roundtrip(self, commands: List[Sequence]) -> List[Any]:
+        self._writer.write(b"".join(encode_command(c) for c in commands))
+        await self._writer.drain()
+        return [await self.read_reply() for _ in commands]
+
+    async def read_reply(self) -> Any:
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return RespError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            size = int(payload)
+            if size < 0:
+                return None
+            data = await self._reader.readexactly(size + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            if count < 0:
+                return None
+            return [await self.read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected RESP reply: {line[:32]!r}")
+
+
+def encode_command(args: Sequence) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        else:
+            data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
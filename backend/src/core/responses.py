@@ -0,0 +1,106 @@
+import json
+from datetime import date, datetime, time
+from typing import Any, Iterable
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback: same output, just slower
+    orjson = None
+
+
+class RawJSON(bytes):
+    """
+    Already-serialized JSON, spliced into a response body as-is.
+
+    Spliced without re-encoding when it is the content itself, a dict value
+    or a list item (lists are detected by their first item), recursively
+    through containers that hold one. Anywhere else it is parsed and
+    re-encoded: correct, just without the speedup.
+    """
+
+
+def json_array(items: Iterable[bytes]) -> RawJSON:
+    """Join pre-serialized JSON values into one array."""
+    return RawJSON(b"[" + b",".join(items) + b"]")
+
+
+def _default(value: Any) -> Any:
+    # Only values the encoder can't handle natively (pydantic models,
+    # Decimal, sets, ...) take the slow jsonable_encoder path
+    if isinstance(value, RawJSON):
+        return json.loads(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return jsonable_encoder(value)
+
+
+def _dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":"),
+    ).encode()
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize plain data to JSON bytes.
+
+    Datetimes are written in ISO 8601 (as datetime.isoformat() would), so
+    rows need not be pre-formatted; RawJSON values are spliced in.
+    """
+    if isinstance(content, RawJSON):
+        return content
+    if _has_raw(content):
+        parts = []
+        _splice(content, parts)
+        return b"".join(parts)  # one copy of the pre-serialized parts
+    return _dumps(content)
+
+
+def _has_raw(value: Any) -> bool:
+    if isinstance(value, RawJSON):
+        return True
+    if isinstance(value, list):
+        return bool(value) and _has_raw(value[0])
+    if isinstance(value, dict):
+        return any(_has_raw(v) for v in value.values())
+    return False
+
+
+def _splice(value: Any, parts: list):
+    if isinstance(value, RawJSON):
+        parts.append(value)
+    elif isinstance(value, list) and _has_raw(value):
+        parts.append(b"[")
+        for i, item in enumerate(value):
+            if i:
+                parts.append(b",")
+            _splice(item, parts)
+        parts.append(b"]")
+    elif isinstance(value, dict) and _has_raw(value):
+        parts.append(b"{")
+        for i, (key, item) in enumerate(value.items()):
+            if i:
+                parts.append(b",")
+            parts.append(_dumps(str(key)) + b":")
+            _splice(item, parts)
+        parts.append(b"}")
+    else:
+        parts.append(_dumps(value))
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with `dumps` (orjson when installed).
+
+    This is the app's default response class. Endpoints with large,
+    already-plain payloads should return it directly: FastAPI then skips
+    its own jsonable_encoder pass over the content.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
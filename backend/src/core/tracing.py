@@ -0,0 +1,209 @@
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from src.config.settings import settings
+
+# ---------------------------------------------------------------------------
+# Spans
+# ---------------------------------------------------------------------------
+# A trace is started per HTTP request (by the request logging layer) and
+# per WebSocket chat exchange. Code records stages with:
+#
+#     with span("llm.generate", model="gemini"):
+#         ...
+#
+# Outside a trace, span() is a no-op costing one context-variable lookup.
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Trace:
+    """All spans recorded while handling one request or exchange."""
+
+    __slots__ = ("trace_id", "root", "spans")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = []
+
+    def stage_durations(self) -> Dict[str, float]:
+        """Milliseconds per stage name (repeated stages are summed), in first-seen order."""
+        stages: Dict[str, float] = {}
+        for s in self.spans:
+            if s.end_ns:
+                stages[s.name] = stages.get(s.name, 0.0) + s.duration_ms
+        return {name: round(ms, 2) for name, ms in stages.items()}
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: finished stages plus time so far as `app`."""
+        parts = [f"{name};dur={ms}" for name, ms in self.stage_durations().items()]
+        parts.append(f"app;dur={round(self.root.duration_ms, 2)}")
+        return ", ".join(parts)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON ExportTraceServiceRequest with this trace's spans."""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_attr("service.name", "jarvis-backend")]},
+                "scopeSpans": [{
+                    "scope": {"name": "jarvis"},
+                    "spans": [self._otlp_span(s) for s in [self.root, *self.spans]],
+                }],
+            }]
+        }
+
+    def _otlp_span(self, s: Span) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 2 if s is self.root else 1,  # SERVER for the root, INTERNAL otherwise
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or time.time_ns()),
+            "attributes": [_attr(k, v) for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            data["parentSpanId"] = s.parent_id
+        return data
+
+
+def _attr(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("span", default=None)
+
+
+class span:
+    """Context manager recording one stage of the current trace."""
+
+    __slots__ = ("name", "attributes", "record", "token")
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.record: Optional[Span] = None
+
+    def __enter__(self):
+        trace = _current_trace.get()
+        if trace is not None:
+            self.record = Span(self.name, _current_span.get() or trace.root.span_id, self.attributes)
+            trace.spans.append(self.record)
+            self.token = _current_span.set(self.record.span_id)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.record is not None:
+            self.record.end_ns = time.time_ns()
+            if exc_type is not None:
+                self.record.error = f"{exc_type.__name__}: {exc}"
+            _current_span.reset(self.token)
+        return False
+
+    def set(self, key: str, value: Any):
+        """Attach an attribute known only once the stage has run."""
+        if self.record is not None:
+            self.record.attributes[key] = value
+
+
+def start_trace(name: str, **attributes) -> Tuple[Trace, contextvars.Token]:
+    """Begin a trace in the current context; pass both results to end_trace()."""
+    trace = Trace(name, attributes)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(trace: Trace, token: contextvars.Token, **attributes):
+    trace.root.end_ns = time.time_ns()
+    trace.root.attributes.update(attributes)
+    _current_trace.reset(token)
+    trace_exporter.export(trace)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+class TraceExporter:
+    """
+    Appends finished traces as OTLP/JSON lines to a local file, which the
+    OpenTelemetry Collector's `otlpjsonfile` receiver can tail. Writes happen
+    on a daemon thread; when its queue is full, traces are dropped.
+    """
+
+    def __init__(self, path: str = "", maxsize: int = 1000):
+        self.path = path
+        self._queue: "queue.Queue" = queue.Queue(maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def export(self, trace: Trace):
+        if not self.path:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    for trace in batch:
+                        f.write(json.dumps(trace.to_otlp(), separators=(",", ":")) + "\n")
+                self.exported += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                print(f"[WARN] Trace export failed: {e}")
+
+
+# Global instance
+trace_exporter = TraceExporter(settings.trace_export_path)
@@ -0,0 +1,251 @@
+from sqlalchemy import delete, exists, func, insert, literal, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.models.database_models import Conversation, ConversationHourlyRollup, ConversationRollup
+
+
+def as_stored(ts: datetime) -> datetime:
+    """Convert to naive UTC, the form timestamps are stored in."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def hour_bucket(ts: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour (naive UTC)."""
+    return as_stored(ts).replace(minute=0, second=0, microsecond=0)
+
+
+class ConversationAnalytics:
+    """
+    Incremental rollups of conversation volume, at two levels:
+
+    - hour x plugin (ConversationHourlyRollup), for dashboard-wide queries
+    - hour x plugin x session (ConversationRollup), for per-session queries
+
+    record() is called in the same transaction as each conversation insert
+    and bumps the matching rows of both with one upsert each. Queries read
+    rollup rows only: hours in range x plugins used for the whole
+    dashboard, or the hours that session was active for a single session.
+    Neither depends on how many conversations (or sessions) exist.
+    """
+
+    # --- Write path ---
+
+    async def record(
+        self,
+        db: AsyncSession,
+        exchanges: Iterable[Tuple[datetime, Optional[str], Optional[str]]],
+    ):
+        """
+        Count (created_at, plugin_used, session_id) exchanges into the rollups.
+        Does not commit; the caller's transaction covers both writes.
+        """
+        counts = Counter(
+            (hour_bucket(created_at), plugin or "", session or "")
+            for created_at, plugin, session in exchanges
+        )
+        if not counts:
+            return
+        hourly = Counter()
+        for (bucket, plugin, _), n in counts.items():
+            hourly[bucket, plugin] += n
+
+        dialect = db.get_bind().dialect.name
+        await db.execute(self._upsert(dialect, ConversationRollup.__table__, [
+            {
+                "bucket_start": bucket,
+                "plugin_used": plugin,
+                "session_id": session,
+                "conversation_count": n,
+            }
+            for (bucket, plugin, session), n in counts.items()
+        ]))
+        await db.execute(self._upsert(dialect, ConversationHourlyRollup.__table__, [
+            {"bucket_start": bucket, "plugin_used": plugin, "conversation_count": n}
+            for (bucket, plugin), n in hourly.items()
+        ]))
+
+    @staticmethod
+    def _upsert(dialect: str, table, values: List[Dict[str, Any]]):
+        if dialect == "sqlite":
+            stmt = sqlite_insert(table).values(values)
+            return stmt.on_conflict_do_update(
+                index_elements=[c for c in ("bucket_start", "plugin_used", "session_id") if c in table.c],
+                set_={"conversation_count": table.c.conversation_count + stmt.excluded.conversation_count},
+            )
+        if dialect == "mysql":
+            stmt = mysql_insert(table).values(values)
+            return stmt.on_duplicate_key_update(
+                conversation_count=table.c.conversation_count + stmt.inserted.conversation_count,
+            )
+        raise RuntimeError(f"Rollups not supported on {dialect}")
+
+    async def forget_session(self, db: AsyncSession, session_id: str):
+        """Drop a session's rollups alongside its conversations. Does not commit."""
+        # Take the session's counts out of the hour totals first
+        # (one per-session row per hour x plugin, so no aggregate is needed)
+        session_row = (
+            select(ConversationRollup.conversation_count)
+            .where(
+                ConversationRollup.session_id == session_id,
+                ConversationRollup.bucket_start == ConversationHourlyRollup.bucket_start,
+                ConversationRollup.plugin_used == ConversationHourlyRollup.plugin_used,
+            )
+        )
+        await db.execute(
+            update(ConversationHourlyRollup)
+            .where(exists(session_row))
+            .values(conversation_count=ConversationHourlyRollup.conversation_count - session_row.scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            delete(ConversationHourlyRollup).where(ConversationHourlyRollup.conversation_count <= 0)
+        )
+        await db.execute(
+            delete(ConversationRollup).where(ConversationRollup.session_id == session_id)
+        )
+
+    # --- Read path ---
+
+    async def hourly_volume(
+        self,
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        session_id: Optional[str] = None,
+        plugin_used: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Conversations per hour in [start, end)."""
+        table = self._table(session_id)
+        query = self._range(
+            table,
+            select(table.bucket_start, func.sum(table.conversation_count).label("count")),
+            start, end, session_id, plugin_used,
+        )
+        result = await db.execute(
+            query.group_by(table.bucket_start).order_by(table.bucket_start)
+        )
+        return [
+            {"hour": row.bucket_start.isoformat(), "count": int(row.count)}
+            for row in result
+        ]
+
+    async def plugin_usage(
+        self,
+        db: AsyncSession,
+        start: datetime,
+        end: datetime,
+        session_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Conversations per plugin in [start, end), busiest first."""
+        table = self._table(session_id)
+        query = self._range(
+            table,
+            select(table.plugin_used, func.sum(table.conversation_count).label("count")),
+            start, end, session_id, None,
+        )
+        result = await db.execute(
+            query.group_by(table.plugin_used)
+            .order_by(func.sum(table.conversation_count).desc())
+        )
+        return [
+            {"plugin": row.plugin_used or None, "count": int(row.count)}
+            for row in result
+        ]
+
+    @staticmethod
+    def _table(session_id: Optional[str]):
+        return ConversationRollup if session_id else ConversationHourlyRollup
+
+    @staticmethod
+    def _range(table, query, start, end, session_id, plugin_used):
+        query = query.where(
+            table.bucket_start >= hour_bucket(start),
+            table.bucket_start < as_stored(end),
+        )
+        if session_id:
+            query = query.where(table.session_id == session_id)
+        if plugin_used is not None:
+            query = query.where(table.plugin_used == plugin_used)
+        return query
+
+    # --- Backfill ---
+
+    def backfill(self, engine, batch_hours: int = 24) -> int:
+        """
+        Rebuild all rollups from the conversations table. Returns rollup rows written.
+
+        Works through the history `batch_hours` at a time, one transaction
+        per batch (skipping hours without conversations), so app writers
+        are never locked out for longer than one batch takes.
+        """
+        dialect = engine.dialect.name
+        if dialect == "sqlite":
+            hour = func.strftime("%Y-%m-%d %H:00:00", Conversation.created_at)
+        elif dialect == "mysql":
+            hour = func.date_format(Conversation.created_at, "%Y-%m-%d %H:00:00")
+        else:
+            raise RuntimeError(f"Rollups not supported on {dialect}")
+        plugin = func.coalesce(Conversation.plugin_used, literal(""))
+        session = func.coalesce(Conversation.session_id, literal(""))
+
+        written = 0
+        cleared_from: Optional[datetime] = None  # rollups before this are rebuilt
+        while True:
+            with engine.connect() as conn:
+                query = select(func.min(Conversation.created_at))
+                if cleared_from is not None:
+                    query = query.where(Conversation.created_at >= cleared_from)
+                first = conn.execute(query).scalar()
+            window_end = hour_bucket(first) + timedelta(hours=batch_hours) if first else None
+
+            with engine.begin() as conn:
+                # Also clears stale rollups in the gap since the previous batch
+                for table in (ConversationRollup, ConversationHourlyRollup):
+                    conn.execute(delete(table).where(*self._between(table.bucket_start, cleared_from, window_end)))
+                if first is None:
+                    return written
+
+                in_window = self._between(Conversation.created_at, hour_bucket(first), window_end)
+                written += conn.execute(
+                    insert(ConversationRollup).from_select(
+                        ["bucket_start", "plugin_used", "session_id", "conversation_count"],
+                        select(hour, plugin, session, func.count())
+                        .where(*in_window).group_by(hour, plugin, session),
+                    )
+                ).rowcount
+                written += conn.execute(
+                    insert(ConversationHourlyRollup).from_select(
+                        ["bucket_start", "plugin_used", "conversation_count"],
+                        select(hour, plugin, func.count())
+                        .where(*in_window).group_by(hour, plugin),
+                    )
+                ).rowcount
+            cleared_from = window_end
+
+    @staticmethod
+    def _between(column, start: Optional[datetime], end: Optional[datetime]) -> list:
+        conditions = []
+        if start is not None:
+            conditions.append(column >= start)
+        if end is not None:
+            conditions.append(column < end)
+        return conditions
+
+
+# Global instance
+conversation_analytics = ConversationAnalytics()
+
+
+if __name__ == "__main__":
+    # Rebuild rollups from existing history:  python -m src.database.analytics
+    from src.config.database import engine, init_db
+
+    init_db()
+    rows = conversation_analytics.backfill(engine)
+    print(f"[OK] Rebuilt conversation rollups ({rows} buckets)")
@@ -1,16 +1,42 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional, Dict
-from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, delete, desc, func, insert, or_, select
+from typing import Any, AsyncIterator, List, Optional, Dict, Tuple
+from datetime import datetime, timezone
+import base64
+import json
+from src.database.analytics import as_stored, conversation_analytics
+from src.database.history_cache import session_history_cache
+from src.database.instrumentation import tracked
 from src.models.database_models import Conversation
 
+# Upper bounds on page sizes so no single request can walk a whole table
+MAX_PAGE_SIZE = 500
+MAX_SESSION_PAGE_SIZE = 1000
+
+
+def encode_cursor(conv: Conversation) -> str:
+    """Build an opaque keyset cursor from a row's (created_at, id)."""
+    payload = json.dumps([conv.created_at.isoformat() if conv.created_at else None, conv.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Parse a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, conv_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(created_at) if created_at else None), int(conv_id)
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
 
 class ConversationCRUD:
-    """CRUD operations for conversation history using SQLAlchemy."""
+    """Async CRUD operations for conversation history using SQLAlchemy."""
 
-    def save_conversation(
+    @tracked
+    async def save_conversation(
         self,
-        db: Session,
+        db: AsyncSession,
         session_id: str,
         user_message: str,
         assistant_response: str,
@@ -18,63 +44,226 @@ class ConversationCRUD:
         metadata: Optional[Dict] = None,
     ) -> Conversation:
         """Save a conversation exchange to the database."""
+        created_at = datetime.now(timezone.utc)
         conv = Conversation(
             session_id=session_id,
             user_message=user_message,
             assistant_response=assistant_response,
             plugin_used=plugin_used,
-            metadata=metadata,
+            extra_data=metadata,
+            created_at=created_at,
         )
         db.add(conv)
-        db.commit()
-        db.refresh(conv)
+        await conversation_analytics.record(db, [(created_at, plugin_used, session_id)])
+        await db.commit()
+        await db.refresh(conv)
+        session_history_cache.append(session_id, self.to_turn(conv))
         return conv
 
-    def get_conversations(
+    @tracked
+    async def save_conversations_bulk(
         self,
-        db: Session,
-        skip: int = 0,
+        db: AsyncSession,
+        rows: List[Dict[str, Any]],
+    ) -> int:
+        """
+        Insert many exchanges in one multi-row INSERT and a single commit.
+
+        Each row is a dict of Conversation attributes (session_id,
+        user_message, assistant_response, plugin_used, extra_data,
+        created_at; created_at is required). No refresh round-trip is made.
+        """
+        if not rows:
+            return 0
+        await db.execute(insert(Conversation), rows)
+        await conversation_analytics.record(
+            db, [(r["created_at"], r.get("plugin_used"), r.get("session_id")) for r in rows]
+        )
+        await db.commit()
+        # Bulk inserts don't return ids, so drop cached tails instead of appending
+        for session_id in {r.get("session_id") for r in rows}:
+            session_history_cache.invalidate(session_id)
+        return len(rows)
+
+    @tracked
+    async def get_conversations(
+        self,
+        db: AsyncSession,
         limit: int = 50,
-    ) -> List[Conversation]:
-        """Get recent conversations, newest first."""
-        return (
-            db.query(Conversation)
-            .order_by(desc(Conversation.created_at))
-            .offset(skip)
-            .limit(limit)
-            .all()
+        cursor: Optional[str] = None,
+        skip: int = 0,
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """
+        Get recent conversations, newest first, using keyset pagination.
+
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        `skip` is the deprecated offset paging, kept for old clients; it
+        cannot be combined with a cursor.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        query = select(Conversation)
+
+        if skip and cursor:
+            raise ValueError("Pass either cursor or skip, not both")
+        if skip:
+            query = query.offset(skip)
+        if cursor:
+            created_at, conv_id = decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    Conversation.created_at < created_at,
+                    and_(Conversation.created_at == created_at, Conversation.id < conv_id),
+                )
+            )
+
+        result = await db.execute(
+            query
+            .order_by(desc(Conversation.created_at), desc(Conversation.id))
+            .limit(limit + 1)
         )
+        return self._page(list(result.scalars().all()), limit)
 
-    def get_by_session(
+    @tracked
+    async def get_by_session(
         self,
-        db: Session,
+        db: AsyncSession,
         session_id: str,
-    ) -> List[Conversation]:
-        """Get all messages in a specific session."""
-        return (
-            db.query(Conversation)
-            .filter(Conversation.session_id == session_id)
-            .order_by(Conversation.created_at)
-            .all()
+        limit: int = MAX_SESSION_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Conversation], Optional[str]]:
+        """
+        Get messages in a specific session, oldest first, at most `limit` rows.
+
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
+        limit = max(1, min(limit, MAX_SESSION_PAGE_SIZE))
+        query = select(Conversation).where(Conversation.session_id == session_id)
+
+        if cursor:
+            created_at, conv_id = decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    Conversation.created_at > created_at,
+                    and_(Conversation.created_at == created_at, Conversation.id > conv_id),
+                )
+            )
+
+        result = await db.execute(
+            query
+            .order_by(Conversation.created_at, Conversation.id)
+            .limit(limit + 1)
+        )
+        return self._page(list(result.scalars().all()), limit)
+
+    @tracked
+    async def stream_conversations(
+        self,
+        db: AsyncSession,
+        session_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        plugin_used: Optional[str] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Conversation]:
+        """
+        Iterate over matching conversations, oldest first, without loading
+        them all. Rows are fetched through a server-side cursor in batches
+        of `batch_size`, so memory stays flat regardless of result size.
+        `start`/`end` may carry an offset; they are compared in UTC.
+        """
+        query = select(Conversation)
+        if session_id:
+            query = query.where(Conversation.session_id == session_id)
+        if start:
+            query = query.where(Conversation.created_at >= as_stored(start))
+        if end:
+            query = query.where(Conversation.created_at < as_stored(end))
+        if plugin_used:
+            query = query.where(Conversation.plugin_used == plugin_used)
+
+        result = await db.stream_scalars(
+            query
+            .order_by(Conversation.created_at, Conversation.id)
+            .execution_options(yield_per=batch_size)
         )
+        async for conv in result:
+            yield conv
 
-    def delete_by_session(
+    @tracked
+    async def delete_by_session(
         self,
-        db: Session,
+        db: AsyncSession,
         session_id: str,
     ) -> int:
         """Delete all messages in a session. Returns count deleted."""
-        count = (
-            db.query(Conversation)
-            .filter(Conversation.session_id == session_id)
-            .delete()
+        result = await db.execute(
+            delete(Conversation).where(Conversation.session_id == session_id)
         )
-        db.commit()
-        return count
+        await conversation_analytics.forget_session(db, session_id)
+        await db.commit()
+        session_history_cache.invalidate(session_id)
+        return result.rowcount
 
-    def get_count(self, db: Session) -> int:
+    @tracked
+    async def get_session_tail(
+        self,
+        db: AsyncSession,
+        session_id: str,
+        n: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Last `n` turns of a session as dicts, oldest first.
+
+        Read-through: served from the session history cache when possible,
+        otherwise loaded with one index range scan and cached.
+        """
+        n = max(1, min(n, MAX_SESSION_PAGE_SIZE))
+        cached = session_history_cache.lookup(session_id, n)
+        if cached is not None:
+            return cached
+
+        fetch = max(n, session_history_cache.turns_per_session)
+        token = session_history_cache.begin_load(session_id)
+        turns = None
+        try:
+            result = await db.execute(
+                select(Conversation)
+                .where(Conversation.session_id == session_id)
+                .order_by(desc(Conversation.created_at), desc(Conversation.id))
+                .limit(fetch)
+            )
+            rows = list(result.scalars().all())
+            turns = [self.to_turn(c) for c in reversed(rows)]
+        finally:
+            session_history_cache.fill(
+                session_id, token, turns, complete=turns is not None and len(turns) < fetch,
+            )
+        return turns[-n:]
+
+    @tracked
+    async def get_count(self, db: AsyncSession) -> int:
         """Get total conversation count."""
-        return db.query(Conversation).count()
+        result = await db.execute(select(func.count()).select_from(Conversation))
+        return result.scalar_one()
+
+    @staticmethod
+    def to_turn(c: Conversation) -> Dict[str, Any]:
+        """Serializable form of one exchange, as returned by the history APIs."""
+        return {
+            "id": c.id,
+            "user_message": c.user_message,
+            "assistant_response": c.assistant_response,
+            "plugin_used": c.plugin_used,
+            "created_at": c.created_at.isoformat() if c.created_at else None,
+        }
+
+    @staticmethod
+    def _page(rows: List[Conversation], limit: int) -> Tuple[List[Conversation], Optional[str]]:
+        """Trim the look-ahead row and derive the next cursor from the last row kept."""
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1])
+        return rows, None
 
 
 # Global instance
@@ -0,0 +1,287 @@
+import bisect
+import os
+from collections import Counter, OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from src.config.settings import settings
+from src.core.responses import RawJSON, dumps, json_array
+
+# Rough per-turn bookkeeping overhead (dict, deque slot, ids, timestamps)
+_TURN_OVERHEAD_BYTES = 200
+
+
+def _turn_size(turn: Dict[str, Any]) -> int:
+    return (
+        _TURN_OVERHEAD_BYTES
+        + len(turn.get("user_message") or "")
+        + len(turn.get("assistant_response") or "")
+    )
+
+
+def _order(turn: Dict[str, Any]) -> Tuple[str, int]:
+    # Same order as the tail query: created_at, then message id
+    return turn.get("created_at") or "", turn.get("id") or 0
+
+
+class _SessionEntry:
+    __slots__ = ("turns", "complete", "size", "encoded")
+
+    def __init__(self, max_turns: int):
+        self.turns: Deque[Dict[str, Any]] = deque(maxlen=max_turns)
+        self.complete = False  # True when `turns` holds the entire session
+        self.size = 0
+        self.encoded: Optional[RawJSON] = None  # `turns` as a JSON array, built on demand
+
+
+class SessionHistoryCache:
+    """
+    In-process LRU cache of the most recent turns of each session.
+
+    Bounded both by session count and by approximate memory. It is kept
+    coherent by its writers: ConversationCRUD appends on save and
+    invalidates on delete/bulk insert; retention invalidates sessions it
+    archives. A load that raced with a write for the same session is not
+    cached, so the cache never holds a tail older than the database.
+
+    With several workers each holds its own cache; share_with() relays
+    every write over the WebSocket backplane so the other workers drop
+    that session.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        turns_per_session: Optional[int] = None,
+        max_mb: Optional[float] = None,
+    ):
+        self.enabled = settings.history_cache_enabled
+        self.max_sessions = max_sessions or settings.history_cache_max_sessions
+        self.turns_per_session = turns_per_session or settings.history_cache_turns_per_session
+        self.max_bytes = int((max_mb or settings.history_cache_max_mb) * 1024 * 1024)
+
+        self._entries: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+        self._bytes = 0
+
+        # Write tracking for loads in flight (see begin_load / fill)
+        self._write_seq = 0
+        self._inflight: Counter = Counter()
+        self._last_write: Dict[str, int] = {}
+
+        # relay(channel, payload) to the other workers; None when single-process
+        self._relay: Optional[Callable[[str, str], None]] = None
+
+        # --- Metrics ---
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.remote_invalidations = 0
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def lookup(self, session_id: str, n: int) -> Optional[List[Dict[str, Any]]]:
+        """Last `n` turns (oldest first) if the cache can answer, else None."""
+        entry = self._entries.get(session_id) if self.enabled else None
+        if entry is None or (len(entry.turns) < n and not entry.complete):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return list(entry.turns)[-n:]
+
+    def whole_session(self, session_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """All turns of a session, if it is fully cached and fits in `limit`."""
+        entry = self._entries.get(session_id) if self.enabled else None
+        if entry is None or not entry.complete or len(entry.turns) > limit:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return list(entry.turns)
+
+    def whole_session_json(self, session_id: str, limit: int) -> Optional[RawJSON]:
+        """Like whole_session(), but pre-serialized; encoded once per change to the session."""
+        entry = self._entries.get(session_id) if self.enabled else None
+        if entry is None or not entry.complete or len(entry.turns) > limit:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        if entry.encoded is None:
+            entry.encoded = json_array(dumps(turn) for turn in entry.turns)
+            entry.size += len(entry.encoded)
+            self._bytes += len(entry.encoded)
+            self._evict()
+        return entry.encoded
+
+    # ------------------------------------------------------------------
+    # Loading (read-through)
+    # ------------------------------------------------------------------
+
+    def begin_load(self, session_id: str) -> int:
+        """Mark a DB load as started; returns a token to pass to fill()."""
+        self._inflight[session_id] += 1
+        return self._write_seq
+
+    def fill(
+        self,
+        session_id: str,
+        token: int,
+        turns: Optional[List[Dict[str, Any]]],
+        complete: bool = False,
+    ):
+        """
+        Cache the tail loaded from the DB (oldest first). Pass turns=None to
+        abandon a failed load. Skipped if the session was written meanwhile.
+        """
+        self._inflight[session_id] -= 1
+        stale = self._last_write.get(session_id, 0) > token
+        if self._inflight[session_id] <= 0:
+            del self._inflight[session_id]
+            self._last_write.pop(session_id, None)
+        if turns is None or stale or not self.enabled:
+            return
+
+        self._drop(session_id)
+        entry = _SessionEntry(self.turns_per_session)
+        for turn in turns[-self.turns_per_session:]:
+            entry.turns.append(turn)
+            entry.size += _turn_size(turn)
+        entry.complete = complete and len(turns) <= self.turns_per_session
+        self._entries[session_id] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, session_id: str, turn: Dict[str, Any]):
+        """Add a newly saved turn to a cached session, in (created_at, id) order."""
+        self._note_write(session_id)
+        self._publish(session_id)
+        entry = self._entries.get(session_id)
+        if entry is None:
+            return  # not cached; the next read loads it from the DB
+
+        if entry.encoded is not None:
+            entry.size -= len(entry.encoded)
+            self._bytes -= len(entry.encoded)
+            entry.encoded = None
+        if entry.turns and _order(turn) <= _order(entry.turns[-1]):
+            self._insert(entry, turn)  # concurrent saves finished out of order
+        else:
+            if len(entry.turns) == entry.turns.maxlen:
+                self._drop_oldest(entry)
+            entry.turns.append(turn)
+            entry.size += _turn_size(turn)
+            self._bytes += _turn_size(turn)
+        self._entries.move_to_end(session_id)
+        self._evict()
+
+    def _insert(self, entry: _SessionEntry, turn: Dict[str, Any]):
+        keys = [_order(t) for t in entry.turns]
+        pos = bisect.bisect_left(keys, _order(turn))
+        if pos < len(keys) and keys[pos] == _order(turn):
+            return  # already cached
+        if pos == 0 and len(entry.turns) == entry.turns.maxlen:
+            entry.complete = False  # older than the whole cached tail
+            return
+        if len(entry.turns) == entry.turns.maxlen:
+            self._drop_oldest(entry)
+            pos -= 1
+        entry.turns.insert(pos, turn)
+        entry.size += _turn_size(turn)
+        self._bytes += _turn_size(turn)
+
+    def _drop_oldest(self, entry: _SessionEntry):
+        dropped = entry.turns.popleft()
+        entry.size -= _turn_size(dropped)
+        self._bytes -= _turn_size(dropped)
+        entry.complete = False
+
+    def invalidate(self, session_id: str):
+        """Forget a session (deleted, bulk-written or archived)."""
+        self._note_write(session_id)
+        self._publish(session_id)
+        if self._drop(session_id):
+            self.invalidations += 1
+
+    # ------------------------------------------------------------------
+    # Other workers
+    # ------------------------------------------------------------------
+
+    def share_with(self, manager):
+        """
+        Keep the caches of all workers coherent through the manager's
+        backplane (call once it has started). Without a backplane, several
+        workers (WEB_CONCURRENCY > 1) can't see each other's writes, so
+        the cache is turned off instead.
+        """
+        if manager.backplane.name == "in_process":
+            if int(os.environ.get("WEB_CONCURRENCY") or 1) > 1:
+                print("[WARN] Several workers but no WS_BACKPLANE: session history cache disabled")
+                self.enabled = False
+                self._entries.clear()
+                self._bytes = 0
+            return
+        self._relay = manager.relay
+        manager.on_relay("history", self._remote_write)
+
+    def _publish(self, session_id: str):
+        if self._relay is not None and self.enabled:
+            self._relay(f"history:{session_id}", "")
+
+    def _remote_write(self, session_id: str, payload: str):
+        """Another worker wrote to the session: drop it, and don't cache loads in flight."""
+        self._note_write(session_id)
+        if self._drop(session_id):
+            self.remote_invalidations += 1
+
+    def _note_write(self, session_id: str):
+        self._write_seq += 1
+        if session_id in self._inflight:
+            self._last_write[session_id] = self._write_seq
+
+    def _drop(self, session_id: str) -> bool:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        return True
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_sessions or self._bytes > self.max_bytes
+        ):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "sessions": len(self._entries),
+            "max_sessions": self.max_sessions,
+            "turns": sum(len(e.turns) for e in self._entries.values()),
+            "turns_per_session": self.turns_per_session,
+            "approx_bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            "shared": self._relay is not None,
+        }
+
+
+# Global instance
+session_history_cache = SessionHistoryCache()
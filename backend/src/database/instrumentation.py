@@ -0,0 +1,243 @@
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict
+import structlog
+from sqlalchemy import event
+from src.config.settings import settings
+from src.core.metrics import (
+    DB_CHECKOUT_WAIT,
+    DB_CONNECT_DURATION,
+    DB_CONNECTION_HELD,
+    DB_CONNECTIONS_CHECKED_OUT,
+    DB_POOL_EVENTS,
+    DB_SLOW_QUERIES,
+    Histogram,
+    observe_db_statement,
+)
+from src.core.tracing import span
+
+logger = structlog.get_logger("jarvis.db")
+
+# Name of the ConversationCRUD method currently running, used to group
+# statement latencies. SQLAlchemy's async greenlets inherit this context.
+_current_operation: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "db_operation", default="other"
+)
+
+
+def tracked(fn):
+    """
+    Label every statement issued inside `fn` with its method name, and record
+    the call as a `db.<name>` trace span (async generators: statements only).
+    """
+    name = fn.__name__
+
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def gen_wrapper(*args, **kwargs):
+            agen = fn(*args, **kwargs)
+            while True:
+                token = _current_operation.set(name)
+                try:
+                    item = await agen.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    _current_operation.reset(token)
+                yield item
+        return gen_wrapper
+
+    span_name = f"db.{name}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        token = _current_operation.set(name)
+        try:
+            with span(span_name):
+                return await fn(*args, **kwargs)
+        finally:
+            _current_operation.reset(token)
+    return wrapper
+
+
+class DatabaseMetrics:
+    """
+    Pool and statement instrumentation built on SQLAlchemy events.
+
+    Per engine: how long callers wait for a pooled connection, how long
+    connections stay checked out, time to open new ones, checkouts, connects, invalidations, pre-ping failures, and live
+    pool gauges (in use, overflow). Per CRUD method: statement latency
+    histograms. Statements slower than `db_slow_query_ms` are logged with
+    their SQL. Everything is also exported as jarvis_db_* metrics on
+    /metrics.
+    """
+
+    def __init__(self):
+        self.slow_query_ms = settings.db_slow_query_ms
+        self._engines: Dict[str, Any] = {}
+        self._wait: Dict[str, Histogram] = defaultdict(Histogram)
+        self._held: Dict[str, Histogram] = defaultdict(Histogram)
+        self._connect_time: Dict[str, Histogram] = defaultdict(Histogram)
+        self._statements: Dict[str, Histogram] = defaultdict(Histogram)
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+        self.slow_queries = 0
+
+    def instrument(self, engine, name: str):
+        """Attach pool and statement listeners to a (sync) Engine."""
+        if name in self._engines:
+            return
+        self._engines[name] = engine
+        pool = engine.pool
+        counters = self._counters[name]
+        wait_histogram = self._wait[name]
+        held_histogram = self._held[name]
+        connect_histogram = self._connect_time[name]
+        checked_out = DB_CONNECTIONS_CHECKED_OUT.labels(name)
+        held_seconds = DB_CONNECTION_HELD.labels(name)
+        connect_seconds = DB_CONNECT_DURATION.labels(name)
+        wait_seconds = DB_CHECKOUT_WAIT.labels(name)
+
+        # --- Checkout wait: from asking the pool (every Connection and Session
+        # goes through raw_connection) to the checkout event firing. Covers
+        # queueing for a free slot and opening a new connection. ---
+        acquire = engine.raw_connection
+
+        @functools.wraps(acquire)
+        def _timed_acquire():
+            requested = time.perf_counter()
+            connection = acquire()
+            checked_out_at = connection.info.get("checked_out_at")
+            if checked_out_at is not None:
+                elapsed = max(0.0, checked_out_at - requested)
+                wait_histogram.observe(elapsed * 1000)
+                wait_seconds.observe(elapsed)
+            return connection
+
+        engine.raw_connection = _timed_acquire
+
+        # --- Connects: from the dialect opening the DBAPI connection to the pool's connect ---
+        @event.listens_for(engine, "do_connect")
+        def _on_do_connect(dialect, connection_record, cargs, cparams):
+            connection_record.info["connect_start"] = time.perf_counter()
+
+        @event.listens_for(pool, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            self._bump(counters, name, "connects")
+            started = connection_record.info.pop("connect_start", None)
+            if started is not None:
+                elapsed = time.perf_counter() - started
+                connect_histogram.observe(elapsed * 1000)
+                connect_seconds.observe(elapsed)
+
+        # --- Checkouts: count, and time held until checkin ---
+        @event.listens_for(pool, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self._bump(counters, name, "checkouts")
+            connection_record.info["checked_out_at"] = time.perf_counter()
+            checked_out.inc()
+
+        @event.listens_for(pool, "checkin")
+        def _on_checkin(dbapi_connection, connection_record):
+            self._returned(connection_record, held_histogram, held_seconds, checked_out)
+
+        @event.listens_for(pool, "detach")
+        def _on_detach(dbapi_connection, connection_record):
+            self._returned(connection_record, held_histogram, held_seconds, checked_out)
+
+        @event.listens_for(pool, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            self._bump(counters, name, "invalidations")
+
+        @event.listens_for(engine, "handle_error")
+        def _on_error(context):
+            if getattr(context, "is_pre_ping", False):
+                self._bump(counters, name, "pre_ping_failures")
+                return
+            self._bump(counters, name, "statement_errors")
+            # The statement failed while executing: after_cursor_execute won't pop its start
+            if context.execution_context is not None and context.connection is not None:
+                starts = context.connection.info.get("query_start")
+                if starts:
+                    starts.pop()
+
+        # --- Statement latency ---
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            starts = conn.info.get("query_start")
+            if not starts:
+                return
+            elapsed = time.perf_counter() - starts.pop()
+            elapsed_ms = elapsed * 1000
+            operation = _current_operation.get()
+            self._statements[operation].observe(elapsed_ms)
+            observe_db_statement(name, operation, elapsed)
+
+            if elapsed_ms >= self.slow_query_ms:
+                with self._lock:
+                    self.slow_queries += 1
+                DB_SLOW_QUERIES.labels(name, operation).inc()
+                logger.warning(
+                    "slow_query",
+                    engine=name,
+                    operation=operation,
+                    latency_ms=round(elapsed_ms, 2),
+                    statement=" ".join(statement.split())[:500],
+                )
+
+    @staticmethod
+    def _returned(connection_record, histogram: Histogram, prom_histogram, gauge):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is None:
+            return  # already counted (detached, then checked in)
+        elapsed = time.perf_counter() - started
+        histogram.observe(elapsed * 1000)
+        prom_histogram.observe(elapsed)
+        gauge.dec()
+
+    def _bump(self, counters: Dict[str, int], engine: str, key: str):
+        with self._lock:
+            counters[key] += 1
+        DB_POOL_EVENTS.labels(engine, key).inc()
+
+    def get_stats(self) -> Dict[str, Any]:
+        engines = {}
+        for name, engine in self._engines.items():
+            pool = engine.pool
+            gauges = {"pool": type(pool).__name__}
+            # Only queue-style pools expose sizing
+            for attr in ("size", "checkedout", "overflow", "checkedin"):
+                fn = getattr(pool, attr, None)
+                if callable(fn):
+                    gauges[attr] = fn()
+            if "overflow" in gauges:
+                # QueuePool reports unopened base slots as negative overflow
+                gauges["overflow"] = max(0, gauges["overflow"])
+            engines[name] = {
+                **gauges,
+                **dict(self._counters[name]),
+                "checkout_wait_ms": self._wait[name].snapshot(),
+                "held_ms": self._held[name].snapshot(),
+                "connect_ms": self._connect_time[name].snapshot(),
+            }
+
+        return {
+            "slow_query_threshold_ms": self.slow_query_ms,
+            "slow_queries": self.slow_queries,
+            "engines": engines,
+            "statements_ms": {
+                op: hist.snapshot() for op, hist in sorted(self._statements.items())
+            },
+        }
+
+
+# Global instance
+db_metrics = DatabaseMetrics()
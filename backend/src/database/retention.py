@@ -0,0 +1,267 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from sqlalchemy import delete, select
+from src.config.database import AsyncSessionLocal
+from src.config.settings import settings
+from src.database.analytics import as_stored
+from src.database.history_cache import session_history_cache
+from src.models.database_models import Conversation
+
+_PARTITION_RE = re.compile(r"conversations-(\d{4}-\d{2}-\d{2})\.ndjson\.gz$")
+
+
+def _row_to_dict(c: Conversation) -> Dict[str, Any]:
+    return {
+        "id": c.id,
+        "session_id": c.session_id,
+        "user_message": c.user_message,
+        "assistant_response": c.assistant_response,
+        "plugin_used": c.plugin_used,
+        "metadata": c.extra_data,
+        "created_at": c.created_at.isoformat() if c.created_at else None,
+    }
+
+
+class ConversationArchive:
+    """
+    Date-partitioned, gzip-compressed NDJSON archive of old conversations.
+
+    Layout: <archive_dir>/conversations/YYYY/MM/conversations-YYYY-MM-DD.ndjson.gz
+    Each archiving batch is appended as a new gzip member, so partitions
+    are never rewritten and stay readable with plain `zcat`.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = os.path.join(root or settings.archive_dir, "conversations")
+
+    def partition_path(self, day: date) -> str:
+        return os.path.join(
+            self.root, f"{day:%Y}", f"{day:%m}", f"conversations-{day:%Y-%m-%d}.ndjson.gz"
+        )
+
+    def append(self, rows: List[Dict[str, Any]]):
+        """Append rows to their day partitions and fsync before returning."""
+        by_day: Dict[date, List[str]] = defaultdict(list)
+        for row in rows:
+            day = datetime.fromisoformat(row["created_at"]).date()
+            by_day[day].append(json.dumps(row))
+
+        for day, lines in by_day.items():
+            path = self.partition_path(day)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="ab") as gz:
+                    gz.write(("\n".join(lines) + "\n").encode())
+                raw.flush()
+                os.fsync(raw.fileno())
+
+    def partitions(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """Partition files overlapping [start, end), oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        first = as_stored(start).date() if start else None
+        last = as_stored(end).date() if end else None
+
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                match = _PARTITION_RE.match(name)
+                if not match:
+                    continue
+                day = date.fromisoformat(match.group(1))
+                if (first and day < first) or (last and day > last):
+                    continue
+                found.append((day, os.path.join(dirpath, name)))
+        return [path for _, path in sorted(found)]
+
+    def iter_rows(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        session_id: Optional[str] = None,
+        plugin_used: Optional[str] = None,
+        max_partitions: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream archived rows matching the filters, one partition at a time.
+
+        With max_partitions, only the newest that many partitions in the
+        range are read.
+        """
+        lo = as_stored(start) if start else None
+        hi = as_stored(end) if end else None
+
+        paths = self.partitions(start, end)
+        if max_partitions is not None:
+            paths = paths[-max_partitions:] if max_partitions > 0 else []
+        for path in paths:
+            seen = set()  # an interrupted run may have archived a batch twice
+            with gzip.open(path, "rt") as f:
+                for line in f:
+                    row = json.loads(line)
+                    if row["id"] in seen:
+                        continue
+                    seen.add(row["id"])
+                    if session_id and row["session_id"] != session_id:
+                        continue
+                    if plugin_used and row["plugin_used"] != plugin_used:
+                        continue
+                    created = datetime.fromisoformat(row["created_at"])
+                    if (lo and created < lo) or (hi and created >= hi):
+                        continue
+                    yield row
+
+    def search_rows(
+        self, terms: List[str], limit: int, max_partitions: Optional[int] = None, **filters,
+    ) -> List[Dict[str, Any]]:
+        """
+        Linear scan for rows containing every term (archived ranges aren't indexed).
+
+        At most max_partitions day partitions are read (default
+        settings.archive_search_max_days); the newest ones in the range win.
+        """
+        if max_partitions is None:
+            max_partitions = settings.archive_search_max_days
+        wanted = [t.lower() for t in terms]
+        hits = []
+        for row in self.iter_rows(max_partitions=max_partitions, **filters):
+            haystack = f"{row['user_message'] or ''} {row['assistant_response'] or ''}".lower()
+            if all(t in haystack for t in wanted):
+                hits.append(row)
+                if len(hits) >= limit:
+                    break
+        return hits
+
+    async def aiter_rows(self, batch_size: int = 500, **filters) -> AsyncIterator[Dict[str, Any]]:
+        """Async wrapper over iter_rows; file reads happen in a worker thread."""
+        rows = self.iter_rows(**filters)
+
+        def next_batch():
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    break
+            return batch
+
+        while True:
+            batch = await asyncio.to_thread(next_batch)
+            if not batch:
+                return
+            for row in batch:
+                yield row
+
+
+class RetentionManager:
+    """
+    Moves conversations older than the hot window into the archive.
+
+    Rows are processed oldest first in chunks of `batch_size`. Each chunk is
+    read, appended to the archive, then deleted in its own short
+    transaction, so no long-running lock is held on the hot table.
+    Rollups are left in place, so analytics still cover archived history.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, archive: Optional[ConversationArchive] = None):
+        self.enabled = settings.retention_enabled
+        self.hot_days = settings.retention_hot_days
+        self.batch_size = settings.retention_batch_size
+        self.interval = settings.retention_interval_minutes * 60
+        self.session_factory = session_factory
+        self.archive = archive or ConversationArchive()
+
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self.runs = 0
+        self.archived_rows = 0
+        self.last_run: Optional[str] = None
+        self.last_run_rows = 0
+        self.last_error: Optional[str] = None
+
+    def cutoff(self) -> datetime:
+        return as_stored(datetime.now(timezone.utc) - timedelta(days=self.hot_days))
+
+    async def run_once(self) -> int:
+        """Archive everything older than the hot window. Returns rows moved."""
+        async with self._lock:
+            cutoff = self.cutoff()
+            moved = 0
+            try:
+                while True:
+                    async with self.session_factory() as db:
+                        result = await db.execute(
+                            select(Conversation)
+                            .where(Conversation.created_at < cutoff)
+                            .order_by(Conversation.created_at, Conversation.id)
+                            .limit(self.batch_size)
+                        )
+                        batch = list(result.scalars().all())
+                        if not batch:
+                            break
+
+                        await asyncio.to_thread(self.archive.append, [_row_to_dict(c) for c in batch])
+                        await db.execute(
+                            delete(Conversation).where(Conversation.id.in_([c.id for c in batch]))
+                        )
+                        await db.commit()
+
+                    for session_id in {c.session_id for c in batch}:
+                        session_history_cache.invalidate(session_id)
+                    moved += len(batch)
+                    await asyncio.sleep(0)  # let request handlers run between chunks
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[WARN] Retention run failed after {moved} rows: {e}")
+
+            self.runs += 1
+            self.archived_rows += moved
+            self.last_run_rows = moved
+            self.last_run = datetime.now(timezone.utc).isoformat()
+            if moved:
+                print(f"[OK] Archived {moved} conversations older than {cutoff:%Y-%m-%d}")
+            return moved
+
+    async def start(self):
+        """Run retention periodically in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "hot_days": self.hot_days,
+            "cutoff": self.cutoff().isoformat(),
+            "batch_size": self.batch_size,
+            "archive_dir": self.archive.root,
+            "runs": self.runs,
+            "archived_rows": self.archived_rows,
+            "last_run": self.last_run,
+            "last_run_rows": self.last_run_rows,
+            "last_error": self.last_error,
+        }
+
+
+# Global instances
+conversation_archive = ConversationArchive()
+retention_manager = RetentionManager(archive=conversation_archive)
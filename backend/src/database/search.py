@@ -0,0 +1,262 @@
+from sqlalchemy import DateTime, Float, Integer, String, Text, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import re
+
+# ---------------------------------------------------------------------------
+# Index DDL
+# ---------------------------------------------------------------------------
+# SQLite: an external-content FTS5 table over `conversations`, kept in sync by
+# triggers, so every insert/delete/update (including bulk inserts) updates the
+# index incrementally. MySQL: an InnoDB FULLTEXT index, maintained natively.
+
+_SQLITE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+        user_message, assistant_response,
+        content='conversations', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_ai AFTER INSERT ON conversations BEGIN
+        INSERT INTO conversations_fts(rowid, user_message, assistant_response)
+        VALUES (new.id, new.user_message, new.assistant_response);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_ad AFTER DELETE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, user_message, assistant_response)
+        VALUES ('delete', old.id, old.user_message, old.assistant_response);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_au AFTER UPDATE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, user_message, assistant_response)
+        VALUES ('delete', old.id, old.user_message, old.assistant_response);
+        INSERT INTO conversations_fts(rowid, user_message, assistant_response)
+        VALUES (new.id, new.user_message, new.assistant_response);
+    END
+    """,
+]
+
+_MYSQL_FULLTEXT_INDEX = "ft_conversations_text"
+
+
+def ensure_search_index(engine):
+    """Create the full-text index for the active backend. Safe to call repeatedly."""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                existed = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'conversations_fts'"
+                )).first() is not None
+                for ddl in _SQLITE_FTS_DDL:
+                    conn.execute(text(ddl))
+                if not existed:
+                    # Index rows written before full-text search existed
+                    conn.execute(text(
+                        "INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')"
+                    ))
+            elif dialect == "mysql":
+                exists = conn.execute(text(
+                    "SELECT 1 FROM information_schema.statistics "
+                    "WHERE table_schema = DATABASE() AND table_name = 'conversations' "
+                    "AND index_name = :name LIMIT 1"
+                ), {"name": _MYSQL_FULLTEXT_INDEX}).first() is not None
+                if not exists:
+                    conn.execute(text(
+                        f"ALTER TABLE conversations ADD FULLTEXT INDEX "
+                        f"{_MYSQL_FULLTEXT_INDEX} (user_message, assistant_response)"
+                    ))
+            else:
+                print(f"[WARN] Full-text search not supported on {dialect}")
+                return
+        print(f"[OK] Full-text search index ready ({dialect})")
+    except Exception as e:
+        print(f"[WARN] Full-text search index unavailable: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+_RESULT_COLUMNS = dict(
+    id=Integer(),
+    session_id=String(),
+    user_message=Text(),
+    assistant_response=Text(),
+    plugin_used=String(),
+    created_at=DateTime(),
+    score=Float(),
+)
+
+
+class ConversationSearch:
+    """Ranked full-text search over conversation messages and responses."""
+
+    MAX_RESULTS = 100
+    SNIPPET_WORDS = 12
+
+    async def search(
+        self,
+        db: AsyncSession,
+        query: str,
+        session_id: Optional[str] = None,
+        plugin_used: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Return best matches first, each with a relevance score and snippets."""
+        terms = self._terms(query)
+        if not terms:
+            return []
+        limit = max(1, min(limit, self.MAX_RESULTS))
+
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            return await self._search_sqlite(db, terms, session_id, plugin_used, limit)
+        if dialect == "mysql":
+            return await self._search_mysql(db, query, terms, session_id, plugin_used, limit)
+        raise RuntimeError(f"Full-text search not supported on {dialect}")
+
+    async def search_archived(
+        self,
+        archive,
+        query: str,
+        limit: int = 20,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        session_id: Optional[str] = None,
+        plugin_used: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Matches from a ConversationArchive, in the same shape as `search`.
+
+        Archived rows aren't indexed: they have a null score and are scanned
+        in a worker thread, at most settings.archive_search_max_days
+        partitions per call.
+        """
+        terms = self._terms(query)
+        if not terms:
+            return []
+        limit = max(1, min(limit, self.MAX_RESULTS))
+
+        rows = await asyncio.to_thread(
+            archive.search_rows, terms, limit,
+            start=start, end=end, session_id=session_id, plugin_used=plugin_used,
+        )
+        return [{
+            **row,
+            "score": None,
+            "archived": True,
+            "user_snippet": self._snippet(row["user_message"], terms),
+            "response_snippet": self._snippet(row["assistant_response"], terms),
+        } for row in rows]
+
+    async def _search_sqlite(self, db, terms, session_id, plugin_used, limit):
+        filters, params = self._filters(session_id, plugin_used)
+        # Quote every term so user input can't inject FTS5 query syntax
+        params["match"] = " ".join('"' + t.replace('"', '""') + '"' for t in terms)
+        params["limit"] = limit
+
+        stmt = text(f"""
+            SELECT c.id, c.session_id, c.user_message, c.assistant_response,
+                   c.plugin_used, c.created_at,
+                   -bm25(conversations_fts) AS score,
+                   snippet(conversations_fts, 0, '[', ']', '...', {self.SNIPPET_WORDS}) AS user_snippet,
+                   snippet(conversations_fts, 1, '[', ']', '...', {self.SNIPPET_WORDS}) AS response_snippet
+            FROM conversations_fts
+            JOIN conversations c ON c.id = conversations_fts.rowid
+            WHERE conversations_fts MATCH :match {filters}
+            ORDER BY bm25(conversations_fts)
+            LIMIT :limit
+        """).columns(**_RESULT_COLUMNS, user_snippet=Text(), response_snippet=Text())
+
+        result = await db.execute(stmt, params)
+        return [self._to_dict(row, row.user_snippet, row.response_snippet) for row in result]
+
+    async def _search_mysql(self, db, query, terms, session_id, plugin_used, limit):
+        filters, params = self._filters(session_id, plugin_used)
+        params["query"] = query
+        params["limit"] = limit
+
+        stmt = text(f"""
+            SELECT c.id, c.session_id, c.user_message, c.assistant_response,
+                   c.plugin_used, c.created_at,
+                   MATCH(c.user_message, c.assistant_response)
+                       AGAINST (:query IN NATURAL LANGUAGE MODE) AS score
+            FROM conversations c
+            WHERE MATCH(c.user_message, c.assistant_response)
+                  AGAINST (:query IN NATURAL LANGUAGE MODE) {filters}
+            ORDER BY score DESC
+            LIMIT :limit
+        """).columns(**_RESULT_COLUMNS)
+
+        result = await db.execute(stmt, params)
+        return [
+            self._to_dict(
+                row,
+                self._snippet(row.user_message, terms),
+                self._snippet(row.assistant_response, terms),
+            )
+            for row in result
+        ]
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _terms(query: str) -> List[str]:
+        return re.findall(r"\w+", query or "")
+
+    @staticmethod
+    def _filters(session_id: Optional[str], plugin_used: Optional[str]):
+        clauses, params = [], {}
+        if session_id:
+            clauses.append("AND c.session_id = :session_id")
+            params["session_id"] = session_id
+        if plugin_used:
+            clauses.append("AND c.plugin_used = :plugin_used")
+            params["plugin_used"] = plugin_used
+        return " ".join(clauses), params
+
+    def _snippet(self, content: Optional[str], terms: List[str]) -> str:
+        """Window of words around the first matching term, matches in [brackets]."""
+        words = (content or "").split()
+        lowered = {t.lower() for t in terms}
+        hit = next(
+            (i for i, w in enumerate(words) if re.sub(r"\W", "", w.lower()) in lowered),
+            None,
+        )
+        if hit is None:
+            return " ".join(words[:self.SNIPPET_WORDS])
+
+        start = max(0, hit - self.SNIPPET_WORDS // 2)
+        window = words[start:start + self.SNIPPET_WORDS]
+        marked = [
+            f"[{w}]" if re.sub(r"\W", "", w.lower()) in lowered else w
+            for w in window
+        ]
+        prefix = "..." if start > 0 else ""
+        suffix = "..." if start + self.SNIPPET_WORDS < len(words) else ""
+        return prefix + " ".join(marked) + suffix
+
+    @staticmethod
+    def _to_dict(row, user_snippet: str, response_snippet: str) -> Dict[str, Any]:
+        return {
+            "id": row.id,
+            "session_id": row.session_id,
+            "plugin_used": row.plugin_used,
+            "score": round(float(row.score or 0.0), 4),
+            "user_message": row.user_message,
+            "assistant_response": row.assistant_response,
+            "user_snippet": user_snippet,
+            "response_snippet": response_snippet,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }
+
+
+# Global instance
+conversation_search = ConversationSearch()
@@ -0,0 +1,248 @@
+import asyncio
+import time
+import structlog
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from src.config.database import AsyncSessionLocal
+from src.config.settings import settings
+from src.database.crud import conversation_crud
+
+logger = structlog.get_logger("jarvis.db")
+
+
+class ConversationWriteBehind:
+    """
+    Write-behind persistence for chat exchanges.
+
+    Exchanges are put on a bounded in-memory queue and a background writer
+    flushes them in bulk, either when `batch_size` rows are waiting or when
+    `flush_interval_ms` has passed since the first row of the batch arrived.
+
+    - Backpressure: when the queue is full, enqueue() waits for the writer.
+    - Failures: a failed batch is retried `max_retries` times with
+      exponential backoff (the queue backs up meanwhile), then written row
+      by row so one bad row cannot sink the rest. Only rows that still fail
+      are dropped, and each drop is logged.
+    - Not running (never started, or stopped): enqueue() writes directly.
+    - Shutdown: stop() drains the queue and flushes the remainder.
+    - Metrics: get_stats() reports queue depth and flush latency.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        session_factory=AsyncSessionLocal,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_backoff_ms: Optional[int] = None,
+    ):
+        self.enabled = settings.conversation_write_behind
+        self.session_factory = session_factory
+        self.max_queue = max_queue or settings.write_behind_queue_size
+        self.batch_size = batch_size or settings.write_behind_batch_size
+        self.flush_interval = (flush_interval_ms or settings.write_behind_flush_interval_ms) / 1000
+        self.max_retries = settings.write_behind_max_retries if max_retries is None else max_retries
+        self.retry_backoff = (
+            settings.write_behind_retry_backoff_ms if retry_backoff_ms is None else retry_backoff_ms
+        ) / 1000
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # --- Metrics ---
+        self.enqueued = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.retries = 0
+        self.direct_writes = 0
+        self.flushes = 0
+        self.backpressure_waits = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Start the background writer (idempotent)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._writer_loop())
+        print(
+            f"[OK] Write-behind persistence active "
+            f"(queue={self.max_queue}, batch={self.batch_size}, "
+            f"interval={int(self.flush_interval * 1000)}ms)"
+        )
+
+    async def stop(self):
+        """Flush everything still queued, then stop the writer."""
+        if not self.running:
+            return
+        await self._queue.put(self._STOP)
+        await self._task
+        self._task = None
+        print(f"[OK] Write-behind persistence stopped ({self.flushed_rows} rows flushed)")
+
+    # ------------------------------------------------------------------
+    # Producer side
+    # ------------------------------------------------------------------
+
+    async def enqueue(
+        self,
+        session_id: str,
+        user_message: str,
+        assistant_response: str,
+        plugin_used: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+    ):
+        """
+        Queue an exchange for persistence. Waits only if the queue is full.
+
+        If the writer is not running, the exchange is written before
+        returning instead (and write errors are raised to the caller).
+        """
+        row = {
+            "session_id": session_id,
+            "user_message": user_message,
+            "assistant_response": assistant_response,
+            "plugin_used": plugin_used,
+            "extra_data": metadata,
+            # Stamp at enqueue time so ordering reflects when the chat happened
+            "created_at": datetime.now(timezone.utc),
+        }
+        if not self.running:
+            await self._write([row])
+            self.direct_writes += 1
+            return
+        if self._queue.full():
+            self.backpressure_waits += 1
+        await self._queue.put(row)
+        self.enqueued += 1
+
+    # ------------------------------------------------------------------
+    # Writer side
+    # ------------------------------------------------------------------
+
+    async def _writer_loop(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is self._STOP:
+                break
+
+            batch: List[Dict[str, Any]] = [item]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+        # Drain anything that raced in behind the stop marker
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not self._STOP:
+                remaining.append(item)
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start:start + self.batch_size])
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        async with self.session_factory() as db:
+            await conversation_crud.save_conversations_bulk(db, rows)
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._write(batch)
+                self.flushed_rows += len(batch)
+                break
+            except Exception as e:
+                logger.warning(
+                    "write_behind_flush_failed",
+                    rows=len(batch), attempt=attempt + 1, error=str(e),
+                )
+            if attempt < self.max_retries:
+                self.retries += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+        else:
+            await self._flush_rows(batch)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        self.last_batch_size = len(batch)
+        self.last_flush_ms = round(elapsed_ms, 2)
+        self.max_flush_ms = round(max(self.max_flush_ms, elapsed_ms), 2)
+        self._total_flush_ms += elapsed_ms
+
+    async def _flush_rows(self, batch: List[Dict[str, Any]]):
+        """Last resort for a batch that keeps failing: write rows one by one."""
+        for row in batch:
+            try:
+                await self._write([row])
+                self.flushed_rows += 1
+            except Exception as e:
+                self.failed_rows += 1
+                logger.error(
+                    "write_behind_row_dropped",
+                    session_id=row["session_id"],
+                    created_at=row["created_at"].isoformat(),
+                    error=str(e),
+                )
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth, throughput and flush-latency metrics."""
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "enqueued": self.enqueued,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "retries": self.retries,
+            "direct_writes": self.direct_writes,
+            "flushes": self.flushes,
+            "backpressure_waits": self.backpressure_waits,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_ms": self.last_flush_ms,
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+            "max_flush_ms": self.max_flush_ms,
+        }
+
+
+# Global instance
+conversation_writer = ConversationWriteBehind()
@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -6,6 +6,7 @@ import uvicorn
 
 from src.config.settings import settings
 from src.api.v1.router import api_router
+from src.core.responses import FastJSONResponse
 
 # --- Middleware imports ---
 from src.middleware.error_handler import (
@@ -18,16 +19,19 @@ from src.middleware.logging_config import (
     configure_logging,
 )
 from src.middleware.rate_limiter import RateLimiterMiddleware
+from src.middleware.rate_limit_backends import build_rate_limit_backend
 from src.middleware.security import SecurityHeadersMiddleware
+from src.middleware.fused import FusedEdgeMiddleware
 
 # --- Configure structured logging ---
-configure_logging(settings.environment)
+configure_logging(settings.environment, queue_size=settings.log_queue_size)
 
 # --- App ---
 app = FastAPI(
     title="J.A.R.V.I.S. AI Assistant",
     description="Enterprise-grade AI personal assistant",
     version="2.0.0",
+    default_response_class=FastJSONResponse,
 )
 
 # --- CORS middleware ---
@@ -38,16 +42,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # history page cursor, read by browser clients
 )
 
 # --- Custom middleware (order matters: outermost first) ---
-app.add_middleware(SecurityHeadersMiddleware, max_body_size_mb=settings.max_request_size_mb)
-app.add_middleware(
-    RateLimiterMiddleware,
+rate_limit_options = dict(
     rate_limit=settings.rate_limit_per_minute,
     chat_rate_limit=settings.chat_rate_limit_per_minute,
+    max_keys=settings.rate_limit_max_keys,
+    backend=build_rate_limit_backend(settings),
+    backend_retry_seconds=settings.rate_limit_backend_retry_seconds,
+)
+log_options = dict(
+    log_sample_rate=settings.log_sample_rate,
+    log_slow_ms=settings.log_slow_request_ms,
+    server_timing=settings.server_timing_header,
 )
-app.add_middleware(RequestLoggingMiddleware)
+if settings.fused_middleware:
+    app.add_middleware(
+        FusedEdgeMiddleware,
+        max_body_size_mb=settings.max_request_size_mb,
+        **rate_limit_options,
+        **log_options,
+    )
+else:
+    app.add_middleware(SecurityHeadersMiddleware, max_body_size_mb=settings.max_request_size_mb)
+    app.add_middleware(RateLimiterMiddleware, **rate_limit_options)
+    app.add_middleware(
+        RequestLoggingMiddleware,
+        sample_rate=log_options["log_sample_rate"],
+        slow_ms=log_options["log_slow_ms"],
+        server_timing=log_options["server_timing"],
+    )
 
 # --- Exception handlers ---
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
@@ -71,6 +97,13 @@ def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    from src.core.metrics import render_metrics
+    payload, content_type = render_metrics()
+    return Response(content=payload, media_type=content_type)
+
+
 @app.get("/api/v1/health")
 def health_check_v1():
     return {"status": "healthy", "service": "jarvis-ai-v2"}
@@ -80,10 +113,39 @@ def health_check_v1():
 @app.on_event("startup")
 async def startup():
     from src.config.database import init_db
+    from src.core.loop_watchdog import loop_watchdog
+    from src.database.history_cache import session_history_cache
+    from src.database.retention import retention_manager
+    from src.database.write_behind import conversation_writer
+    from src.services.connection_manager import manager
+    if loop_watchdog.enabled:
+        await loop_watchdog.start()
     init_db()
+    await manager.start()
+    session_history_cache.share_with(manager)
+    if conversation_writer.enabled:
+        await conversation_writer.start()
+    if retention_manager.enabled:
+        await retention_manager.start()
     print("[OK] J.A.R.V.I.S. backend v2.0.0 online - all systems operational")
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    from src.config.database import dispose_engines
+    from src.core.loop_watchdog import loop_watchdog
+    from src.core.metrics import mark_worker_dead
+    from src.database.retention import retention_manager
+    from src.database.write_behind import conversation_writer
+    from src.services.connection_manager import manager
+    await manager.stop()
+    await loop_watchdog.stop()
+    await retention_manager.stop()
+    await conversation_writer.stop()
+    await dispose_engines()
+    mark_worker_dead()
+
+
 if __name__ == "__main__":
     uvicorn.run(
         app,
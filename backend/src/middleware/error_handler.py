@@ -1,15 +1,15 @@
 from fastapi import Request
-from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import traceback
 import uuid
 from datetime import datetime
+from src.core.responses import FastJSONResponse
 
 
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     """Handle HTTP exceptions with structured JSON."""
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
         content={
             "error": True,
@@ -18,6 +18,7 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
             "request_id": getattr(request.state, "request_id", str(uuid.uuid4())),
             "timestamp": datetime.now().isoformat(),
         },
+        headers=getattr(exc, "headers", None),
     )
 
 
@@ -28,7 +29,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         field = " -> ".join(str(loc) for loc in error.get("loc", []))
         errors.append({"field": field, "message": error.get("msg", "")})
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=422,
         content={
             "error": True,
@@ -49,7 +50,7 @@ async def generic_exception_handler(request: Request, exc: Exception):
     print(f"[ERROR] request_id={request_id}")
     traceback.print_exc()
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={
             "error": True,
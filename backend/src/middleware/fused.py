@@ -0,0 +1,78 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Any, Optional
+from src.middleware.logging_config import RequestLoggingMiddleware
+from src.middleware.rate_limiter import RateLimiterMiddleware
+from src.middleware.security import SecurityHeadersMiddleware, append_headers
+
+
+class FusedEdgeMiddleware:
+    """
+    Request logging, rate limiting and security checks in a single ASGI layer.
+
+    Behaves like RequestLoggingMiddleware -> RateLimiterMiddleware ->
+    SecurityHeadersMiddleware stacked, in that order: a request is counted
+    against its rate limit before its Content-Length is checked, so a 413
+    uses up a token and carries RateLimit-* headers. It wraps `send`/`receive`
+    once per request instead of three times. One difference: a 429 also gets
+    the security headers, which the stacked limiter, sitting outside
+    SecurityHeadersMiddleware, doesn't add.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_body_size_mb: float = 1.0,
+        rate_limit: int = 60,
+        chat_rate_limit: int = 20,
+        max_keys: int = 100_000,
+        backend: Optional[Any] = None,
+        backend_retry_seconds: float = 5.0,
+        log_sample_rate: float = 1.0,
+        log_slow_ms: float = 1000.0,
+        server_timing: bool = True,
+    ):
+        self.app = app
+        self.logging = RequestLoggingMiddleware(
+            app, sample_rate=log_sample_rate, slow_ms=log_slow_ms, server_timing=server_timing
+        )
+        self.rate_limiter = RateLimiterMiddleware(
+            app,
+            rate_limit=rate_limit,
+            chat_rate_limit=chat_rate_limit,
+            max_keys=max_keys,
+            backend=backend,
+            backend_retry_seconds=backend_retry_seconds,
+        )
+        self.security = SecurityHeadersMiddleware(app, max_body_size_mb=max_body_size_mb)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = self.logging.begin(scope)
+        pairs = list(self.security.header_pairs(scope))
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                ctx.status = message["status"]
+                append_headers(message, pairs)
+                append_headers(message, self.logging.response_headers(ctx))
+            await send(message)
+
+        try:
+            limited = await self.rate_limiter.check(scope)
+            if limited is not None:
+                decision, rate_pairs = limited
+                if not decision.allowed:
+                    await self.rate_limiter.reject(decision, rate_pairs, scope, receive, send_with_headers)
+                    return
+                pairs.extend(rate_pairs)
+
+            if self.security.content_length_exceeded(scope):
+                await self.security.reject(scope, receive, send_with_headers)
+                return
+
+            await self.app(scope, self.security.limit_body(receive), send_with_headers)
+        finally:
+            self.logging.complete(scope, ctx)
@@ -1,39 +1,159 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Any, Dict, Optional, TextIO
+import atexit
+from functools import partialmethod
+import queue
+import random
+import sys
+import threading
 import time
 import uuid
 import structlog
+from contextvars import Token
+from src.core.metrics import HTTP_REQUESTS_IN_FLIGHT, observe_http_request, route_template
+from src.core.tracing import Trace, end_trace, start_trace
+from src.middleware.security import HeaderPairs, append_headers
+
+# ---------------------------------------------------------------------------
+# Background log sink
+# ---------------------------------------------------------------------------
+
+class QueueLogSink:
+    """
+    Bounded queue between structlog and stdout, drained by a daemon thread.
+
+    Loggers only enqueue the processed event dict; rendering and the write
+    happen on the sink thread, so logging never blocks the event loop on
+    stdout. If the queue is full the event is dropped and counted, and the
+    thread reports the number of drops in its next write.
+    """
+
+    def __init__(self, maxsize: int = 10000, batch_size: int = 256):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.renderer = structlog.dev.ConsoleRenderer(colors=False)
+        self.stream: TextIO = sys.stdout
+        self._queue: "queue.Queue" = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+        self._dropped_reported = 0
+
+    def start(self):
+        if self._thread is None:
+            self._queue = queue.Queue(self.maxsize)
+            self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def submit(self, method_name: str, event_dict: Dict[str, Any]):
+        try:
+            self._queue.put_nowait((method_name, event_dict))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def close(self, timeout: float = 2.0):
+        """Flush queued events and stop the thread."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            lines = [
+                self._render(method_name, event_dict)
+                for method_name, event_dict in (item for item in batch if item is not None)
+            ]
+            if self.dropped > self._dropped_reported:
+                lines.append(self._render("warning", {
+                    "event": "log_events_dropped",
+                    "count": self.dropped - self._dropped_reported,
+                    "level": "warning",
+                }))
+                self._dropped_reported = self.dropped
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+                self.written += len(lines)
+            if stop:
+                return
+
+    def _render(self, method_name: str, event_dict: Dict[str, Any]) -> str:
+        try:
+            return self.renderer(None, method_name, event_dict)
+        except Exception as e:
+            return f"[log render error] {e}: {event_dict!r}"
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self.maxsize,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+class _QueueLogger:
+    """structlog logger whose every method hands the event to the sink."""
+
+    def __init__(self, sink: QueueLogSink):
+        self._sink = sink
+
+    def _log(self, method_name: str, **event_dict):
+        self._sink.submit(method_name, event_dict)
+
+    debug = partialmethod(_log, "debug")
+    info = msg = partialmethod(_log, "info")
+    warning = warn = partialmethod(_log, "warning")
+    error = exception = partialmethod(_log, "error")
+    critical = fatal = partialmethod(_log, "critical")
+
+
+# Global instance
+log_sink = QueueLogSink()
+
 
 # ---------------------------------------------------------------------------
 # Structlog configuration
 # ---------------------------------------------------------------------------
 
-def configure_logging(environment: str = "development"):
+def configure_logging(environment: str = "development", queue_size: int = 10000):
     """Configure structlog for pretty dev output or JSON production output."""
-    shared_processors = [
-        structlog.contextvars.merge_contextvars,
-        structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-    ]
-
     if environment == "production":
-        structlog.configure(
-            processors=[
-                *shared_processors,
-                structlog.processors.JSONRenderer(),
-            ],
-            logger_factory=structlog.PrintLoggerFactory(),
-            cache_logger_on_first_use=True,
-        )
+        log_sink.renderer = structlog.processors.JSONRenderer()
     else:
-        structlog.configure(
-            processors=[
-                *shared_processors,
-                structlog.dev.ConsoleRenderer(colors=True),
-            ],
-            logger_factory=structlog.PrintLoggerFactory(),
-            cache_logger_on_first_use=True,
-        )
+        log_sink.renderer = structlog.dev.ConsoleRenderer(colors=True)
+    log_sink.maxsize = queue_size
+    log_sink.start()
+
+    structlog.configure(
+        processors=[
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso"),
+            # No renderer here: the event dict is rendered on the sink thread
+        ],
+        logger_factory=lambda *args: _QueueLogger(log_sink),
+        cache_logger_on_first_use=True,
+    )
 
 
 logger = structlog.get_logger("jarvis")
@@ -43,37 +163,109 @@ logger = structlog.get_logger("jarvis")
 # Request / Response logging middleware
 # ---------------------------------------------------------------------------
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Logs every request with method, path, status code, and latency."""
+class RequestContext:
+    __slots__ = ("request_id", "start", "trace", "trace_token", "status")
+
+    def __init__(self, request_id: str, trace: Trace, trace_token: Token):
+        self.request_id = request_id
+        self.start = time.perf_counter()
+        self.trace = trace
+        self.trace_token = trace_token
+        self.status = 500
 
-    async def dispatch(self, request: Request, call_next):
-        request_id = str(uuid.uuid4())[:8]
-        request.state.request_id = request_id
 
-        start = time.perf_counter()
+class RequestLoggingMiddleware:
+    """
+    Logs one `request` event per request with method, path, status, and latency,
+    and records it in the Prometheus request histogram.
 
-        # Log request
-        logger.info(
-            "request_started",
-            request_id=request_id,
-            method=request.method,
-            path=str(request.url.path),
-            client=request.client.host if request.client else "unknown",
+    Each request also runs inside a trace (see src.core.tracing); the stages
+    finished before the response starts are returned in a Server-Timing
+    header.
+
+    Successful requests faster than `slow_ms` are sampled at `sample_rate`;
+    errors (status >= 400) and slow requests are always logged.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 1.0,
+        slow_ms: float = 1000.0,
+        server_timing: bool = True,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.server_timing = server_timing
+        self.sampled_out = 0
+
+    @staticmethod
+    def begin(scope: Scope) -> RequestContext:
+        """Assign a request ID and start the request's trace."""
+        request_id = uuid.uuid4().hex[:8]
+        scope.setdefault("state", {})["request_id"] = request_id
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        trace, token = start_trace(
+            f"{scope['method']} {scope['path']}",
+            **{"http.method": scope["method"], "http.target": scope["path"], "request_id": request_id},
         )
+        return RequestContext(request_id, trace, token)
+
+    def response_headers(self, ctx: RequestContext) -> HeaderPairs:
+        pairs = [(b"x-request-id", ctx.request_id.encode())]
+        if self.server_timing:
+            pairs.append((b"server-timing", ctx.trace.server_timing().encode()))
+        return pairs
 
-        response = await call_next(request)
+    def complete(self, scope: Scope, ctx: RequestContext):
+        elapsed = time.perf_counter() - ctx.start
+        status = ctx.status
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        observe_http_request(scope, status, elapsed)
 
-        elapsed_ms = round((time.perf_counter() - start) * 1000, 2)
+        route = route_template(scope)
+        ctx.trace.root.name = f"{scope['method']} {route}"
+        end_trace(ctx.trace, ctx.trace_token, **{"http.route": route, "http.status_code": status})
 
-        # Log response
-        logger.info(
-            "request_completed",
-            request_id=request_id,
-            method=request.method,
-            path=str(request.url.path),
-            status=response.status_code,
-            latency_ms=elapsed_ms,
+        latency_ms = elapsed * 1000
+        if (
+            status < 400
+            and latency_ms < self.slow_ms
+            and self.sample_rate < 1.0
+            and random.random() >= self.sample_rate
+        ):
+            self.sampled_out += 1
+            return
+
+        client = scope.get("client")
+        log = logger.warning if status >= 500 or latency_ms >= self.slow_ms else logger.info
+        log(
+            "request",
+            request_id=ctx.request_id,
+            method=scope["method"],
+            path=scope["path"],
+            client=client[0] if client else "unknown",
+            status=status,
+            latency_ms=round(latency_ms, 2),
+            trace_id=ctx.trace.trace_id,
         )
 
-        response.headers["X-Request-ID"] = request_id
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        ctx = self.begin(scope)
+
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                ctx.status = message["status"]
+                append_headers(message, self.response_headers(ctx))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            # Logged after the body is sent, so streaming responses are timed in full
+            self.complete(scope, ctx)
@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import Any, List, Optional, Tuple
+from src.core.resp import RespClient, RespError
+from src.middleware.rate_limiter import RateLimitDecision
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, shared memory backend unavailable
+    fcntl = None
+
+
+def _key_str(key: Tuple[str, str]) -> str:
+    return ":".join(key)
+
+
+# ---------------------------------------------------------------------------
+# Shared memory (several workers on one host)
+# ---------------------------------------------------------------------------
+
+_SHM_MAGIC = b"JRL1"
+_SHM_HEADER = struct.Struct("<4sI")   # magic, slot count
+_SHM_SLOT = struct.Struct("<Qd")      # key hash (0 = empty), TAT (unix seconds)
+_SHM_PROBES = 16
+_SHM_SPIN = 64  # non-blocking lock attempts before backing off
+_SHM_BACKOFF = 0.0005  # seconds slept between spins: frees the CPU for the lock holder
+
+
+class SharedMemoryBackend:
+    """
+    GCRA state in a memory-mapped file shared by all workers on the host.
+
+    The file is a fixed-size open-addressing table of (key hash, TAT) slots,
+    so memory is bounded by `slots`. Each check is one read-modify-write of
+    a slot under an exclusive flock, which makes updates atomic across
+    processes. When a key's probe window is full, an expired slot is reused,
+    else the slot with the oldest TAT is evicted. Wall-clock time is used so
+    every process agrees on "now".
+
+    The lock is only ever tried without blocking: on contention hit() spins
+    briefly, then sleeps on the event loop between spins (so a holder that
+    was preempted gets the CPU back), and gives up with TimeoutError after
+    `lock_timeout` seconds. The slot count is part
+    of the file name, so workers configured with different sizes use
+    different tables instead of reformatting one that others have mapped; a
+    file whose header doesn't match is refused, never rewritten.
+    """
+
+    name = "shared_memory"
+
+    def __init__(self, path: Optional[str] = None, slots: int = 65536, lock_timeout: float = 0.05):
+        if fcntl is None:
+            raise RuntimeError("Shared memory rate limiting requires fcntl (POSIX)")
+        root, ext = os.path.splitext(path or os.path.join(tempfile.gettempdir(), "jarvis-ratelimit.bin"))
+        self.path = f"{root}-{slots}{ext}"
+        self.slots = slots
+        self.lock_timeout = lock_timeout
+        self.lock_waits = 0
+        self.lock_timeouts = 0
+        size = _SHM_HEADER.size + slots * _SHM_SLOT.size
+        header = _SHM_HEADER.pack(_SHM_MAGIC, slots)
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)  # startup only, before serving
+            try:
+                current = os.fstat(self._fd).st_size
+                if current == 0:
+                    # First worker formats the table
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(self._fd, header, 0)
+                elif current != size or os.pread(self._fd, _SHM_HEADER.size, 0) != header:
+                    raise RuntimeError(
+                        f"{self.path} is not a {slots}-slot rate limit table; remove it or "
+                        f"set RATE_LIMIT_SHM_PATH"
+                    )
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(self._fd, size)
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    async def hit(self, key: Tuple[str, str], limit: int, period: float = 60.0) -> RateLimitDecision:
+        key_hash = self._hash(_key_str(key))
+        deadline = None
+        while True:
+            for _ in range(_SHM_SPIN):
+                try:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                try:
+                    return self._update(key_hash, limit, period)
+                finally:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+            # Held by another worker for longer than a check takes: back off without blocking the loop
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + self.lock_timeout
+                self.lock_waits += 1
+            elif now >= deadline:
+                self.lock_timeouts += 1
+                raise TimeoutError(f"rate limit table lock busy for over {self.lock_timeout:g}s")
+            await asyncio.sleep(_SHM_BACKOFF)
+
+    def hit_sync(self, key: Tuple[str, str], limit: int, period: float = 60.0) -> RateLimitDecision:
+        """Blocking variant of hit(), for use off the event loop."""
+        key_hash = self._hash(_key_str(key))
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            return self._update(key_hash, limit, period)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _update(self, key_hash: int, limit: int, period: float) -> RateLimitDecision:
+        """One GCRA step on the key's slot; the caller holds the lock."""
+        interval = period / limit
+        capacity = period
+        now = time.time()
+        offset, tat = self._find_slot(key_hash, key_hash % self.slots, now)
+        tat = max(tat, now)
+        new_tat = tat + interval
+        if new_tat - now > capacity:
+            return RateLimitDecision(False, limit, 0, tat - now, new_tat - now - capacity)
+        _SHM_SLOT.pack_into(self._map, offset, key_hash, new_tat)
+        remaining = int((capacity - (new_tat - now)) / interval + 1e-9)
+        return RateLimitDecision(True, limit, remaining, new_tat - now, 0.0)
+
+    def _find_slot(self, key_hash: int, start: int, now: float) -> Tuple[int, float]:
+        """Offset of the key's slot (or the one to claim for it) and its TAT."""
+        free = None
+        oldest, oldest_tat = None, float("inf")
+        for probe in range(_SHM_PROBES):
+            offset = _SHM_HEADER.size + ((start + probe) % self.slots) * _SHM_SLOT.size
+            slot_hash, tat = _SHM_SLOT.unpack_from(self._map, offset)
+            if slot_hash == key_hash:
+                return offset, tat
+            if free is None and (slot_hash == 0 or tat <= now):
+                free = offset
+            if tat < oldest_tat:
+                oldest, oldest_tat = offset, tat
+        return (free if free is not None else oldest), 0.0
+
+    async def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+# ---------------------------------------------------------------------------
+# Redis protocol (several nodes)
+# ---------------------------------------------------------------------------
+
+# GCRA in one atomic script. Uses the server clock so nodes with skewed
+# clocks still agree. Times are in milliseconds.
+_GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+if new_tat - now > capacity then
+  return {0, 0, tostring(tat - now), tostring(new_tat - now - capacity)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+local remaining = math.floor((capacity - (new_tat - now)) / interval + 1e-9)
+return {1, remaining, tostring(new_tat - now), '0'}
+"""
+
+
+class RedisBackend:
+    """
+    GCRA state in Redis (or any server speaking its protocol).
+
+    Each check runs one server-side script, so updates are atomic across
+    nodes. Checks arriving in the same event-loop tick are coalesced into a
+    single pipelined round trip.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "jarvis:rl:", timeout: float = 0.05):
+        self.client = RespClient(url, timeout=timeout)
+        self.prefix = prefix
+        self._sha: Optional[str] = None
+        self._pending: List[Tuple[Tuple[str, str], int, float, asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.batches = 0
+        self.batched_hits = 0
+
+    async def hit(self, key: Tuple[str, str], limit: int, period: float = 60.0) -> RateLimitDecision:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((key, limit, period, future))
+        if self._flush_task is None:
+            # Runs on the next loop iteration, after other ready requests queued theirs
+            self._flush_task = asyncio.create_task(self._flush())
+        return await future
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        self._flush_task = None
+        try:
+            replies = await self._run(batch)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.batched_hits += len(batch)
+        for (key, limit, period, future), reply in zip(batch, replies):
+            if future.done():
+                continue
+            if isinstance(reply, RespError):
+                future.set_exception(reply)
+            else:
+                allowed, remaining, reset_ms, retry_ms = reply
+                future.set_result(RateLimitDecision(
+                    bool(allowed), limit, int(remaining),
+                    float(reset_ms) / 1000, float(retry_ms) / 1000,
+                ))
+
+    async def _run(self, batch) -> List[Any]:
+        if self._sha is None or not self.client.connected:
+            self._sha = (await self.client.execute("SCRIPT", "LOAD", _GCRA_SCRIPT)).decode()
+
+        def commands(sha_or_script: str, verb: str):
+            return [
+                (verb, sha_or_script, 1, self.prefix + _key_str(key),
+                 period * 1000 / limit, period * 1000)
+                for key, limit, period, _ in batch
+            ]
+
+        replies = await self.client.execute_many(commands(self._sha, "EVALSHA"))
+        if any(isinstance(r, RespError) and str(r).startswith("NOSCRIPT") for r in replies):
+            # Script cache was flushed on the server; EVAL reloads it
+            replies = await self.client.execute_many(commands(_GCRA_SCRIPT, "EVAL"))
+        return replies
+
+    async def close(self):
+        await self.client.close()
+
+
+def build_rate_limit_backend(settings) -> Optional[Any]:
+    """Backend chosen by RATE_LIMIT_BACKEND, or None for per-worker local limits."""
+    kind = settings.rate_limit_backend.lower()
+    try:
+        if kind == "shared_memory":
+            backend = SharedMemoryBackend(
+                path=settings.rate_limit_shm_path or None,
+                slots=settings.rate_limit_shm_slots,
+                lock_timeout=settings.rate_limit_backend_timeout_ms / 1000,
+            )
+        elif kind == "redis":
+            backend = RedisBackend(
+                settings.rate_limit_redis_url,
+                timeout=settings.rate_limit_backend_timeout_ms / 1000,
+            )
+        else:
+            return None
+    except Exception as e:
+        print(f"[WARN] Rate limit backend '{kind}' unavailable, using local limits: {e}")
+        return None
+    print(f"[OK] Rate limit backend: {kind}")
+    return backend
@@ -1,59 +1,201 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi.responses import JSONResponse
+import math
 import time
-from collections import defaultdict
+from collections import OrderedDict
 from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from src.middleware.security import HeaderPairs, append_headers
 
 
-class RateLimiterMiddleware(BaseHTTPMiddleware):
+class RateLimitDecision:
+    __slots__ = ("allowed", "limit", "remaining", "reset_after", "retry_after")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset_after: float, retry_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_after = reset_after  # seconds until the bucket is full again
+        self.retry_after = retry_after  # seconds until the next request is allowed
+
+
+class GCRARateLimiter:
+    """
+    Generic Cell Rate Algorithm (a token bucket stored as one timestamp).
+
+    Each key keeps only its theoretical arrival time (TAT), so a check is
+    O(1) in time and memory regardless of request rate. A key whose TAT is
+    in the past is indistinguishable from a fresh one, so it can be dropped
+    at no cost: the table is purged of expired keys oldest-first on every
+    check and hard-capped at `max_keys` (least recently used go first).
     """
-    In-memory token-bucket rate limiter per client IP.
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        # { key: tat }, least recently used first
+        self._tat: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self.evictions = 0
+
+    def hit(self, key: Tuple[str, str], limit: int, period: float = 60.0) -> RateLimitDecision:
+        """Consume one request for `key` under `limit` requests per `period` seconds."""
+        now = self.clock()
+        self._purge(now)
+
+        interval = period / limit  # one token drips back every `interval`
+        capacity = period          # a full bucket absorbs `limit` requests at once
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + interval
+
+        if new_tat - now > capacity:
+            self._touch(key, tat)
+            return RateLimitDecision(
+                allowed=False,
+                limit=limit,
+                remaining=0,
+                reset_after=tat - now,
+                retry_after=new_tat - now - capacity,
+            )
+
+        self._touch(key, new_tat)
+        return RateLimitDecision(
+            allowed=True,
+            limit=limit,
+            remaining=int((capacity - (new_tat - now)) / interval + 1e-9),
+            reset_after=new_tat - now,
+            retry_after=0.0,
+        )
+
+    def _touch(self, key, tat: float):
+        self._tat[key] = tat
+        self._tat.move_to_end(key)
+        if len(self._tat) > self.max_keys:
+            self._tat.popitem(last=False)
+            self.evictions += 1
+
+    def _purge(self, now: float):
+        # Amortised O(1): each key is removed at most once after it expires
+        while self._tat:
+            key, tat = next(iter(self._tat.items()))
+            if tat > now:
+                break
+            del self._tat[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"keys": len(self._tat), "max_keys": self.max_keys, "evictions": self.evictions}
+
+
+class RateLimiterMiddleware:
+    """
+    In-memory GCRA rate limiter per client IP and route class.
 
     - General API: rate_limit requests per minute
-    - Chat endpoint: chat_rate_limit requests per minute (stricter)
+    - Chat endpoint: chat_rate_limit requests per minute (stricter, own bucket)
+
+    Every limited response carries RateLimit-Limit / RateLimit-Remaining /
+    RateLimit-Reset / RateLimit-Policy headers.
+
+    With a shared `backend` (see rate_limit_backends) the limits hold across
+    workers. If the backend errors, this worker falls back to its local
+    limiter and retries the backend after `backend_retry_seconds`.
     """
 
-    def __init__(self, app, rate_limit: int = 60, chat_rate_limit: int = 20):
-        super().__init__(app)
-        self.rate_limit = rate_limit
-        self.chat_rate_limit = chat_rate_limit
-        # { ip: [ timestamp, timestamp, ... ] }
-        self._requests: dict = defaultdict(list)
-
-    def _clean_old_requests(self, ip: str, window: float = 60.0):
-        """Remove request timestamps older than the window."""
-        now = time.time()
-        self._requests[ip] = [
-            t for t in self._requests[ip] if now - t < window
+    def __init__(
+        self,
+        app: ASGIApp,
+        rate_limit: int = 60,
+        chat_rate_limit: int = 20,
+        max_keys: int = 100_000,
+        limiter: Optional[GCRARateLimiter] = None,
+        backend: Optional[Any] = None,
+        backend_retry_seconds: float = 5.0,
+    ):
+        self.app = app
+        self.limits = {"default": rate_limit, "chat": chat_rate_limit}
+        self._static_headers = {
+            route_class: (
+                (b"ratelimit-limit", str(limit).encode()),
+                (b"ratelimit-policy", f"{limit};w=60".encode()),
+            )
+            for route_class, limit in self.limits.items()
+        }
+        self.limiter = limiter or GCRARateLimiter(max_keys=max_keys)
+        self.backend = backend
+        self.backend_retry_seconds = backend_retry_seconds
+        self._backend_retry_at = 0.0
+        self.backend_failures = 0
+
+    async def _hit(self, key: Tuple[str, str], limit: int) -> RateLimitDecision:
+        if self.backend is not None and time.monotonic() >= self._backend_retry_at:
+            try:
+                return await self.backend.hit(key, limit)
+            except Exception as e:
+                self.backend_failures += 1
+                self._backend_retry_at = time.monotonic() + self.backend_retry_seconds
+                print(f"[WARN] Rate limit backend failed, using local limits for "
+                      f"{self.backend_retry_seconds:g}s: {e}")
+        return self.limiter.hit(key, limit)
+
+    def _route_class(self, scope: Scope) -> str:
+        if scope["method"] == "POST" and "/chat" in scope["path"]:
+            return "chat"
+        return "default"
+
+    async def check(self, scope: Scope) -> Optional[Tuple[RateLimitDecision, HeaderPairs]]:
+        """Consume a request for this scope; None if the path is exempt."""
+        # Skip rate limiting for health checks (WebSockets never reach here)
+        if scope["path"].endswith("/health"):
+            return None
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        route_class = self._route_class(scope)
+        decision = await self._hit((route_class, client_ip), self.limits[route_class])
+        limit_pair, policy_pair = self._static_headers[route_class]
+        return decision, [
+            limit_pair,
+            (b"ratelimit-remaining", str(decision.remaining).encode()),
+            (b"ratelimit-reset", str(math.ceil(decision.reset_after)).encode()),
+            policy_pair,
         ]
 
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for WebSocket upgrades and health checks
-        path = request.url.path
-        if path.endswith("/ws") or path.endswith("/health"):
-            return await call_next(request)
-
-        client_ip = request.client.host if request.client else "unknown"
-        self._clean_old_requests(client_ip)
-
-        # Determine limit based on path
-        is_chat = "/chat" in path and request.method == "POST"
-        limit = self.chat_rate_limit if is_chat else self.rate_limit
-
-        if len(self._requests[client_ip]) >= limit:
-            retry_after = 60 - (time.time() - self._requests[client_ip][0])
-            return JSONResponse(
-                status_code=429,
-                content={
-                    "error": True,
-                    "status_code": 429,
-                    "message": "Rate limit exceeded. Please slow down, Sir.",
-                    "retry_after_seconds": round(max(retry_after, 1)),
-                    "timestamp": datetime.now().isoformat(),
-                },
-                headers={"Retry-After": str(round(max(retry_after, 1)))},
-            )
+    async def reject(
+        self, decision: RateLimitDecision, pairs: HeaderPairs,
+        scope: Scope, receive: Receive, send: Send,
+    ):
+        retry_after = max(1, math.ceil(decision.retry_after))
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "error": True,
+                "status_code": 429,
+                "message": "Rate limit exceeded. Please slow down, Sir.",
+                "retry_after_seconds": retry_after,
+                "timestamp": datetime.now().isoformat(),
+            },
+            headers={"Retry-After": str(retry_after)},
+        )
+        response.raw_headers.extend(pairs)
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        result = await self.check(scope)
+        if result is None:
+            await self.app(scope, receive, send)
+            return
+
+        decision, pairs = result
+        if not decision.allowed:
+            await self.reject(decision, pairs, scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                append_headers(message, pairs)
+            await send(message)
 
-        self._requests[client_ip].append(time.time())
-        return await call_next(request)
+        await self.app(scope, receive, send_with_headers)
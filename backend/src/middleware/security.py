@@ -1,44 +1,101 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from fastapi import Request
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi.responses import JSONResponse
+from typing import List, Tuple
 
+HeaderPairs = List[Tuple[bytes, bytes]]
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
+# Encoded once at import; appended verbatim to every response
+SECURITY_HEADERS: HeaderPairs = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"permissions-policy", b"camera=(), microphone=(self), geolocation=()"),
+]
+HSTS_HEADER = (b"strict-transport-security", b"max-age=63072000; includeSubDomains; preload")
+
+
+def append_headers(message: Message, pairs: HeaderPairs):
+    """Add raw header pairs to an `http.response.start` message in place."""
+    headers = message.setdefault("headers", [])
+    if not isinstance(headers, list):
+        headers = message["headers"] = list(headers)
+    headers.extend(pairs)
+
+
+class SecurityHeadersMiddleware:
     """
     Adds standard security headers to every response.
     Also enforces a maximum request body size.
+
+    Pure ASGI: response bodies are passed through untouched. The size limit
+    is checked against Content-Length up front and, for chunked or
+    mislabelled bodies, by counting bytes as they are received.
     """
 
-    def __init__(self, app, max_body_size_mb: float = 1.0):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, max_body_size_mb: float = 1.0):
+        self.app = app
         self.max_body_bytes = int(max_body_size_mb * 1024 * 1024)
+        self.too_large_message = (
+            f"Request body too large. Maximum is {self.max_body_bytes // (1024*1024)} MB."
+        )
+        self._https_headers = SECURITY_HEADERS + [HSTS_HEADER]
+
+    def header_pairs(self, scope: Scope) -> HeaderPairs:
+        # HSTS only over https
+        return self._https_headers if scope.get("scheme") == "https" else SECURITY_HEADERS
+
+    def content_length_exceeded(self, scope: Scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    return int(value) > self.max_body_bytes
+                except ValueError:
+                    return False
+        return False
+
+    def limit_body(self, receive: Receive) -> Receive:
+        """Wrap `receive` so reading past the limit raises a 413."""
+        remaining = self.max_body_bytes
+
+        async def limited_receive() -> Message:
+            nonlocal remaining
+            message = await receive()
+            if message["type"] == "http.request":
+                remaining -= len(message.get("body", b""))
+                if remaining < 0:
+                    raise StarletteHTTPException(status_code=413, detail=self.too_large_message)
+            return message
+
+        return limited_receive
+
+    async def reject(self, scope: Scope, receive: Receive, send: Send):
+        response = JSONResponse(
+            status_code=413,
+            content={
+                "error": True,
+                "status_code": 413,
+                "message": self.too_large_message,
+            },
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        pairs = self.header_pairs(scope)
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                append_headers(message, pairs)
+            await send(message)
 
-    async def dispatch(self, request: Request, call_next):
         # --- Request size validation ---
-        content_length = request.headers.get("content-length")
-        if content_length and int(content_length) > self.max_body_bytes:
-            return JSONResponse(
-                status_code=413,
-                content={
-                    "error": True,
-                    "status_code": 413,
-                    "message": f"Request body too large. Maximum is {self.max_body_bytes // (1024*1024)} MB.",
-                },
-            )
-
-        response = await call_next(request)
-
-        # --- Security headers ---
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        response.headers["Permissions-Policy"] = "camera=(), microphone=(self), geolocation=()"
-
-        # HSTS only in production
-        if request.url.scheme == "https":
-            response.headers["Strict-Transport-Security"] = (
-                "max-age=63072000; includeSubDomains; preload"
-            )
-
-        return response
+        if self.content_length_exceeded(scope):
+            await self.reject(scope, receive, send_with_headers)
+            return
+
+        await self.app(scope, self.limit_body(receive), send_with_headers)
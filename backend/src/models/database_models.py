@@ -1,9 +1,24 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, JSON, Index, UniqueConstraint
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from src.config.database import Base
 
+# SQLite stores datetimes as text. Bind parameters in the same format that
+# CURRENT_TIMESTAMP produces, so range and keyset comparisons line up.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d",
+    ),
+    "sqlite",
+)
+
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Keyset pagination: global history (newest first) and per-session
+        Index("ix_conversations_created_at_id", "created_at", "id"),
+        Index("ix_conversations_session_created_id", "session_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(255), index=True)
@@ -11,7 +26,34 @@ class Conversation(Base):
     assistant_response = Column(Text)
     plugin_used = Column(String(100), nullable=True)
     extra_data = Column("metadata", JSON, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+
+class ConversationRollup(Base):
+    """Hourly conversation counts per plugin and session, maintained on write."""
+    __tablename__ = "conversation_rollups"
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "plugin_used", "session_id", name="uq_conversation_rollups_bucket"),
+        # Per-session analytics read only that session's rows
+        Index("ix_conversation_rollups_session_bucket", "session_id", "bucket_start"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(Timestamp, nullable=False)
+    plugin_used = Column(String(100), nullable=False, default="")  # "" = no plugin (LLM)
+    session_id = Column(String(255), nullable=False, default="")
+    conversation_count = Column(Integer, nullable=False, default=0)
+
+class ConversationHourlyRollup(Base):
+    """Hourly conversation counts per plugin across all sessions, maintained on write."""
+    __tablename__ = "conversation_rollups_hourly"
+    __table_args__ = (
+        UniqueConstraint("bucket_start", "plugin_used", name="uq_conversation_rollups_hourly_bucket"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    bucket_start = Column(Timestamp, nullable=False)
+    plugin_used = Column(String(100), nullable=False, default="")  # "" = no plugin (LLM)
+    conversation_count = Column(Integer, nullable=False, default=0)
 
 class Plugin(Base):
     __tablename__ = "plugins"
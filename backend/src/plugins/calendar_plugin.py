@@ -21,6 +21,10 @@ class CalendarPlugin(BasePlugin):
         ]
         self._reminders = []  # In-memory reminders (persist via DB in production)
 
+    def get_reminders(self) -> list:
+        """Copy of the active reminders (for the WebSocket `reminders` topic)."""
+        return [dict(r) for r in self._reminders]
+
     async def can_handle(self, message: str) -> bool:
         keywords = [
             "time", "date", "day", "calendar", "reminder",
@@ -38,6 +38,10 @@ class SmartHomePlugin(BasePlugin):
             "party": {"description": "Color lights on, music playing, thermostat to 74"},
         }
 
+    def get_devices(self) -> Dict[str, Dict]:
+        """Copy of the device states (for the WebSocket `device_state` topic)."""
+        return {key: dict(device) for key, device in self._devices.items()}
+
     def _has_word(self, text: str, word: str) -> bool:
         """Check if word exists as a whole word (not a substring like 'lock' in 'blockchain')."""
         return bool(re.search(r'\b' + re.escape(word) + r'\b', text))
@@ -0,0 +1,333 @@
+import abc
+import asyncio
+import os
+import random
+import socket
+import struct
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Set
+from src.core.resp import RespClient
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, unix socket backplane unavailable
+    fcntl = None
+
+# deliver(channel, payload): hand a message from another worker to local sockets
+DeliverFn = Callable[[str, str], None]
+
+
+class InProcessBackplane:
+    """
+    Single-process backplane: the manager already delivers every message to
+    its own sockets, so there is nobody else to relay to.
+    """
+
+    name = "in_process"
+
+    def __init__(self):
+        self.published = 0
+
+    async def start(self, deliver: DeliverFn):
+        pass
+
+    def publish(self, channel: str, payload: str):
+        self.published += 1
+
+    async def stop(self):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"backplane": self.name, "published": self.published}
+
+
+class _BatchingBackplane(abc.ABC):
+    """
+    Queues published messages and sends everything published in the same
+    event-loop tick as one batch (one write, one pipelined round trip).
+    """
+
+    name = ""
+
+    def __init__(self):
+        self._deliver: Optional[DeliverFn] = None
+        self._pending: List[bytes] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.batches = 0
+        self.received = 0
+        self.errors = 0
+
+    def publish(self, channel: str, payload: str):
+        self._pending.append(self._frame(channel, payload))
+        self.published += 1
+        if self._flush_task is None:
+            # Runs on the next loop iteration, after other ready publishers queued theirs
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        self._flush_task = None
+        try:
+            await self._send_batch(batch)
+            self.batches += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"[WARN] WebSocket backplane ({self.name}) dropped {len(batch)} messages: {e}")
+
+    @abc.abstractmethod
+    def _frame(self, channel: str, payload: str) -> bytes:
+        """Encode one message for the wire."""
+
+    @abc.abstractmethod
+    async def _send_batch(self, frames: List[bytes]):
+        """Send a tick's frames in one write or round trip."""
+
+    def _receive(self, body: bytes):
+        channel, _, payload = body.partition(b"\n")
+        self.received += 1
+        self._deliver(channel.decode(), payload.decode())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backplane": self.name,
+            "published": self.published,
+            "batches": self.batches,
+            "received": self.received,
+            "errors": self.errors,
+        }
+
+
+# ---------------------------------------------------------------------------
+# UNIX socket (several workers on one host)
+# ---------------------------------------------------------------------------
+
+_LENGTH = struct.Struct("!I")
+_MAX_PEER_BUFFER = 8 * 1024 * 1024  # a peer this far behind is dropped
+
+
+class UnixSocketBackplane(_BatchingBackplane):
+    """
+    Workers on one host exchange messages through a UNIX socket hub.
+
+    The first worker to bind the socket (elected under an flock, so exactly
+    one wins) becomes the hub; the others connect to it. The hub relays each
+    frame to every peer except its sender and delivers it locally. If the
+    hub worker exits, the remaining workers re-elect a new one. Frames are
+    length-prefixed `channel\\npayload` and relayed without re-encoding.
+    """
+
+    name = "unix_socket"
+
+    def __init__(self, path: Optional[str] = None):
+        if fcntl is None or not hasattr(socket, "AF_UNIX"):
+            raise RuntimeError("UNIX socket backplane requires AF_UNIX and fcntl (POSIX)")
+        super().__init__()
+        self.path = path or os.path.join(tempfile.gettempdir(), "jarvis-ws.sock")
+        self.role = "starting"
+        self.reconnects = 0
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._hub: Optional[asyncio.StreamWriter] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: DeliverFn):
+        self._deliver = deliver
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in [self._hub, *self._peers]:
+            if writer is not None:
+                writer.close()
+
+    def _frame(self, channel: str, payload: str) -> bytes:
+        body = channel.encode() + b"\n" + payload.encode()
+        return _LENGTH.pack(len(body)) + body
+
+    async def _send_batch(self, frames: List[bytes]):
+        data = b"".join(frames)
+        if self.role == "hub":
+            for peer in list(self._peers):
+                self._write_peer(peer, data)
+        elif self._hub is not None:
+            self._hub.write(data)
+            await self._hub.drain()
+        else:
+            raise ConnectionError("not connected to the hub")
+
+    def _write_peer(self, peer: asyncio.StreamWriter, data: bytes):
+        if peer.transport.get_write_buffer_size() > _MAX_PEER_BUFFER:
+            self._peers.discard(peer)
+            peer.close()
+            return
+        peer.write(data)
+
+    async def _run(self):
+        while True:
+            try:
+                listener = await asyncio.to_thread(self._elect)
+                if listener is not None:
+                    self.role = "hub"
+                    self._server = await asyncio.start_unix_server(self._serve_peer, sock=listener)
+                    print(f"[OK] WebSocket backplane hub listening on {self.path}")
+                    await self._server.serve_forever()
+                else:
+                    self.role = "client"
+                    reader, self._hub = await asyncio.open_unix_connection(self.path)
+                    await self._read_frames(reader, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WARN] WebSocket backplane connection lost: {e}")
+            self._hub = None
+            self.role = "reconnecting"
+            self.reconnects += 1
+            await asyncio.sleep(0.1 + random.random() * 0.4)
+
+    def _elect(self) -> Optional[socket.socket]:
+        """Connect to a live hub, or become the hub: returns the listening socket if so."""
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.path)
+                return None  # a hub is alive
+            except (FileNotFoundError, ConnectionRefusedError):
+                pass
+            finally:
+                probe.close()
+            # No hub, or a stale socket file left by one that died
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(self.path)
+            listener.listen(128)
+            listener.setblocking(False)
+            return listener
+
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        try:
+            await self._read_frames(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    async def _read_frames(self, reader: asyncio.StreamReader, sender: Optional[asyncio.StreamWriter]):
+        while True:
+            header = await reader.readexactly(_LENGTH.size)
+            body = await reader.readexactly(_LENGTH.unpack(header)[0])
+            if sender is not None:
+                # Hub: relay to everyone but the sender
+                frame = header + body
+                for peer in list(self._peers):
+                    if peer is not sender:
+                        self._write_peer(peer, frame)
+            self._receive(body)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **super().get_stats(),
+            "path": self.path,
+            "role": self.role,
+            "peers": len(self._peers),
+            "reconnects": self.reconnects,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Redis pub/sub (several nodes)
+# ---------------------------------------------------------------------------
+
+class RedisBackplane(_BatchingBackplane):
+    """
+    Nodes exchange messages over one Redis pub/sub channel (or any server
+    speaking its protocol). A tick's messages go out as one pipeline of
+    PUBLISH commands. Every node receives its own messages back, so frames
+    carry the origin's id and a node skips its own.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str = "jarvis:ws", timeout: float = 1.0):
+        super().__init__()
+        self.channel = channel
+        self.origin = os.urandom(8).hex().encode()
+        self.publisher = RespClient(url, timeout=timeout)
+        self.subscriber = RespClient(url, timeout=timeout)
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: DeliverFn):
+        self._deliver = deliver
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.subscriber.close()
+        await self.publisher.close()
+
+    def _frame(self, channel: str, payload: str) -> bytes:
+        return self.origin + b"\n" + channel.encode() + b"\n" + payload.encode()
+
+    async def _send_batch(self, frames: List[bytes]):
+        await self.publisher.execute_many([("PUBLISH", self.channel, frame) for frame in frames])
+
+    async def _listen(self):
+        while True:
+            try:
+                await self.subscriber.send("SUBSCRIBE", self.channel)
+                while True:
+                    reply = await self.subscriber.read_reply()
+                    if not isinstance(reply, list) or reply[0] != b"message":
+                        continue  # subscribe confirmation
+                    origin, _, body = reply[2].partition(b"\n")
+                    if origin != self.origin:
+                        self._receive(body)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[WARN] WebSocket backplane subscription lost: {e}")
+            await self.subscriber.close()
+            self.reconnects += 1
+            await asyncio.sleep(0.5 + random.random())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), "channel": self.channel, "reconnects": self.reconnects}
+
+
+def build_backplane(settings) -> Any:
+    """Backplane chosen by WS_BACKPLANE; in-process if unset or unavailable."""
+    kind = settings.ws_backplane.lower()
+    try:
+        if kind == "unix_socket":
+            backplane = UnixSocketBackplane(settings.ws_backplane_socket_path or None)
+        elif kind == "redis":
+            backplane = RedisBackplane(settings.ws_backplane_redis_url)
+        else:
+            return InProcessBackplane()
+    except Exception as e:
+        print(f"[WARN] WebSocket backplane '{kind}' unavailable, broadcasts stay in-process: {e}")
+        return InProcessBackplane()
+    print(f"[OK] WebSocket backplane: {kind}")
+    return backplane
@@ -0,0 +1,492 @@
+import asyncio
+import psutil
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple, Union
+from fastapi import WebSocket
+from src.config.settings import settings
+from src.core.metrics import (
+    WEBSOCKET_CONNECTIONS,
+    WEBSOCKET_REAPED,
+    WEBSOCKET_REJECTED,
+    WEBSOCKET_SLOW_CONSUMERS,
+    count_ws_message,
+)
+from src.services.backplane import InProcessBackplane, build_backplane
+from src.services.topics import topics
+from src.services.ws_codec import MSGPACK_SUBPROTOCOL, JsonCodec, Outbound, negotiate
+
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "disconnect")
+
+
+class Subscription:
+    """One client's subscription to a topic."""
+
+    __slots__ = ("interval", "next_due", "version", "keyframe_due")
+
+    def __init__(self, interval_ms: int):
+        self.interval = interval_ms / 1000
+        self.next_due = 0.0  # publish on the next tick
+        self.version: Optional[int] = None  # last version sent; None forces a keyframe
+        self.keyframe_due = 0.0
+
+
+class ClientConnection:
+    """
+    Outbound side of one WebSocket: a bounded queue drained by a writer task.
+
+    Producers only append to the queue, so a slow or stalled client delays
+    nobody but itself. When the queue is full the connection applies the
+    slow-consumer policy: `drop_oldest` discards the oldest broadcast or
+    topic message (direct replies are never dropped; if only those are queued
+    the client is disconnected), `disconnect` closes the socket straight away.
+    Dropping a topic delta makes the next update for that topic a keyframe.
+
+    The endpoint updates `last_seen` on every inbound frame; the writer
+    records when it last sent and whether a send is stuck, which is what the
+    manager's heartbeat checks look at.
+    """
+
+    def __init__(
+        self, websocket: WebSocket, manager: "ConnectionManager", maxsize: int, policy: str, ip: str,
+        codec: Any = JsonCodec,
+    ):
+        self.websocket = websocket
+        self.manager = manager
+        self.maxsize = maxsize
+        self.policy = policy
+        self.ip = ip
+        self.codec = codec  # JsonCodec (text frames) or MsgpackCodec (binary), per subprotocol
+        now = time.monotonic()
+        self.last_seen = now  # last frame received from the client
+        self.last_sent = now  # last frame written to the client
+        self.sending_since = 0.0  # start of the send in progress, 0 if idle
+        self.finishing = False  # writer exits once the queue is empty (drain)
+        # (message, droppable); messages are shared between connections and each
+        # is encoded once per codec. `droppable` is False, True, or the topic name.
+        self.queue: Deque[Tuple[Outbound, Union[bool, str]]] = deque()
+        self.subscriptions: Dict[str, Subscription] = {}
+        self.session_ids: Set[str] = set()
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop(), name="ws-writer")
+
+    def push(self, message: Outbound, droppable: Union[bool, str] = False):
+        if self.closed:
+            return
+        if len(self.queue) >= self.maxsize and not self._make_room():
+            self.manager.slow_disconnects += 1
+            WEBSOCKET_SLOW_CONSUMERS.labels("disconnected").inc()
+            self.manager.disconnect(self.websocket, code=1008, reason="Slow consumer")
+            return
+        self.queue.append((message, droppable))
+        self._wakeup.set()
+
+    def _make_room(self) -> bool:
+        if self.policy != "drop_oldest":
+            return False
+        for i, (_, droppable) in enumerate(self.queue):
+            if droppable:
+                del self.queue[i]
+                if droppable in self.subscriptions:
+                    self.subscriptions[droppable].version = None
+                self.manager.dropped_messages += 1
+                WEBSOCKET_SLOW_CONSUMERS.labels("dropped").inc()
+                return True
+        return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                if not self.queue:
+                    if self.finishing:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                message, _ = self.queue.popleft()
+                frame = message.encoded(self.codec)
+                self.sending_since = time.monotonic()
+                if self.codec.binary:
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(frame)
+                self.last_sent = time.monotonic()
+                self.sending_since = 0.0
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.manager.disconnect(self.websocket)
+
+    async def flush(self, timeout: float):
+        """Let the writer send what is queued, for up to `timeout` seconds."""
+        self.finishing = True
+        self._wakeup.set()
+        await asyncio.wait([self._writer], timeout=timeout)
+
+    def close(self, code: int = None, reason: str = ""):
+        """Stop the writer; with a `code`, also close the socket (server-initiated)."""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self._writer.cancel()
+        if code is not None:
+            asyncio.create_task(self._close_socket(code, reason))
+
+    async def _close_socket(self, code: int, reason: str):
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+
+class ConnectionManager:
+    """
+    Manages active WebSocket connections for real-time communication.
+
+    broadcast() and push_to_session() deliver to this worker's sockets
+    directly and publish the JSON-encoded message on the backplane, which
+    relays it to the other workers or nodes (see services/backplane).
+    Other components can use the same backplane through relay()/on_relay().
+    Each connection speaks JSON or, if negotiated, MessagePack (ws_codec).
+    """
+
+    def __init__(self):
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+        self.sessions: Dict[str, Set[ClientConnection]] = {}
+        self.ip_counts: Dict[str, int] = {}
+        self.max_connections = settings.ws_max_connections
+        self.max_per_ip = settings.ws_max_connections_per_ip
+        self.heartbeat_interval = settings.ws_heartbeat_interval_seconds
+        self.idle_timeout = settings.ws_idle_timeout_seconds
+        self.draining = False
+        self.rejected: Dict[str, int] = {"capacity": 0, "per_ip": 0, "draining": 0}
+        self.reaped: Dict[str, int] = {"idle": 0, "stalled": 0}
+        self.backplane: Any = InProcessBackplane()
+        self._relay_handlers: Dict[str, Callable[[str, str], None]] = {}
+        self.queue_size = settings.ws_send_queue_size
+        self.policy = settings.ws_slow_consumer_policy
+        if self.policy not in SLOW_CONSUMER_POLICIES:
+            print(f"[WARN] Unknown WS_SLOW_CONSUMER_POLICY '{self.policy}', using drop_oldest")
+            self.policy = "drop_oldest"
+        self.tick = settings.ws_publish_tick_ms / 1000
+        self.keyframe_interval = settings.ws_keyframe_interval_seconds
+        self.legacy_metrics = settings.ws_legacy_metrics_push
+        self.dropped_messages = 0
+        self.slow_disconnects = 0
+        self._publish_task: asyncio.Task = None
+
+    async def start(self):
+        """Connect the backplane chosen in settings (call from app startup)."""
+        self.backplane = build_backplane(settings)
+        await self.backplane.start(self._deliver)
+
+    async def stop(self):
+        await self.drain()
+        await self.backplane.stop()
+
+    async def connect(self, websocket: WebSocket) -> Optional[ClientConnection]:
+        """Accept the socket, or refuse the handshake (None) if over a connection cap."""
+        ip = websocket.client.host if websocket.client else "unknown"
+        if self.draining:
+            reason = "draining"
+        elif len(self.connections) >= self.max_connections:
+            reason = "capacity"
+        elif self.ip_counts.get(ip, 0) >= self.max_per_ip:
+            reason = "per_ip"
+        else:
+            reason = None
+        if reason is not None:
+            self.rejected[reason] += 1
+            WEBSOCKET_REJECTED.labels(reason).inc()
+            await websocket.close(code=1013)  # try again later
+            return None
+
+        codec = negotiate(websocket.scope.get("subprotocols"))
+        await websocket.accept(subprotocol=MSGPACK_SUBPROTOCOL if codec is not JsonCodec else None)
+        conn = ClientConnection(websocket, self, self.queue_size, self.policy, ip, codec)
+        self.connections[websocket] = conn
+        self.ip_counts[ip] = self.ip_counts.get(ip, 0) + 1
+        WEBSOCKET_CONNECTIONS.inc()
+        print(f"[OK] WebSocket client connected. Total: {len(self.connections)}")
+
+        # Start publishing if this is the first connection
+        if len(self.connections) == 1 and self._publish_task is None:
+            self._publish_task = asyncio.create_task(self._publish_loop())
+        return conn
+
+    def disconnect(self, websocket: WebSocket, code: int = None, reason: str = ""):
+        conn = self.connections.pop(websocket, None)
+        if conn is None:
+            return
+        conn.close(code, reason)
+        remaining = self.ip_counts.pop(conn.ip, 1) - 1
+        if remaining > 0:
+            self.ip_counts[conn.ip] = remaining
+        for session_id in conn.session_ids:
+            bound = self.sessions.get(session_id)
+            if bound is not None:
+                bound.discard(conn)
+                if not bound:
+                    del self.sessions[session_id]
+        WEBSOCKET_CONNECTIONS.dec()
+        print(f"[X] WebSocket client disconnected. Total: {len(self.connections)}")
+
+        # Stop publishing if no clients remain
+        if not self.connections and self._publish_task is not None:
+            self._publish_task.cancel()
+            self._publish_task = None
+
+    def is_connected(self, websocket: WebSocket) -> bool:
+        return websocket in self.connections
+
+    def bind_session(self, websocket: WebSocket, session_id: str):
+        """Route push_to_session(session_id, ...) to this socket too."""
+        conn = self.connections.get(websocket)
+        if conn is None or not session_id or session_id in conn.session_ids:
+            return
+        conn.session_ids.add(session_id)
+        self.sessions.setdefault(session_id, set()).add(conn)
+
+    async def send_personal(self, message: dict, websocket: WebSocket):
+        conn = self.connections.get(websocket)
+        if conn is None:
+            return
+        out = Outbound(message)
+        count_ws_message("out", out.type)
+        conn.push(out)
+
+    async def broadcast(self, message: dict):
+        """Serialize once (per codec) and queue the same message for every client on every worker."""
+        out = Outbound(message)
+        self._fan_out("broadcast", out)
+        self.backplane.publish("broadcast", out.json())
+
+    async def push_to_session(self, session_id: str, message: dict, exclude: Optional[WebSocket] = None):
+        """Send to every socket bound to `session_id`, on any worker (except `exclude`)."""
+        out = Outbound(message)
+        channel = f"session:{session_id}"
+        self._fan_out(channel, out, exclude=self.connections.get(exclude))
+        self.backplane.publish(channel, out.json())
+
+    async def announce_exchange(
+        self, session_id: str, user_message: str, assistant_response: str,
+        plugin_used: Optional[str] = None, exclude: Optional[WebSocket] = None,
+    ):
+        """Tell the session's other sockets (any worker) about a completed chat exchange."""
+        await self.push_to_session(session_id, {
+            "type": "session_message",
+            "data": {
+                "session_id": session_id,
+                "user_message": user_message,
+                "assistant_response": assistant_response,
+                "plugin_used": plugin_used,
+                "timestamp": datetime.now().isoformat(),
+            },
+        }, exclude=exclude)
+
+    def relay(self, channel: str, payload: str):
+        """Publish `<prefix>:<key>` to the other workers only (see on_relay)."""
+        self.backplane.publish(channel, payload)
+
+    def on_relay(self, prefix: str, handler: Callable[[str, str], None]):
+        """Hand other workers' relay(f"{prefix}:{key}", payload) to handler(key, payload)."""
+        self._relay_handlers[prefix] = handler
+
+    def _deliver(self, channel: str, payload: str):
+        """Backplane callback: a message from another worker for `channel`."""
+        prefix, _, key = channel.partition(":")
+        handler = self._relay_handlers.get(prefix)
+        if handler is not None:
+            handler(key, payload)
+            return
+        self._fan_out(channel, Outbound(json_text=payload))
+
+    def _fan_out(self, channel: str, out: Outbound, exclude: Optional[ClientConnection] = None):
+        """Queue a message for this worker's sockets on `channel`."""
+        if channel == "broadcast":
+            targets, droppable = list(self.connections.values()), True
+        elif channel.startswith("session:"):
+            targets, droppable = list(self.sessions.get(channel[8:], ())), False
+        else:
+            return
+        if exclude is not None:
+            targets = [conn for conn in targets if conn is not exclude]
+        if not targets:
+            return
+        count_ws_message("out", out.type, len(targets))
+        for conn in targets:
+            conn.push(out, droppable=droppable)
+
+    # ------------------------------------------------------------------
+    # Topics
+    # ------------------------------------------------------------------
+
+    def subscribe(self, websocket: WebSocket, topic: str, interval_ms: Any = None) -> int:
+        """Subscribe (or change rate); returns the interval granted in ms."""
+        interval = topics[topic].clamp_interval(interval_ms)
+        conn = self.connections.get(websocket)
+        if conn is not None:
+            conn.subscriptions[topic] = Subscription(interval)
+        return interval
+
+    def unsubscribe(self, websocket: WebSocket, topic: str) -> bool:
+        conn = self.connections.get(websocket)
+        return conn is not None and conn.subscriptions.pop(topic, None) is not None
+
+    async def _publish_loop(self):
+        """
+        Send due topic updates every tick, legacy system_metrics every 3
+        seconds, and run the heartbeat checks every heartbeat interval.
+        """
+        now = time.monotonic()
+        next_legacy = now
+        next_heartbeat = now + self.heartbeat_interval
+        try:
+            while self.connections:
+                now = time.monotonic()
+                if self.legacy_metrics and now >= next_legacy:
+                    self._push_legacy_metrics()
+                    next_legacy = now + 3
+                if now >= next_heartbeat:
+                    self._heartbeat(now)
+                    next_heartbeat = now + self.heartbeat_interval
+                self._publish_topics(now)
+                await asyncio.sleep(self.tick)
+        except asyncio.CancelledError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Heartbeats, reaping and draining
+    # ------------------------------------------------------------------
+
+    def _heartbeat(self, now: float):
+        """
+        Reap connections whose client went silent past the idle timeout or
+        whose writer has been stuck in one send as long; send a heartbeat
+        (which clients answer with `pong`) to the rest that have been quiet.
+        """
+        heartbeat = None
+        sent = 0
+        for websocket, conn in list(self.connections.items()):
+            if self.idle_timeout:
+                if now - conn.last_seen > self.idle_timeout:
+                    self._reap(websocket, "idle", 1000, "Idle timeout")
+                    continue
+                if conn.sending_since and now - conn.sending_since > self.idle_timeout:
+                    self._reap(websocket, "stalled", 1008, "Slow consumer")
+                    continue
+            if now - conn.last_seen >= self.heartbeat_interval or now - conn.last_sent >= self.heartbeat_interval:
+                if heartbeat is None:
+                    heartbeat = Outbound({"type": "heartbeat", "data": {"timestamp": datetime.now().isoformat()}})
+                conn.push(heartbeat, droppable=True)
+                sent += 1
+        if sent:
+            count_ws_message("out", "heartbeat", sent)
+
+    def _reap(self, websocket: WebSocket, reason: str, code: int, message: str):
+        self.reaped[reason] += 1
+        WEBSOCKET_REAPED.labels(reason).inc()
+        self.disconnect(websocket, code=code, reason=message)
+
+    async def drain(self, timeout: float = None):
+        """
+        Stop admitting connections, flush every send queue (up to `timeout`)
+        and close all sockets with 1001 so clients reconnect elsewhere.
+        """
+        timeout = settings.ws_drain_timeout_seconds if timeout is None else timeout
+        self.draining = True
+        conns = list(self.connections.values())
+        if not conns:
+            return 0
+        await asyncio.gather(*(conn.flush(timeout) for conn in conns))
+        for conn in conns:
+            self.disconnect(conn.websocket)
+        await asyncio.wait(
+            [asyncio.create_task(conn._close_socket(1001, "Server going away")) for conn in conns],
+            timeout=timeout,
+        )
+        return len(conns)
+
+    def resume(self):
+        """Admit connections again after drain()."""
+        self.draining = False
+
+    def _publish_topics(self, now: float):
+        refreshed = set()
+        sent = 0
+        for conn in list(self.connections.values()):
+            for name, sub in conn.subscriptions.items():
+                if now < sub.next_due:
+                    continue
+                topic = topics[name]
+                if name not in refreshed:
+                    topic.refresh()
+                    refreshed.add(name)
+                sub.next_due = now + sub.interval
+
+                if sub.version is None or now >= sub.keyframe_due or not topic.has_version(sub.version):
+                    update = topic.keyframe()
+                    sub.keyframe_due = now + self.keyframe_interval
+                elif sub.version == topic.version:
+                    continue  # nothing changed
+                else:
+                    update = topic.delta(sub.version)
+                sub.version = topic.version
+                conn.push(update, droppable=name)
+                sent += 1
+        if sent:
+            count_ws_message("out", "topic_update", sent)
+
+    def _push_legacy_metrics(self):
+        """Full system_metrics snapshot for clients that never subscribed to anything."""
+        legacy = [c for c in self.connections.values() if not c.subscriptions]
+        if not legacy:
+            return
+        metrics = Outbound({
+            "type": "system_metrics",
+            "data": {
+                "cpu_usage": psutil.cpu_percent(interval=0),
+                "memory_usage": psutil.virtual_memory().percent,
+                "disk_usage": psutil.disk_usage('/').percent,
+                "timestamp": datetime.now().isoformat(),
+            }
+        })
+        count_ws_message("out", "system_metrics", len(legacy))
+        for conn in legacy:
+            conn.push(metrics, droppable=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        depths = [len(c.queue) for c in self.connections.values()]
+        return {
+            "connections": len(self.connections),
+            "idle_connections": sum(
+                now - c.last_seen >= self.heartbeat_interval for c in self.connections.values()
+            ),
+            "client_ips": len(self.ip_counts),
+            "max_connections": self.max_connections,
+            "max_connections_per_ip": self.max_per_ip,
+            "draining": self.draining,
+            "rejected": dict(self.rejected),
+            "reaped": dict(self.reaped),
+            "send_queue_size": self.queue_size,
+            "slow_consumer_policy": self.policy,
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_messages": self.dropped_messages,
+            "slow_consumers_disconnected": self.slow_disconnects,
+            "subscriptions": {
+                name: sum(name in c.subscriptions for c in self.connections.values())
+                for name in topics
+            },
+            "topic_versions": {name: t.version for name, t in topics.items()},
+            "sessions": len(self.sessions),
+            "backplane": self.backplane.get_stats(),
+        }
+
+
+# Global instance
+manager = ConnectionManager()
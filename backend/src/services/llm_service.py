@@ -1,7 +1,10 @@
+import asyncio
 import google.generativeai as genai
 from typing import Dict, Any, Optional
 import json
 from src.config.settings import settings
+from src.core.metrics import track_upstream
+from src.core.tracing import span
 from src.services.plugin_manager import plugin_manager
 
 class LLMService:
@@ -86,10 +89,14 @@ class LLMService:
         
         # Generate response with Gemini
         try:
-            chat = self.model.start_chat(history=[])
-            response = chat.send_message(
-                f"{self.system_prompt}\n\nUser: {message}\n\nJ.A.R.V.I.S.:"
-            )
+            with span("llm.generate", model="gemini"), track_upstream(
+                "gemini", "generate", ignore=(asyncio.CancelledError,)
+            ):
+                chat = self.model.start_chat(history=[])
+                # Async call: doesn't block the loop and can be cancelled mid-flight
+                response = await chat.send_message_async(
+                    f"{self.system_prompt}\n\nUser: {message}\n\nJ.A.R.V.I.S.:"
+                )
             
             return {
                 "response": response.text,
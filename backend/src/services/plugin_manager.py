@@ -1,6 +1,9 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from src.plugins.base_plugin import BasePlugin
+from src.core.metrics import observe_plugin, observe_plugin_routing
+from src.core.tracing import span
 import importlib
+import time
 import inspect
 import pkgutil
 import src.plugins as plugins_package
@@ -78,7 +81,13 @@ class PluginManager:
         """Route message to the highest-priority plugin that can handle it."""
         if not message:
             return None
+        with span("plugins") as routing:
+            response, plugin_name = await self._route(message)
+            routing.set("plugin", plugin_name or "")
+        return response
 
+    async def _route(self, message: str) -> Tuple[Optional[str], Optional[str]]:
+        """(response, plugin name) from the first plugin that handles it, else (None, None)."""
         # Sort by priority descending
         sorted_plugins = sorted(
             self.plugins.values(),
@@ -86,17 +95,31 @@ class PluginManager:
             reverse=True,
         )
 
+        routing_start = time.perf_counter()
         for plugin in sorted_plugins:
             if not plugin.enabled:
                 continue
             try:
-                if await plugin.can_handle(message):
+                if not await plugin.can_handle(message):
+                    continue
+            except Exception as e:
+                print(f"[WARN] Plugin {plugin.name} error: {str(e)}")
+                continue
+
+            handle_start = time.perf_counter()
+            observe_plugin_routing("matched", handle_start - routing_start)
+            try:
+                with span("plugin.handle", plugin=plugin.name):
                     response = await plugin.handle(message)
-                    return response
+                observe_plugin(plugin.name, time.perf_counter() - handle_start)
+                return response, plugin.name
             except Exception as e:
+                observe_plugin(plugin.name, time.perf_counter() - handle_start, error=True)
                 print(f"[WARN] Plugin {plugin.name} error: {str(e)}")
+                routing_start = time.perf_counter()
 
-        return None
+        observe_plugin_routing("unmatched", time.perf_counter() - routing_start)
+        return None, None
 
     def get_available_plugins(self) -> List[Dict[str, Any]]:
         """Return metadata for all registered plugins."""
@@ -8,6 +8,8 @@ from concurrent.futures import ThreadPoolExecutor
 import tempfile
 import os
 from src.config.settings import settings
+from src.core.metrics import track_upstream
+from src.core.tracing import span
 
 
 class SpeechService:
@@ -58,10 +60,11 @@ class SpeechService:
 
             with sr.AudioFile(temp_path) as source:
                 audio = self.recognizer.record(source)
-                text = await asyncio.get_event_loop().run_in_executor(
-                    self.executor,
-                    lambda: self.recognizer.recognize_google(audio, language=language)
-                )
+                with span("stt.transcribe"), track_upstream("google_stt", "transcribe", ignore=(sr.UnknownValueError,)):
+                    text = await asyncio.get_event_loop().run_in_executor(
+                        self.executor,
+                        lambda: self.recognizer.recognize_google(audio, language=language)
+                    )
                 confidence = 0.9
 
             os.unlink(temp_path)
@@ -74,6 +77,36 @@ class SpeechService:
         except Exception as e:
             return f"Error: {str(e)}", 0.0
 
+    async def recognize_pcm(
+        self,
+        pcm: bytes,
+        sample_rate: int = 16000,
+        language: str = "en-US",
+    ) -> Tuple[str, Optional[float]]:
+        """
+        Recognize raw 16-bit mono PCM without a temp file round-trip.
+
+        Used by streaming sessions. Returns (text, confidence): text is empty
+        when nothing intelligible was said, and confidence is None when the
+        recognizer did not report one. Service errors are raised to the caller.
+        """
+        audio = sr.AudioData(pcm, sample_rate, 2)
+        try:
+            with span("stt.recognize"), track_upstream("google_stt", "recognize", ignore=(sr.UnknownValueError,)):
+                result = await asyncio.get_event_loop().run_in_executor(
+                    self.executor,
+                    lambda: self.recognizer.recognize_google(audio, language=language, show_all=True)
+                )
+        except sr.UnknownValueError:
+            return "", None
+        # Raw response: best alternative first; only it may carry a confidence.
+        # Older SpeechRecognition releases return [] instead of raising.
+        alternatives = result.get("alternative") if isinstance(result, dict) else None
+        if not alternatives or "transcript" not in alternatives[0]:
+            return "", None
+        best = alternatives[0]
+        return best["transcript"], best.get("confidence")
+
     # ------------------------------------------------------------------
     # Text-to-Speech  (ElevenLabs primary, pyttsx3 fallback)
     # ------------------------------------------------------------------
@@ -119,17 +152,18 @@ class SpeechService:
             },
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
-            response.raise_for_status()
-            return response.content
+        with span("tts.elevenlabs"), track_upstream("elevenlabs", "tts"):
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.post(url, json=payload, headers=headers)
+                response.raise_for_status()
+                return response.content
 
     async def _pyttsx3_tts(self, text: str) -> bytes:
         """Generate speech via pyttsx3 offline engine."""
         if not self.engine:
             raise Exception("No TTS engine available")
 
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+        with span("tts.pyttsx3"), track_upstream("pyttsx3", "tts"), tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
             temp_path = f.name
             self.engine.save_to_file(text, temp_path)
             self.engine.runAndWait()
@@ -0,0 +1,264 @@
+import asyncio
+import array
+import math
+import sys
+from typing import Awaitable, Callable, Dict, Any, Optional
+
+from src.config.settings import settings
+from src.services.speech_service import speech_service
+
+
+# Async callback used to push events back to the client: emit(event_type, data)
+EmitFn = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# PCM sample rates a client may stream at (Hz)
+SUPPORTED_SAMPLE_RATES = (8000, 16000, 24000, 48000)
+
+
+class VoiceActivityDetector:
+    """
+    Incremental energy-based voice-activity detector for 16-bit mono PCM.
+
+    Audio is consumed in fixed-size frames. A frame counts as speech when its
+    RMS energy is above the configured threshold, or clearly above the
+    adaptive noise floor learned from non-speech frames.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = 30,
+        energy_threshold: int = 300,
+        noise_ratio: float = 3.0,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        if self.frame_bytes <= 0:
+            # feed() would never consume any input
+            raise ValueError(f"{frame_ms} ms frames at {sample_rate} Hz hold no samples")
+        self.energy_threshold = energy_threshold
+        self.noise_ratio = noise_ratio
+        self._noise_floor: float = 0.0
+
+    def rms(self, frame: bytes) -> float:
+        """Root-mean-square energy of a little-endian PCM16 frame."""
+        samples = array.array("h", frame)
+        if sys.byteorder == "big":
+            samples.byteswap()
+        if not samples:
+            return 0.0
+        return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+    def is_speech(self, frame: bytes) -> bool:
+        """Classify a single frame and update the noise floor."""
+        energy = self.rms(frame)
+        threshold = max(self.energy_threshold, self._noise_floor * self.noise_ratio)
+        speech = energy >= threshold
+        if not speech:
+            # Exponential moving average over background frames only
+            self._noise_floor = 0.95 * self._noise_floor + 0.05 * energy
+        return speech
+
+
+class StreamingSTTSession:
+    """
+    One streaming recognition session on a WebSocket connection.
+
+    PCM chunks are fed in as they arrive. The VAD finds utterance boundaries;
+    while an utterance is in progress a partial transcript is produced every
+    `partial_interval_ms`, and once trailing silence exceeds `silence_ms` the
+    utterance is recognized and emitted as a final transcript.
+
+    Events emitted:
+        - stt_speech_start  { }
+        - stt_partial       { text }
+        - stt_final         { text, duration_ms, confidence? }
+
+    `confidence` is included only when the recognizer reports one. Raises
+    ValueError for a sample rate outside SUPPORTED_SAMPLE_RATES.
+    """
+
+    def __init__(
+        self,
+        emit: EmitFn,
+        on_final: Optional[Callable[[str], Awaitable[None]]] = None,
+        sample_rate: Optional[int] = None,
+        language: str = "en-US",
+    ):
+        self.emit = emit
+        self.on_final = on_final
+        self.sample_rate = settings.stt_sample_rate if sample_rate is None else sample_rate
+        self.language = language
+        if not isinstance(self.sample_rate, int) or self.sample_rate not in SUPPORTED_SAMPLE_RATES:
+            raise ValueError(
+                f"Unsupported sample_rate {self.sample_rate!r}; "
+                f"use one of {', '.join(map(str, SUPPORTED_SAMPLE_RATES))}"
+            )
+
+        self.vad = VoiceActivityDetector(
+            sample_rate=self.sample_rate,
+            energy_threshold=settings.stt_vad_energy_threshold,
+        )
+        frame_ms = self.vad.frame_ms
+        self._silence_frames_needed = max(1, settings.stt_vad_silence_ms // frame_ms)
+        self._min_speech_frames = max(1, settings.stt_vad_min_speech_ms // frame_ms)
+        self._partial_every_frames = max(1, settings.stt_partial_interval_ms // frame_ms)
+        self._max_frames = max(1, int(settings.stt_max_utterance_seconds * 1000) // frame_ms)
+        self._preroll_frames = max(1, 300 // frame_ms)
+
+        self._pending = bytearray()       # bytes not yet cut into frames
+        self._preroll: list = []          # recent non-speech frames kept as lead-in
+        self._utterance = bytearray()
+        self._in_speech = False
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self._frames_since_partial = 0
+
+        self._partial_task: Optional[asyncio.Task] = None
+        self._final_task: Optional[asyncio.Task] = None
+
+    # ------------------------------------------------------------------
+    # Feeding audio
+    # ------------------------------------------------------------------
+
+    async def feed(self, chunk: bytes):
+        """Consume a chunk of raw PCM16 mono audio."""
+        self._pending.extend(chunk)
+        frame_bytes = self.vad.frame_bytes
+
+        while len(self._pending) >= frame_bytes:
+            frame = bytes(self._pending[:frame_bytes])
+            del self._pending[:frame_bytes]
+            await self._process_frame(frame)
+
+    async def finish(self):
+        """
+        Flush any in-progress utterance (client signalled end of stream).
+
+        Its final transcript is recognized in the background; see `busy`
+        and close().
+        """
+        if self._in_speech:
+            # Audio shorter than a frame still belongs to the utterance
+            self._utterance.extend(self._pending)
+            self._finalize_utterance()
+        self._pending = bytearray()
+
+    @property
+    def busy(self) -> bool:
+        """True while a transcript is still being recognized."""
+        return any(
+            task is not None and not task.done()
+            for task in (self._partial_task, self._final_task)
+        )
+
+    async def close(self):
+        """Cancel outstanding recognition work and wait for it to stop (connection closed)."""
+        tasks = [
+            task for task in (self._partial_task, self._final_task)
+            if task is not None and not task.done()
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _process_frame(self, frame: bytes):
+        speech = self.vad.is_speech(frame)
+
+        if not self._in_speech:
+            if speech:
+                self._in_speech = True
+                self._utterance = bytearray(b"".join(self._preroll))
+                self._utterance.extend(frame)
+                self._preroll = []
+                self._speech_frames = 1
+                self._silence_frames = 0
+                self._frames_since_partial = 0
+                await self.emit("stt_speech_start", {})
+            else:
+                self._preroll.append(frame)
+                if len(self._preroll) > self._preroll_frames:
+                    self._preroll.pop(0)
+            return
+
+        self._utterance.extend(frame)
+        self._frames_since_partial += 1
+        if speech:
+            self._speech_frames += 1
+            self._silence_frames = 0
+        else:
+            self._silence_frames += 1
+
+        total_frames = len(self._utterance) // self.vad.frame_bytes
+        if self._silence_frames >= self._silence_frames_needed or total_frames >= self._max_frames:
+            self._finalize_utterance()
+            return
+
+        if self._frames_since_partial >= self._partial_every_frames:
+            self._frames_since_partial = 0
+            self._schedule_partial()
+
+    # ------------------------------------------------------------------
+    # Recognition
+    # ------------------------------------------------------------------
+
+    def _schedule_partial(self):
+        """Recognize the utterance so far, unless a partial is still running."""
+        if self._partial_task is not None and not self._partial_task.done():
+            return
+        audio = bytes(self._utterance)
+        self._partial_task = asyncio.create_task(self._run_partial(audio))
+
+    async def _run_partial(self, audio: bytes):
+        try:
+            text, _ = await speech_service.recognize_pcm(audio, self.sample_rate, self.language)
+        except Exception as e:
+            print(f"[WARN] Streaming STT partial failed: {e}")
+            return
+        if text and self._in_speech:
+            await self.emit("stt_partial", {"text": text})
+
+    def _finalize_utterance(self):
+        """Close the current utterance and recognize it in the background."""
+        audio = bytes(self._utterance)
+        speech_frames = self._speech_frames
+        duration_ms = round(len(audio) * 1000 / (self.sample_rate * 2))
+
+        self._in_speech = False
+        self._utterance = bytearray()
+        self._speech_frames = 0
+        self._silence_frames = 0
+        if self._partial_task is not None and not self._partial_task.done():
+            self._partial_task.cancel()
+
+        if speech_frames < self._min_speech_frames:
+            return  # Too short — a click or cough, not an utterance
+
+        previous = self._final_task
+        self._final_task = asyncio.create_task(
+            self._run_final(audio, duration_ms, previous)
+        )
+
+    async def _run_final(self, audio: bytes, duration_ms: int, previous: Optional[asyncio.Task]):
+        # Finals are delivered in utterance order
+        if previous is not None:
+            try:
+                await previous
+            except Exception:
+                pass
+
+        try:
+            text, confidence = await speech_service.recognize_pcm(audio, self.sample_rate, self.language)
+        except Exception as e:
+            await self.emit("error", {"message": f"Speech recognition error: {str(e)}"})
+            return
+        if not text:
+            return
+
+        final = {"text": text, "duration_ms": duration_ms}
+        if confidence is not None:
+            final["confidence"] = round(confidence, 4)
+        await self.emit("stt_final", final)
+        if self.on_final is not None:
+            await self.on_final(text)
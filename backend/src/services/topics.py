@@ -0,0 +1,125 @@
+import psutil
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from src.services.plugin_manager import plugin_manager
+from src.services.ws_codec import Outbound
+
+# Snapshots kept per topic so lagging subscribers can still get a delta
+_HISTORY = 16
+_MISSING = object()
+
+
+class Topic:
+    """
+    A piece of server state that WebSocket clients can subscribe to.
+
+    `source` returns the current state as a dict. Each distinct state gets a
+    new version number. Updates go out as a keyframe (the full state) or a
+    delta against the version the subscriber last received (changed keys in
+    `data`, deleted keys in `removed`). Messages depend only on the versions
+    involved, so each is built (and encoded per codec) once and shared by
+    all subscribers.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        source: Callable[[], Dict[str, Any]],
+        default_interval_ms: int,
+        min_interval_ms: int,
+    ):
+        self.name = name
+        self.source = source
+        self.default_interval_ms = default_interval_ms
+        self.min_interval_ms = min_interval_ms
+
+        self.version = 0
+        self.timestamp = ""
+        self._history: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._payloads: Dict[Any, Outbound] = {}
+
+    def clamp_interval(self, interval_ms: Optional[Any]) -> int:
+        try:
+            interval = int(interval_ms) if interval_ms is not None else self.default_interval_ms
+        except (TypeError, ValueError):
+            interval = self.default_interval_ms
+        return max(interval, self.min_interval_ms)
+
+    def refresh(self):
+        """Read the source; bumps the version if the state changed."""
+        state = self.source()
+        if self._history and self._history[self.version] == state:
+            return
+        self.version += 1
+        self.timestamp = datetime.now().isoformat()
+        self._history[self.version] = state
+        if len(self._history) > _HISTORY:
+            self._history.popitem(last=False)
+        self._payloads.clear()
+
+    def has_version(self, version: int) -> bool:
+        return version in self._history
+
+    def keyframe(self) -> Outbound:
+        payload = self._payloads.get("keyframe")
+        if payload is None:
+            payload = self._payloads["keyframe"] = Outbound({
+                "type": "topic_update",
+                "topic": self.name,
+                "version": self.version,
+                "keyframe": True,
+                "timestamp": self.timestamp,
+                "data": self._history[self.version],
+            })
+        return payload
+
+    def delta(self, base: int) -> Outbound:
+        """Changes from `base` (which must still be in history) to the current version."""
+        payload = self._payloads.get(base)
+        if payload is None:
+            old, new = self._history[base], self._history[self.version]
+            message = {
+                "type": "topic_update",
+                "topic": self.name,
+                "version": self.version,
+                "base": base,
+                "timestamp": self.timestamp,
+                "data": {k: v for k, v in new.items() if old.get(k, _MISSING) != v},
+            }
+            removed = [k for k in old if k not in new]
+            if removed:
+                message["removed"] = removed
+            payload = self._payloads[base] = Outbound(message)
+        return payload
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+def _system_metrics() -> Dict[str, Any]:
+    return {
+        "cpu_usage": psutil.cpu_percent(interval=0),
+        "memory_usage": psutil.virtual_memory().percent,
+        "disk_usage": psutil.disk_usage('/').percent,
+    }
+
+
+def _device_state() -> Dict[str, Any]:
+    plugin = plugin_manager.plugins.get("SmartHomePlugin")
+    return plugin.get_devices() if plugin else {}
+
+
+def _reminders() -> Dict[str, Any]:
+    plugin = plugin_manager.plugins.get("CalendarPlugin")
+    reminders = plugin.get_reminders() if plugin else []
+    return {str(i): r for i, r in enumerate(reminders)}
+
+
+# Global instance
+topics: Dict[str, Topic] = {
+    "metrics": Topic("metrics", _system_metrics, default_interval_ms=3000, min_interval_ms=500),
+    "device_state": Topic("device_state", _device_state, default_interval_ms=1000, min_interval_ms=250),
+    "reminders": Topic("reminders", _reminders, default_interval_ms=5000, min_interval_ms=1000),
+}
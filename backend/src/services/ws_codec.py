@@ -0,0 +1,139 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Union
+
+try:
+    import msgpack
+except ImportError:  # MessagePack subprotocol unavailable; everyone speaks JSON
+    msgpack = None
+
+MSGPACK_SUBPROTOCOL = "jarvis.msgpack.v1"
+
+# ---------------------------------------------------------------------------
+# MessagePack wire format
+# ---------------------------------------------------------------------------
+# Frames are binary MessagePack maps. The message type travels as a small
+# integer under "t" instead of the "type" string (types missing from the
+# table are sent as strings), ISO timestamps become epoch seconds (float),
+# and stt_chunk audio may be sent as raw bytes. The table is included in the
+# `connected` message so clients need not hard-code it.
+
+TYPE_CODES: Dict[str, int] = {
+    # client -> server
+    "chat": 1, "cancel": 2, "subscribe": 3, "unsubscribe": 4,
+    "stt_start": 5, "stt_chunk": 6, "stt_stop": 7, "ping": 8, "pong": 9,
+    # server -> client
+    "connected": 20, "chat_processing": 21, "chat_response": 22, "chat_cancelled": 23,
+    "error": 24, "subscribed": 25, "unsubscribed": 26, "topic_update": 27,
+    "system_metrics": 28, "heartbeat": 29, "stt_started": 30, "stt_stopped": 31,
+    "stt_speech_start": 32, "stt_partial": 33, "stt_final": 34, "stt_error": 35,
+    "session_message": 36,
+}
+TYPE_NAMES: Dict[int, str] = {code: name for name, code in TYPE_CODES.items()}
+
+
+def _epoch(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return value
+    return value
+
+
+def _compact(message: Dict[str, Any]) -> Dict[str, Any]:
+    out = {}
+    for key, value in message.items():
+        if key == "type":
+            out["t"] = TYPE_CODES.get(value, value)
+        elif key == "timestamp":
+            out[key] = _epoch(value)
+        elif key == "data" and isinstance(value, dict) and "timestamp" in value:
+            out[key] = {**value, "timestamp": _epoch(value["timestamp"])}
+        else:
+            out[key] = value
+    return out
+
+
+class JsonCodec:
+    name = "json"
+    binary = False
+
+    @staticmethod
+    def encode(message: Dict[str, Any]) -> str:
+        return json.dumps(message)
+
+    @staticmethod
+    def decode(frame: Union[str, bytes]) -> Any:
+        return json.loads(frame)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    binary = True
+
+    @staticmethod
+    def encode(message: Dict[str, Any]) -> bytes:
+        return msgpack.packb(_compact(message), use_bin_type=True)
+
+    @staticmethod
+    def decode(frame: Union[str, bytes]) -> Any:
+        message = msgpack.unpackb(frame, raw=False)
+        if isinstance(message, dict) and "t" in message:
+            code = message.pop("t")
+            message["type"] = TYPE_NAMES.get(code, code)
+        return message
+
+
+def negotiate(offered) -> Any:
+    """Codec for the subprotocols a client offered: MessagePack if asked for and available."""
+    if msgpack is not None and MSGPACK_SUBPROTOCOL in (offered or ()):
+        return MsgpackCodec
+    return JsonCodec
+
+
+class Outbound:
+    """
+    A message to send, encoded at most once per codec and shared by every
+    connection it is queued on. Built from a dict, or from JSON text that
+    arrived over the backplane (only decoded if a MessagePack client needs it).
+    """
+
+    __slots__ = ("_message", "_json", "_msgpack")
+
+    def __init__(self, message: Optional[Dict[str, Any]] = None, json_text: Optional[str] = None):
+        self._message = message
+        self._json = json_text
+        self._msgpack: Optional[bytes] = None
+
+    @property
+    def message(self) -> Dict[str, Any]:
+        if self._message is None:
+            self._message = json.loads(self._json)
+        return self._message
+
+    @property
+    def type(self) -> str:
+        if self._message is None and self._json is not None:
+            # Server messages put "type" first; avoid parsing the whole payload
+            start = self._json.find('"type": "')
+            if start >= 0:
+                end = self._json.find('"', start + 9)
+                if 0 < end - start - 9 <= 32:
+                    return self._json[start + 9:end]
+            return "unknown"
+        value = self.message.get("type", "unknown")
+        return value if isinstance(value, str) else "unknown"
+
+    def json(self) -> str:
+        if self._json is None:
+            self._json = JsonCodec.encode(self._message)
+        return self._json
+
+    def encoded(self, codec) -> Union[str, bytes]:
+        if codec is MsgpackCodec:
+            if self._msgpack is None:
+                self._msgpack = MsgpackCodec.encode(self.message)
+            return self._msgpack
+        return self.json()
+
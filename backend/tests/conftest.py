@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.config.database import Base
+import src.models.database_models  # noqa: F401  (registers the tables)
+
+
+@pytest.fixture
+def memory_db():
+    """
+    Returns an async factory for a fresh in-memory SQLite database:
+    `engine, session_factory = await memory_db()`. Call it inside the
+    event loop the test runs on.
+    """
+    engines = []
+
+    async def create():
+        engine = create_async_engine(
+            "sqlite+aiosqlite://", poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        engines.append(engine)
+        return engine, async_sessionmaker(engine, expire_on_commit=False)
+
+    return create
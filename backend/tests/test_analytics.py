@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+
+from src.config.database import Base
+from src.database.analytics import conversation_analytics
+from src.database.crud import conversation_crud
+from src.models.database_models import ConversationHourlyRollup, ConversationRollup
+
+BASE = datetime(2026, 1, 1, 9, 30)
+START, END = BASE - timedelta(days=1), BASE + timedelta(days=30)
+
+
+def exchanges():
+    """3 sessions over a few hours, with a 10-day gap before the last one."""
+    plan = [
+        ("a", "WeatherPlugin", 0), ("a", None, 0), ("b", "WeatherPlugin", 0),
+        ("b", "WeatherPlugin", 1), ("c", None, 2), ("a", "CalendarPlugin", 24 * 10),
+    ]
+    return [
+        {
+            "session_id": session,
+            "user_message": "q",
+            "assistant_response": "a",
+            "plugin_used": plugin,
+            "created_at": BASE + timedelta(hours=hours),
+        }
+        for session, plugin, hours in plan
+    ]
+
+
+async def seeded(memory_db):
+    engine, factory = await memory_db()
+    async with factory() as db:
+        await conversation_crud.save_conversations_bulk(db, exchanges())
+    return engine, factory
+
+
+async def snapshot(factory):
+    async with factory() as db:
+        return {
+            "volume": await conversation_analytics.hourly_volume(db, START, END),
+            "plugins": await conversation_analytics.plugin_usage(db, START, END),
+            "session_a": await conversation_analytics.hourly_volume(db, START, END, session_id="a"),
+        }
+
+
+def test_queries_read_the_matching_rollup_level(memory_db):
+    snap = asyncio.run(snapshot_of(memory_db))
+    assert snap["volume"] == [
+        {"hour": "2026-01-01T09:00:00", "count": 3},
+        {"hour": "2026-01-01T10:00:00", "count": 1},
+        {"hour": "2026-01-01T11:00:00", "count": 1},
+        {"hour": "2026-01-11T09:00:00", "count": 1},
+    ]
+    assert snap["plugins"] == [
+        {"plugin": "WeatherPlugin", "count": 3},
+        {"plugin": None, "count": 2},
+        {"plugin": "CalendarPlugin", "count": 1},
+    ]
+    assert snap["session_a"] == [
+        {"hour": "2026-01-01T09:00:00", "count": 2},
+        {"hour": "2026-01-11T09:00:00", "count": 1},
+    ]
+
+
+async def snapshot_of(memory_db):
+    _, factory = await seeded(memory_db)
+    return await snapshot(factory)
+
+
+def test_hourly_rollup_has_no_per_session_rows(memory_db):
+    async def run():
+        _, factory = await seeded(memory_db)
+        async with factory() as db:
+            hourly = (await db.execute(select(ConversationHourlyRollup))).scalars().all()
+            per_session = (await db.execute(select(ConversationRollup))).scalars().all()
+        return len(hourly), len(per_session)
+
+    assert asyncio.run(run()) == (5, 6)
+
+
+def test_deleting_a_session_updates_both_levels(memory_db):
+    async def run():
+        _, factory = await seeded(memory_db)
+        async with factory() as db:
+            await conversation_crud.delete_by_session(db, "b")
+        return await snapshot(factory)
+
+    snap = asyncio.run(run())
+    assert snap["volume"] == [
+        {"hour": "2026-01-01T09:00:00", "count": 2},
+        {"hour": "2026-01-01T11:00:00", "count": 1},
+        {"hour": "2026-01-11T09:00:00", "count": 1},
+    ]
+    assert {"plugin": "WeatherPlugin", "count": 1} in snap["plugins"]
+
+
+def test_batched_backfill_matches_incremental_rollups(memory_db, tmp_path):
+    url = f"sqlite:///{tmp_path / 'backfill.db'}"
+
+    async def incremental():
+        return await snapshot_of(memory_db)
+
+    async def rebuilt():
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        engine = create_async_engine(url.replace("sqlite:", "sqlite+aiosqlite:"))
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            return await snapshot(factory)
+        finally:
+            await engine.dispose()
+
+    async def seed_file():
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        engine = create_async_engine(url.replace("sqlite:", "sqlite+aiosqlite:"))
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with factory() as db:
+            await conversation_crud.save_conversations_bulk(db, exchanges())
+            # Stale rollups the rebuild must clear: in a gap, and after the last hour
+            await conversation_analytics.record(db, [
+                (BASE + timedelta(days=5), "Ghost", "x"), (BASE + timedelta(days=20), "Ghost", "x"),
+            ])
+            await db.commit()
+        await engine.dispose()
+
+    expected = asyncio.run(incremental())
+    asyncio.run(seed_file())
+    sync_engine = create_engine(url)
+    written = conversation_analytics.backfill(sync_engine, batch_hours=1)
+    sync_engine.dispose()
+    assert written == 11
+    assert asyncio.run(rebuilt()) == expected
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from src.database.retention import ConversationArchive
+from src.database.search import conversation_search
+
+BASE = datetime(2026, 1, 1, 12, 0)
+
+
+def archive_with_days(tmp_path, days, per_day=1):
+    archive = ConversationArchive(root=str(tmp_path))
+    rows = [
+        {
+            "id": day * per_day + i,
+            "session_id": "s",
+            "user_message": f"rain forecast day {day}",
+            "assistant_response": "Light rain expected, Sir.",
+            "plugin_used": None,
+            "metadata": None,
+            "created_at": (BASE + timedelta(days=day)).isoformat(),
+        }
+        for day in range(days)
+        for i in range(per_day)
+    ]
+    archive.append(rows)
+    return archive
+
+
+def test_search_reads_only_the_newest_partitions(tmp_path):
+    archive = archive_with_days(tmp_path, days=10)
+    hits = archive.search_rows(["rain"], limit=100, max_partitions=3)
+    assert [hit["id"] for hit in hits] == [7, 8, 9]
+
+
+def test_search_partition_cap_applies_within_the_range(tmp_path):
+    archive = archive_with_days(tmp_path, days=10)
+    hits = archive.search_rows(
+        ["rain"], limit=100, max_partitions=2,
+        start=BASE, end=BASE + timedelta(days=4, hours=1),
+    )
+    assert [hit["id"] for hit in hits] == [3, 4]
+
+
+def test_search_archived_clamps_limit_and_adds_snippets(tmp_path):
+    archive = archive_with_days(tmp_path, days=2, per_day=150)
+    hits = asyncio.run(conversation_search.search_archived(archive, "rain", limit=10_000))
+    assert len(hits) == conversation_search.MAX_RESULTS
+    assert hits[0]["archived"] is True and hits[0]["score"] is None
+    assert "[rain]" in hits[0]["user_snippet"]
+
+
+def test_search_archived_ignores_queries_without_terms(tmp_path):
+    archive = archive_with_days(tmp_path, days=1)
+    assert asyncio.run(conversation_search.search_archived(archive, "?!", limit=5)) == []
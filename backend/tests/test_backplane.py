@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+from src.services.backplane import _BatchingBackplane
+from src.services.connection_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, host):
+        self.client = type("Client", (), {"host": host})()
+        self.scope = {"subprotocols": []}
+        self.sent = []
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, frame):
+        self.sent.append(json.loads(frame))
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+class RecordingBackplane:
+    name = "recording"
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, payload):
+        self.published.append((channel, json.loads(payload) if payload else payload))
+
+
+def types(ws):
+    return [m["type"] for m in ws.sent]
+
+
+def test_batching_backplane_requires_frame_and_send_batch():
+    class Incomplete(_BatchingBackplane):
+        def _frame(self, channel, payload):
+            return b""
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_session_push_reaches_local_sockets_and_the_backplane():
+    async def run():
+        manager = ConnectionManager()
+        manager.backplane = RecordingBackplane()
+        sender, follower, other = FakeWebSocket("a"), FakeWebSocket("b"), FakeWebSocket("c")
+        for ws in (sender, follower, other):
+            await manager.connect(ws)
+        manager.bind_session(sender, "s1")
+        manager.bind_session(follower, "s1")
+
+        await manager.announce_exchange("s1", "hi", "hello, Sir", exclude=sender)
+        await asyncio.sleep(0.01)  # let the writers drain
+        await manager.drain(timeout=0.1)
+        return manager, sender, follower, other
+
+    manager, sender, follower, other = asyncio.run(run())
+    assert "session_message" in types(follower)
+    assert "session_message" not in types(sender)
+    assert "session_message" not in types(other)
+    [(channel, message)] = manager.backplane.published
+    assert channel == "session:s1"
+    assert message["data"]["assistant_response"] == "hello, Sir"
+
+
+def test_deliver_routes_relays_and_remote_session_messages():
+    async def run():
+        manager = ConnectionManager()
+        relayed = []
+        manager.on_relay("history", lambda key, payload: relayed.append((key, payload)))
+        follower = FakeWebSocket("b")
+        await manager.connect(follower)
+        manager.bind_session(follower, "s1")
+
+        manager._deliver("history:s1", "")
+        manager._deliver("session:s1", json.dumps({"type": "session_message", "data": {}}))
+        await asyncio.sleep(0.01)
+        await manager.drain(timeout=0.1)
+        return relayed, follower
+
+    relayed, follower = asyncio.run(run())
+    assert relayed == [("s1", "")]
+    assert types(follower).count("session_message") == 1
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import QueuePool
+
+from src.database.instrumentation import DatabaseMetrics
+
+
+def sample(metric, **labels):
+    return REGISTRY.get_sample_value(metric, labels) or 0.0
+
+
+@pytest.fixture
+def instrumented(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    metrics = DatabaseMetrics()
+    metrics.instrument(engine, f"test-{tmp_path.name}")
+    yield engine, metrics, f"test-{tmp_path.name}"
+    engine.dispose()
+
+
+def test_pool_events_are_counted_and_exported(instrumented):
+    engine, metrics, name = instrumented
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+    stats = metrics.get_stats()["engines"][name]
+    assert stats["checkouts"] == 3
+    assert stats["connects"] == 1
+    assert stats["checkout_wait_ms"]["count"] == 3
+    assert stats["held_ms"]["count"] == 3
+    assert stats["connect_ms"]["count"] == 1
+    assert sample("jarvis_db_pool_events_total", engine=name, event="checkouts") == 3
+    assert sample("jarvis_db_checkout_wait_seconds_count", engine=name) == 3
+    assert sample("jarvis_db_connection_held_seconds_count", engine=name) == 3
+    assert sample("jarvis_db_connections_checked_out", engine=name) == 0
+    assert sample("jarvis_db_statement_duration_seconds_count", engine=name, operation="other") == 3
+
+
+def test_checked_out_gauge_tracks_open_connections(instrumented):
+    engine, _, name = instrumented
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("SELECT 1"))
+        second.execute(text("SELECT 1"))
+        assert sample("jarvis_db_connections_checked_out", engine=name) == 2
+    assert sample("jarvis_db_connections_checked_out", engine=name) == 0
+
+
+def test_failed_statement_does_not_leak_its_start_time(instrumented):
+    engine, metrics, name = instrumented
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info.get("query_start") == []
+        conn.execute(text("SELECT 1"))
+        assert conn.info.get("query_start") == []
+
+    stats = metrics.get_stats()
+    assert stats["engines"][name]["statement_errors"] == 1
+    assert stats["statements_ms"]["other"]["count"] == 1
+
+
+def test_checkout_wait_covers_queueing_for_a_busy_pool(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wait.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    metrics = DatabaseMetrics()
+    name = f"test-wait-{tmp_path.name}"
+    metrics.instrument(engine, name)
+    holding = threading.Event()
+
+    def hold():
+        with engine.connect():
+            holding.set()
+            time.sleep(0.2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait()
+    with engine.connect() as conn:  # queues until the holder checks in
+        conn.execute(text("SELECT 1"))
+    holder.join()
+    engine.dispose()
+
+    wait = metrics.get_stats()["engines"][name]["checkout_wait_ms"]
+    assert wait["count"] == 2
+    assert wait["max"] >= 150
+    assert sample("jarvis_db_checkout_wait_seconds_bucket", engine=name, le="0.1") == 1
+    assert sample("jarvis_db_checkout_wait_seconds_count", engine=name) == 2
+
+
+def test_checkout_wait_is_recorded_for_async_sessions(tmp_path):
+    name = f"test-async-{tmp_path.name}"
+    metrics = DatabaseMetrics()
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+        metrics.instrument(engine.sync_engine, name)
+        async with AsyncSession(engine) as session:
+            await session.execute(text("SELECT 1"))
+        await engine.dispose()
+
+    asyncio.run(run())
+    assert metrics.get_stats()["engines"][name]["checkout_wait_ms"]["count"] == 1
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from src.middleware.fused import FusedEdgeMiddleware
+from src.middleware.logging_config import RequestLoggingMiddleware
+from src.middleware.rate_limiter import RateLimiterMiddleware
+from src.middleware.security import SecurityHeadersMiddleware
+
+OPTIONS = dict(rate_limit=2, chat_rate_limit=1)
+MB = 1024 * 1024
+
+
+received = []
+
+
+async def echo(request):
+    body = await request.body()
+    received.append(len(body))
+    return PlainTextResponse(str(len(body)))
+
+
+def build(fused: bool) -> TestClient:
+    app = Starlette(routes=[Route("/api/v1/echo", echo, methods=["POST"])])
+    if fused:
+        app.add_middleware(FusedEdgeMiddleware, max_body_size_mb=1, log_sample_rate=0, **OPTIONS)
+    else:
+        app.add_middleware(SecurityHeadersMiddleware, max_body_size_mb=1)
+        app.add_middleware(RateLimiterMiddleware, **OPTIONS)
+        app.add_middleware(RequestLoggingMiddleware, sample_rate=0)
+    return TestClient(app)
+
+
+def replay(client: TestClient):
+    """Oversized body, normal request, then one over the limit."""
+    responses = [
+        client.post("/api/v1/echo", content=b"x" * (MB + 1)),
+        client.post("/api/v1/echo", content=b"hello"),
+        client.post("/api/v1/echo", content=b"hello"),
+    ]
+    return [
+        (r.status_code, r.headers.get("ratelimit-remaining"), "x-content-type-options" in r.headers)
+        for r in responses
+    ]
+
+
+def test_fused_layer_checks_in_the_stacked_order():
+    stacked, fused = replay(build(fused=False)), replay(build(fused=True))
+    # The 413 is counted against the limit first, in both
+    assert [status for status, *_ in stacked] == [413, 200, 429]
+    assert [status for status, *_ in fused] == [413, 200, 429]
+    assert [remaining for _, remaining, _ in stacked] == ["1", "0", "0"]
+    assert [remaining for _, remaining, _ in fused] == ["1", "0", "0"]
+
+
+def test_fused_layer_adds_security_headers_to_429_too():
+    stacked, fused = replay(build(fused=False)), replay(build(fused=True))
+    assert [secure for *_, secure in stacked] == [True, True, False]
+    assert [secure for *_, secure in fused] == [True, True, True]
+
+
+def test_both_stacks_send_the_same_headers_on_success():
+    headers = []
+    for fused in (False, True):
+        response = build(fused).post("/api/v1/echo", content=b"hello")
+        headers.append(sorted(name for name in response.headers if name != "server-timing"))
+    assert headers[0] == headers[1]
+
+
+def stream(app, chunks):
+    """POST `chunks` as separate http.request messages, with no Content-Length."""
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/api/v1/echo", "raw_path": b"/api/v1/echo", "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"test"), (b"transfer-encoding", b"chunked")],
+        "client": ("10.0.0.9", 50000), "server": ("test", 80),
+    }
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"]
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_chunked_body_over_the_limit_is_rejected_without_content_length(fused):
+    received.clear()
+    status = stream(build(fused).app, [b"x" * (256 * 1024)] * 4 + [b"x"])
+    assert status == 413
+    assert received == []
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_chunked_body_just_under_the_limit_passes(fused):
+    received.clear()
+    status = stream(build(fused).app, [b"x" * (256 * 1024)] * 3 + [b"x" * (256 * 1024 - 1)])
+    assert status == 200
+    assert received == [MB - 1]
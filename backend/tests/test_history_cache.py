@@ -0,0 +1,136 @@
+import json
+
+from src.database.history_cache import SessionHistoryCache
+
+
+def turn(i, second=None):
+    return {
+        "id": i,
+        "user_message": f"q{i}",
+        "assistant_response": f"a{i}",
+        "plugin_used": None,
+        "created_at": f"2026-01-01T09:00:{second if second is not None else i:02d}",
+    }
+
+
+def cached_ids(cache, session_id="s", n=50):
+    return [t["id"] for t in cache.lookup(session_id, n)]
+
+
+def filled(turns, turns_per_session=5, complete=True):
+    cache = SessionHistoryCache(turns_per_session=turns_per_session)
+    cache.enabled = True
+    cache.fill("s", cache.begin_load("s"), turns, complete=complete)
+    return cache
+
+
+class FakeManager:
+    def __init__(self, backplane="unix_socket"):
+        self.backplane = type("Backplane", (), {"name": backplane})()
+        self.relayed = []
+        self.handlers = {}
+
+    def relay(self, channel, payload):
+        self.relayed.append(channel)
+
+    def on_relay(self, prefix, handler):
+        self.handlers[prefix] = handler
+
+
+# --- Ordering ---
+
+def test_in_order_appends_keep_a_sliding_window():
+    cache = filled([turn(1), turn(2)], turns_per_session=3)
+    for i in (3, 4):
+        cache.append("s", turn(i))
+    assert cached_ids(cache, n=3) == [2, 3, 4]
+    assert cache.whole_session("s", 50) is None  # turn 1 fell out of the window
+
+
+def test_out_of_order_append_is_placed_by_created_at_and_id():
+    cache = filled([turn(1), turn(3)])
+    cache.append("s", turn(2))
+    assert cached_ids(cache) == [1, 2, 3]
+    # Same second: the id decides
+    cache.append("s", turn(5, second=4))
+    cache.append("s", turn(4, second=4))
+    assert cached_ids(cache) == [1, 2, 3, 4, 5]
+
+
+def test_out_of_order_append_into_a_full_window_drops_the_oldest():
+    cache = filled([turn(1), turn(2), turn(4)], turns_per_session=3)
+    cache.append("s", turn(3))
+    assert cached_ids(cache, n=3) == [2, 3, 4]
+    assert cache.whole_session("s", 50) is None
+
+
+def test_append_older_than_a_full_window_is_left_out():
+    cache = filled([turn(2), turn(3), turn(4)], turns_per_session=3)
+    cache.append("s", turn(1))
+    assert cached_ids(cache, n=3) == [2, 3, 4]
+    assert cache.whole_session("s", 50) is None
+
+
+def test_duplicate_append_is_ignored_and_json_is_rebuilt():
+    cache = filled([turn(1), turn(2)])
+    assert [t["id"] for t in json.loads(cache.whole_session_json("s", 50))] == [1, 2]
+    cache.append("s", turn(2))
+    cache.append("s", turn(3))
+    assert [t["id"] for t in json.loads(cache.whole_session_json("s", 50))] == [1, 2, 3]
+    assert cache.get_stats()["approx_bytes"] > 0
+
+
+# --- Invalidation ---
+
+def test_load_racing_a_write_is_not_cached():
+    cache = SessionHistoryCache()
+    cache.enabled = True
+    token = cache.begin_load("s")
+    cache.append("s", turn(2))
+    cache.fill("s", token, [turn(1)], complete=True)
+    assert cache.lookup("s", 1) is None
+
+
+def test_writes_are_relayed_and_remote_writes_drop_the_session():
+    manager = FakeManager()
+    cache = filled([turn(1)])
+    cache.share_with(manager)
+
+    cache.append("s", turn(2))
+    cache.invalidate("other")
+    assert manager.relayed == ["history:s", "history:other"]
+
+    assert cached_ids(cache) == [1, 2]
+    manager.handlers["history"]("s", "")
+    assert cache.lookup("s", 1) is None
+    assert cache.get_stats()["remote_invalidations"] == 1
+
+
+def test_remote_write_during_a_load_keeps_it_out_of_the_cache():
+    manager = FakeManager()
+    cache = SessionHistoryCache()
+    cache.enabled = True
+    cache.share_with(manager)
+    token = cache.begin_load("s")
+    manager.handlers["history"]("s", "")
+    cache.fill("s", token, [turn(1)], complete=True)
+    assert cache.lookup("s", 1) is None
+
+
+def test_several_workers_without_backplane_disable_the_cache(monkeypatch):
+    cache = filled([turn(1)])
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    cache.share_with(FakeManager(backplane="in_process"))
+    assert not cache.enabled
+    assert cache.lookup("s", 1) is None
+    assert cache.get_stats()["sessions"] == 0
+
+
+def test_single_worker_without_backplane_keeps_the_cache(monkeypatch):
+    cache = filled([turn(1)])
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    manager = FakeManager(backplane="in_process")
+    cache.share_with(manager)
+    cache.append("s", turn(2))
+    assert cache.enabled and cached_ids(cache) == [1, 2]
+    assert manager.relayed == []
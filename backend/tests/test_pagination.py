@@ -0,0 +1,135 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.database.crud import conversation_crud, decode_cursor, encode_cursor
+from src.models.database_models import Conversation
+
+BASE = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def rows(n, same_second=False):
+    return [
+        {
+            "session_id": f"s{i % 3}",
+            "user_message": f"question {i}",
+            "assistant_response": f"answer {i}",
+            "plugin_used": None,
+            "created_at": BASE + timedelta(seconds=0 if same_second else i),
+        }
+        for i in range(n)
+    ]
+
+
+async def seed(memory_db, data):
+    engine, factory = await memory_db()
+    async with factory() as db:
+        await conversation_crud.save_conversations_bulk(db, data)
+    return engine, factory
+
+
+async def walk(factory, limit, **kwargs):
+    """All pages of /chat/history, following next_cursor."""
+    pages, cursor = [], None
+    async with factory() as db:
+        while True:
+            page, cursor = await conversation_crud.get_conversations(db, limit=limit, cursor=cursor, **kwargs)
+            pages.append([c.id for c in page])
+            if cursor is None:
+                return pages
+
+
+def test_cursor_round_trip():
+    conv = Conversation(id=42, created_at=datetime(2026, 3, 4, 5, 6, 7, tzinfo=timezone.utc))
+    cursor = encode_cursor(conv)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (conv.created_at, 42)
+
+
+def test_cursor_without_timestamp():
+    assert decode_cursor(encode_cursor(Conversation(id=7, created_at=None))) == (None, 7)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "W10", "WyJ4IiwgMV0"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("n, limit", [(10, 3), (9, 3), (3, 3), (2, 3), (1, 1)])
+def test_pages_cover_every_row_once_newest_first(memory_db, n, limit):
+    async def run():
+        _, factory = await seed(memory_db, rows(n))
+        return await walk(factory, limit)
+
+    pages = asyncio.run(run())
+    ids = [i for page in pages for i in page]
+    assert ids == list(range(n, 0, -1))
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 1 <= len(pages[-1]) <= limit  # no empty trailing page
+
+
+def test_rows_sharing_a_timestamp_are_split_by_id(memory_db):
+    async def run():
+        _, factory = await seed(memory_db, rows(7, same_second=True))
+        return await walk(factory, 2)
+
+    ids = [i for page in asyncio.run(run()) for i in page]
+    assert ids == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_new_rows_do_not_shift_later_pages(memory_db):
+    async def run():
+        _, factory = await seed(memory_db, rows(6))
+        async with factory() as db:
+            first, cursor = await conversation_crud.get_conversations(db, limit=3)
+            newer = dict(rows(1)[0], created_at=BASE + timedelta(hours=1))
+            await conversation_crud.save_conversations_bulk(db, [newer])
+            second, _ = await conversation_crud.get_conversations(db, limit=3, cursor=cursor)
+        return [c.id for c in first], [c.id for c in second]
+
+    first, second = asyncio.run(run())
+    assert first == [6, 5, 4]
+    assert second == [3, 2, 1]
+
+
+def test_deprecated_skip_still_pages(memory_db):
+    async def run():
+        _, factory = await seed(memory_db, rows(5))
+        async with factory() as db:
+            page, cursor = await conversation_crud.get_conversations(db, limit=2, skip=2)
+            with pytest.raises(ValueError):
+                await conversation_crud.get_conversations(db, limit=2, skip=2, cursor=cursor)
+        return [c.id for c in page], cursor
+
+    page, cursor = asyncio.run(run())
+    assert page == [3, 2]
+    assert cursor is not None
+
+
+def test_session_pages_run_oldest_first(memory_db):
+    async def run():
+        _, factory = await seed(memory_db, rows(10))
+        ids, cursor = [], None
+        async with factory() as db:
+            while True:
+                page, cursor = await conversation_crud.get_by_session(db, "s0", limit=2, cursor=cursor)
+                ids += [c.id for c in page]
+                if cursor is None:
+                    return ids
+
+    assert asyncio.run(run()) == [1, 4, 7, 10]
+
+
+def test_export_bounds_with_an_offset_are_compared_in_utc(memory_db):
+    # Rows are stored as naive UTC: 12:00:00Z .. 12:00:09Z
+    start = datetime(2026, 1, 1, 13, 0, 5, tzinfo=timezone(timedelta(hours=1)))  # 12:00:05Z
+    end = datetime(2026, 1, 1, 7, 0, 8, tzinfo=timezone(timedelta(hours=-5)))  # 12:00:08Z
+
+    async def run():
+        _, factory = await seed(memory_db, rows(10))
+        async with factory() as db:
+            return [c.id async for c in conversation_crud.stream_conversations(db, start=start, end=end)]
+
+    assert asyncio.run(run()) == [6, 7, 8]
@@ -0,0 +1,79 @@
+import asyncio
+import fcntl
+import os
+
+import pytest
+
+from src.middleware.rate_limit_backends import SharedMemoryBackend
+
+KEY = ("default", "10.0.0.1")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "rl.bin")
+
+
+def test_workers_share_one_table(path):
+    async def run():
+        first = SharedMemoryBackend(path=path, slots=64)
+        second = SharedMemoryBackend(path=path, slots=64)
+        try:
+            decisions = [await (first if i % 2 else second).hit(KEY, 10) for i in range(11)]
+        finally:
+            await first.close()
+            await second.close()
+        return decisions
+
+    decisions = asyncio.run(run())
+    assert [d.allowed for d in decisions] == [True] * 10 + [False]
+    assert decisions[9].remaining == 0
+
+
+def test_slot_count_is_part_of_the_file_name(path, tmp_path):
+    small = SharedMemoryBackend(path=path, slots=64)
+    large = SharedMemoryBackend(path=path, slots=128)
+    assert small.path != large.path
+    assert sorted(os.listdir(tmp_path)) == ["rl-128.bin", "rl-64.bin"]
+    asyncio.run(small.close())
+    asyncio.run(large.close())
+
+
+def test_mismatched_table_is_refused_not_reformatted(path, tmp_path):
+    foreign = tmp_path / "rl-64.bin"
+    foreign.write_bytes(b"not a rate limit table")
+    with pytest.raises(RuntimeError, match="not a 64-slot"):
+        SharedMemoryBackend(path=path, slots=64)
+    assert foreign.read_bytes() == b"not a rate limit table"
+
+
+def test_busy_lock_times_out_without_blocking_the_loop(path):
+    backend = SharedMemoryBackend(path=path, slots=64, lock_timeout=0.05)
+    holder = os.open(backend.path, os.O_RDWR)
+    fcntl.flock(holder, fcntl.LOCK_EX)  # another worker stuck inside a check
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.create_task(ticker())
+        try:
+            with pytest.raises(TimeoutError):
+                await backend.hit(KEY, 10)
+        finally:
+            task.cancel()
+        return ticks
+
+    try:
+        assert asyncio.run(run()) >= 10  # the loop kept running while hit() waited
+        assert backend.lock_timeouts == 1
+    finally:
+        fcntl.flock(holder, fcntl.LOCK_UN)
+        os.close(holder)
+    assert asyncio.run(backend.hit(KEY, 10)).allowed
+    asyncio.run(backend.close())
@@ -0,0 +1,88 @@
+import pytest
+
+from src.middleware.rate_limiter import GCRARateLimiter
+
+KEY = ("default", "10.0.0.1")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_full_bucket_allows_a_burst_of_limit_then_denies(clock):
+    limiter = GCRARateLimiter(clock=clock)
+    decisions = [limiter.hit(KEY, 60) for _ in range(60)]
+    assert all(d.allowed for d in decisions)
+    assert [d.remaining for d in decisions[:3]] == [59, 58, 57]
+    assert decisions[-1].remaining == 0
+
+    denied = limiter.hit(KEY, 60)
+    assert not denied.allowed
+    assert denied.remaining == 0
+    assert denied.retry_after == pytest.approx(1.0)
+    assert denied.reset_after == pytest.approx(60.0)
+
+
+def test_tokens_drip_back_one_interval_at_a_time(clock):
+    limiter = GCRARateLimiter(clock=clock)
+    for _ in range(60):
+        limiter.hit(KEY, 60)
+
+    clock.now += 0.999
+    assert not limiter.hit(KEY, 60).allowed
+    clock.now += 0.001
+    allowed = limiter.hit(KEY, 60)
+    assert allowed.allowed and allowed.remaining == 0
+    assert not limiter.hit(KEY, 60).allowed
+
+
+def test_denied_requests_do_not_consume_tokens(clock):
+    limiter = GCRARateLimiter(clock=clock)
+    for _ in range(60):
+        limiter.hit(KEY, 60)
+    for _ in range(100):
+        assert not limiter.hit(KEY, 60).allowed
+    clock.now += 1.0
+    assert limiter.hit(KEY, 60).allowed
+
+
+def test_bucket_is_full_again_after_reset_after(clock):
+    limiter = GCRARateLimiter(clock=clock)
+    for _ in range(30):
+        last = limiter.hit(KEY, 60)
+    assert last.reset_after == pytest.approx(30.0)
+    clock.now += last.reset_after
+    assert limiter.hit(KEY, 60).remaining == 59
+
+
+def test_keys_and_limits_are_independent(clock):
+    limiter = GCRARateLimiter(clock=clock)
+    for _ in range(20):
+        assert limiter.hit(("chat", "10.0.0.1"), 20).allowed
+    assert not limiter.hit(("chat", "10.0.0.1"), 20).allowed
+    assert limiter.hit(("default", "10.0.0.1"), 60).allowed
+    assert limiter.hit(("chat", "10.0.0.2"), 20).allowed
+    # The chat bucket refills at 20/min: one request per 3 seconds
+    clock.now += 3.0
+    assert limiter.hit(("chat", "10.0.0.1"), 20).allowed
+
+
+def test_expired_keys_are_purged_and_table_is_capped(clock):
+    limiter = GCRARateLimiter(max_keys=3, clock=clock)
+    for i in range(5):
+        limiter.hit(("default", f"10.0.0.{i}"), 60)
+    assert limiter.get_stats() == {"keys": 3, "max_keys": 3, "evictions": 2}
+
+    # Each key's TAT is one interval ahead; once passed, the keys are dropped
+    clock.now += 1.0
+    limiter.hit(KEY, 60)
+    assert limiter.get_stats()["keys"] == 1
@@ -0,0 +1,92 @@
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from src.core import responses
+from src.core.responses import FastJSONResponse, RawJSON, dumps, json_array
+
+
+class Plugin(BaseModel):
+    name: str
+    enabled: bool
+    loaded_at: datetime
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(responses, "orjson", None)
+    return request.param
+
+
+def reference(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+ROW = {
+    "id": 7,
+    "session_id": "s1",
+    "user_message": "Wie wird das Wetter? ☔",
+    "assistant_response": 'Light rain, Sir. "Umbrella" advised.\n',
+    "plugin_used": None,
+    "created_at": datetime(2026, 1, 1, 9, 0, 0, 123456),
+}
+
+
+@pytest.mark.parametrize("content", [
+    ROW,
+    [ROW, {**ROW, "id": 8, "plugin_used": "WeatherPlugin"}],
+    {"count": 0, "items": [], "ratio": 0.25, "ok": True},
+    {"when": datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)},
+    {"when": datetime(2026, 1, 1, 9, 0, tzinfo=timezone(timedelta(hours=-5)))},
+    {"day": date(2026, 1, 1), "at": time(9, 30, 15, 500)},
+    {"whole": datetime(2026, 1, 1)},
+])
+def test_plain_data_matches_json_response(encoder, content):
+    assert FastJSONResponse(content).body == reference(content)
+
+
+def test_pydantic_models_match(encoder):
+    content = {"plugins": [Plugin(name="Weather", enabled=True, loaded_at=datetime(2026, 1, 1, 9))]}
+    assert FastJSONResponse(content).body == reference(content)
+
+
+def test_decimal_and_uuid_match(encoder):
+    content = {"price": Decimal("12.50"), "count": Decimal("3"), "id": UUID(int=1)}
+    assert FastJSONResponse(content).body == reference(content)
+
+
+def test_non_string_keys_match(encoder):
+    content = {1: "one", 2: "two"}
+    assert FastJSONResponse(content).body == reference(content)
+
+
+def test_raw_json_alone_is_returned_as_is(encoder):
+    raw = RawJSON(b'{"a":1}')
+    assert dumps(raw) is raw
+
+
+def test_raw_json_rows_are_spliced_like_encoded_rows(encoder):
+    rows = [ROW, {**ROW, "id": 8}]
+    content = {"session_id": "s1", "messages": json_array(dumps(row) for row in rows), "total": 2}
+    expected = reference({"session_id": "s1", "messages": rows, "total": 2})
+    assert FastJSONResponse(content).body == expected
+
+
+def test_raw_json_items_in_a_list_are_spliced(encoder):
+    content = {"pages": [RawJSON(dumps(ROW)), RawJSON(b"[]")]}
+    assert FastJSONResponse(content).body == reference({"pages": [ROW, []]})
+
+
+def test_raw_json_in_an_unspliced_position_is_re_encoded(encoder):
+    # Not the first list item, so the list isn't detected as raw: parsed and re-encoded
+    content = {"items": [1, RawJSON(b'{"a": [1, 2]}')]}
+    assert json.loads(FastJSONResponse(content).body) == {"items": [1, {"a": [1, 2]}]}
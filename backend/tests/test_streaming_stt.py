@@ -0,0 +1,174 @@
+import array
+import asyncio
+
+import pytest
+
+from src.services import streaming_stt
+from src.services.streaming_stt import StreamingSTTSession, VoiceActivityDetector
+
+FRAME_SAMPLES = 480  # 30 ms at 16 kHz
+
+
+def pcm(level: int, samples: int = FRAME_SAMPLES) -> bytes:
+    return array.array("h", [level] * samples).tobytes()
+
+
+SPEECH = pcm(8000)
+SILENCE = pcm(0)
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, event_type, data):
+        self.events.append((event_type, data))
+
+    def of(self, event_type):
+        return [data for kind, data in self.events if kind == event_type]
+
+
+@pytest.fixture
+def recognized(monkeypatch):
+    """Replace the recognizer; records the audio it was given."""
+    calls = []
+    result = {"value": ("turn on the lights", 0.87)}
+
+    async def fake(audio, sample_rate, language):
+        calls.append(audio)
+        return result["value"]
+
+    monkeypatch.setattr(streaming_stt.speech_service, "recognize_pcm", fake)
+    return calls, result
+
+
+async def settle(session):
+    for task in (session._partial_task, session._final_task):
+        if task is not None:
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def test_vad_rejects_frames_without_samples():
+    with pytest.raises(ValueError):
+        VoiceActivityDetector(sample_rate=8)
+
+
+@pytest.mark.parametrize("rate", [8, 0, -16000, 44100, "16000", 16000.0, True])
+def test_session_rejects_unsupported_sample_rates(rate):
+    with pytest.raises(ValueError):
+        StreamingSTTSession(emit=Recorder(), sample_rate=rate)
+
+
+@pytest.mark.parametrize("rate", [8000, 16000, 24000, 48000])
+def test_session_frames_supported_sample_rates(rate):
+    session = StreamingSTTSession(emit=Recorder(), sample_rate=rate)
+    assert session.vad.frame_bytes == rate * 30 // 1000 * 2
+
+
+def test_feed_keeps_partial_frames_pending():
+    async def run():
+        emit = Recorder()
+        session = StreamingSTTSession(emit=emit, sample_rate=16000)
+        await session.feed(SILENCE[:500])
+        assert len(session._pending) == 500
+        await session.feed(SILENCE[:500])
+        assert len(session._pending) == 1000 - session.vad.frame_bytes
+        assert emit.events == []
+
+    asyncio.run(run())
+
+
+def test_utterance_ends_on_silence_with_recognizer_confidence(recognized):
+    calls, _ = recognized
+
+    async def run():
+        emit = Recorder()
+        finals = []
+
+        async def on_final(text):
+            finals.append(text)
+
+        session = StreamingSTTSession(emit=emit, on_final=on_final, sample_rate=16000)
+        await session.feed(SPEECH * 10 + SILENCE * 30)
+        await settle(session)
+        return emit, finals
+
+    emit, finals = asyncio.run(run())
+    assert len(emit.of("stt_speech_start")) == 1
+    [final] = emit.of("stt_final")
+    assert final["text"] == "turn on the lights"
+    assert final["confidence"] == 0.87
+    assert finals == ["turn on the lights"]
+    assert len(calls) == 1
+
+
+def test_final_omits_confidence_when_not_reported(recognized):
+    _, result = recognized
+    result["value"] = ("hello", None)
+
+    async def run():
+        emit = Recorder()
+        session = StreamingSTTSession(emit=emit, sample_rate=16000)
+        await session.feed(SPEECH * 10 + SILENCE * 30)
+        await settle(session)
+        return emit
+
+    [final] = asyncio.run(run()).of("stt_final")
+    assert final == {"text": "hello", "duration_ms": final["duration_ms"]}
+
+
+def test_short_noise_is_not_an_utterance(recognized):
+    calls, _ = recognized
+
+    async def run():
+        emit = Recorder()
+        session = StreamingSTTSession(emit=emit, sample_rate=16000)
+        await session.feed(SPEECH * 2 + SILENCE * 30)
+        await settle(session)
+        return emit
+
+    emit = asyncio.run(run())
+    assert emit.of("stt_final") == []
+    assert calls == []
+
+
+def test_finish_flushes_sub_frame_remainder(recognized):
+    calls, _ = recognized
+    tail = SPEECH[:300]
+
+    async def run():
+        session = StreamingSTTSession(emit=Recorder(), sample_rate=16000)
+        await session.feed(SPEECH * 10 + tail)
+        await session.finish()
+        await settle(session)
+        return session
+
+    session = asyncio.run(run())
+    assert calls[-1].endswith(SPEECH + tail)
+    assert len(session._pending) == 0
+
+
+def test_close_cancels_in_flight_final(monkeypatch):
+    started = []
+
+    async def slow(audio, sample_rate, language):
+        started.append(True)
+        await asyncio.sleep(60)
+        return "never", None
+
+    monkeypatch.setattr(streaming_stt.speech_service, "recognize_pcm", slow)
+
+    async def run():
+        emit = Recorder()
+        session = StreamingSTTSession(emit=emit, sample_rate=16000)
+        await session.feed(SPEECH * 10)
+        await session.finish()
+        await asyncio.sleep(0)
+        assert session.busy
+        await asyncio.wait_for(session.close(), 1)
+        assert not session.busy
+        return emit
+
+    emit = asyncio.run(run())
+    assert started
+    assert emit.of("stt_final") == []
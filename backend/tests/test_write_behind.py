@@ -0,0 +1,97 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from src.database import write_behind
+from src.database.write_behind import ConversationWriteBehind
+from src.models.database_models import Conversation
+
+
+async def count(factory):
+    async with factory() as db:
+        return (await db.execute(select(func.count()).select_from(Conversation))).scalar_one()
+
+
+def writer(factory, **kwargs):
+    options = dict(batch_size=10, flush_interval_ms=10, max_retries=2, retry_backoff_ms=1)
+    options.update(kwargs)
+    return ConversationWriteBehind(session_factory=factory, **options)
+
+
+async def enqueue(w, n, prefix="m"):
+    for i in range(n):
+        await w.enqueue(session_id="s", user_message=f"{prefix}{i}", assistant_response="ok")
+
+
+def test_enqueue_before_start_writes_directly(memory_db):
+    async def run():
+        _, factory = await memory_db()
+        w = writer(factory)
+        await enqueue(w, 2)
+        return w, await count(factory)
+
+    w, rows = asyncio.run(run())
+    assert rows == 2
+    assert w.direct_writes == 2 and w.enqueued == 0
+
+
+def test_enqueue_after_stop_is_not_lost(memory_db):
+    async def run():
+        _, factory = await memory_db()
+        w = writer(factory)
+        await w.start()
+        await enqueue(w, 3)
+        await w.stop()
+        await enqueue(w, 1, prefix="late")
+        return await count(factory)
+
+    assert asyncio.run(run()) == 4
+
+
+def test_transient_failure_is_retried(memory_db, monkeypatch):
+    real = write_behind.conversation_crud.save_conversations_bulk
+    failures = {"left": 2}
+
+    async def flaky(db, rows):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise RuntimeError("database is locked")
+        return await real(db, rows)
+
+    monkeypatch.setattr(write_behind.conversation_crud, "save_conversations_bulk", flaky)
+
+    async def run():
+        _, factory = await memory_db()
+        w = writer(factory)
+        await w.start()
+        await enqueue(w, 5)
+        await w.stop()
+        return w, await count(factory)
+
+    w, rows = asyncio.run(run())
+    assert rows == 5
+    assert w.retries == 2 and w.failed_rows == 0 and w.flushed_rows == 5
+
+
+def test_poison_row_is_isolated_after_retries(memory_db, monkeypatch):
+    real = write_behind.conversation_crud.save_conversations_bulk
+
+    async def rejects_bad(db, rows):
+        if any(r["user_message"] == "m2" for r in rows):
+            raise ValueError("bad row")
+        return await real(db, rows)
+
+    monkeypatch.setattr(write_behind.conversation_crud, "save_conversations_bulk", rejects_bad)
+
+    async def run():
+        _, factory = await memory_db()
+        w = writer(factory)
+        await w.start()
+        await enqueue(w, 5)
+        await w.stop()
+        return w, await count(factory)
+
+    w, rows = asyncio.run(run())
+    assert rows == 4
+    assert w.failed_rows == 1 and w.flushed_rows == 4
+    assert w.retries == 2
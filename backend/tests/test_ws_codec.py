@@ -0,0 +1,84 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from src.services import ws_codec
+from src.services.ws_codec import (
+    MSGPACK_SUBPROTOCOL,
+    TYPE_CODES,
+    JsonCodec,
+    MsgpackCodec,
+    Outbound,
+    negotiate,
+)
+
+msgpack = pytest.importorskip("msgpack")
+
+STAMP = "2026-10-19T12:30:45.250000"
+
+
+def chat_response():
+    return {
+        "type": "chat_response",
+        "request_id": "4f1c2a9b",
+        "data": {"response": "Systems nominal.", "session_id": "s1", "plugin_used": None, "timestamp": STAMP},
+        "meta": {"timing_ms": {"llm.generate": 812.6}},
+    }
+
+
+def test_json_round_trip_is_lossless():
+    message = chat_response()
+    frame = JsonCodec.encode(message)
+    assert isinstance(frame, str)
+    assert JsonCodec.decode(frame) == message
+
+
+def test_msgpack_round_trip_restores_type_and_keeps_the_rest():
+    message = chat_response()
+    decoded = MsgpackCodec.decode(MsgpackCodec.encode(message))
+    assert decoded["type"] == "chat_response"
+    assert "t" not in decoded
+    assert decoded["data"]["timestamp"] == datetime.fromisoformat(STAMP).timestamp()
+    decoded["data"]["timestamp"] = STAMP
+    assert decoded == message
+
+
+def test_msgpack_wire_uses_type_codes_and_epoch_timestamps():
+    raw = msgpack.unpackb(MsgpackCodec.encode({"type": "heartbeat", "timestamp": STAMP}), raw=False)
+    assert raw == {"t": TYPE_CODES["heartbeat"], "timestamp": datetime.fromisoformat(STAMP).timestamp()}
+
+
+def test_msgpack_unknown_type_and_non_iso_timestamp_pass_through():
+    message = {"type": "custom_event", "timestamp": "yesterday"}
+    raw = msgpack.unpackb(MsgpackCodec.encode(message), raw=False)
+    assert raw["t"] == "custom_event"
+    assert MsgpackCodec.decode(MsgpackCodec.encode(message)) == message
+
+
+def test_msgpack_carries_audio_as_bytes():
+    chunk = bytes(range(256)) * 4
+    frame = msgpack.packb({"t": TYPE_CODES["stt_chunk"], "audio": chunk}, use_bin_type=True)
+    assert MsgpackCodec.decode(frame) == {"type": "stt_chunk", "audio": chunk}
+
+
+def test_type_codes_are_unique():
+    assert len(set(TYPE_CODES.values())) == len(TYPE_CODES)
+
+
+def test_negotiate(monkeypatch):
+    assert negotiate([MSGPACK_SUBPROTOCOL]) is MsgpackCodec
+    assert negotiate(["other"]) is JsonCodec
+    assert negotiate(None) is JsonCodec
+    monkeypatch.setattr(ws_codec, "msgpack", None)
+    assert negotiate([MSGPACK_SUBPROTOCOL]) is JsonCodec
+
+
+def test_outbound_from_json_text_encodes_for_both_codecs():
+    message = chat_response()
+    out = Outbound(json_text=json.dumps(message))
+    assert out.type == "chat_response"
+    assert out.encoded(JsonCodec) == json.dumps(message)
+    packed = out.encoded(MsgpackCodec)
+    assert out.encoded(MsgpackCodec) is packed
+    assert MsgpackCodec.decode(packed)["type"] == "chat_response"
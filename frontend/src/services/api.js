@@ -148,6 +148,11 @@ class WebSocketService {
     this.socket.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data)
+        // Answer server heartbeats so the connection isn't reaped as idle
+        if (data.type === 'heartbeat') {
+          this.socket.send(JSON.stringify({ type: 'pong' }))
+          return
+        }
         this.emit(data.type, data.payload)
       } catch (error) {
         console.error('Failed to parse WebSocket message:', error)